@@ -0,0 +1,7 @@
+"""
+Live win probabilities for T20 and ODI matches
+"""
+from .model import DEFAULT_MODEL_PATH, WinProbabilityModel
+from .service import WinProbabilityService
+
+__all__ = ["DEFAULT_MODEL_PATH", "WinProbabilityModel", "WinProbabilityService"]
@@ -0,0 +1,146 @@
+"""
+Compact logistic win-probability model for limited-overs matches
+Each live match state is reduced to three features (bias, run surplus over
+par scaled by the square root of the balls involved, and wickets in hand
+relative to balls left); one weight vector per (format, innings) turns them
+into the probability that the batting side wins
+"""
+import json
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "model.json")
+
+FIRST_INNINGS = 0
+CHASE = 1
+
+
+def overs_to_balls(overs: float) -> int:
+    """Balls bowled from an overs figure like 15.2 (15 overs and 2 balls)"""
+    whole = int(overs)
+    return whole * 6 + int(round((overs - whole) * 10))
+
+
+def _other(side: str) -> str:
+    return "team2" if side == "team1" else "team1"
+
+
+def _innings_over(innings: Dict, total_balls: int) -> bool:
+    return innings["wickets"] >= 10 or overs_to_balls(innings.get("overs", 0)) >= total_balls
+
+
+def batting_first(match: Dict, total_balls: int) -> Optional[str]:
+    """'team1' or 'team2' when the score shows which side batted first, else None.
+
+    The feed's two scores belong to fixed teams, not innings. A side with a
+    score while the other has none is batting first (a chase at 0/0 has no
+    score yet); with both scores, the side whose innings is over batted first
+    if the other's is not. Anything else is ambiguous.
+    """
+    score = match.get("score") or {}
+    one, two = score.get("team1"), score.get("team2")
+    if one and not two:
+        return "team1"
+    if two and not one:
+        return "team2"
+    if not one:
+        return None
+    one_over, two_over = _innings_over(one, total_balls), _innings_over(two, total_balls)
+    if one_over != two_over:
+        return "team1" if one_over else "team2"
+    return None
+
+
+class MatchFeatures:
+    """Model inputs for one match state, or a decided result when no model is needed"""
+
+    __slots__ = ("group", "values", "decided")
+
+    def __init__(self, group: int, values: Tuple[float, float, float], decided: Optional[float] = None):
+        self.group = group
+        self.values = values
+        self.decided = decided
+
+
+class WinProbabilityModel:
+    """Weights loaded once from a JSON file; predict() scores many matches in one pass.
+
+    Features are built for a given batting order (see batting_first());
+    probabilities are for the team batting first, the chasing side has 1 - p.
+    """
+
+    def __init__(self, spec: Dict):
+        self.version = spec.get("version", 1)
+        self.formats: Dict[str, Dict] = {}
+        weights: List[List[float]] = []
+        for name, fmt in spec["formats"].items():
+            # Row index of each (format, innings) weight vector
+            self.formats[name] = {
+                "balls": fmt["balls"],
+                "parRate": fmt["parRate"],
+                "groups": (len(weights), len(weights) + 1),
+            }
+            weights.append(fmt["firstInnings"])
+            weights.append(fmt["chase"])
+        self.weights = np.array(weights, dtype=np.float64)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_PATH) -> "WinProbabilityModel":
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def supports(self, match_format: Optional[str]) -> bool:
+        return match_format in self.formats
+
+    def total_balls(self, match_format: Optional[str]) -> Optional[int]:
+        fmt = self.formats.get(match_format)
+        return fmt["balls"] if fmt else None
+
+    def features(self, match: Dict, first_side: str) -> Optional[MatchFeatures]:
+        """Features from a transformed match (score parsed by LiveMatchesAPI.parse_score) with
+        `first_side` ('team1' or 'team2') batting first; None if unscorable"""
+        fmt = self.formats.get(match.get("format"))
+        score = match.get("score") or {}
+        first = score.get(first_side)
+        if fmt is None or not first:
+            return None
+        total = fmt["balls"]
+        per_ball = fmt["parRate"] / 6
+        second = score.get(_other(first_side))
+
+        if not second:
+            balls = min(overs_to_balls(first.get("overs", 0)), total)
+            resources = (10 - first["wickets"]) / 10 - (total - balls) / total
+            surplus = (first["runs"] - balls * per_ball) / math.sqrt(total)
+            return MatchFeatures(fmt["groups"][FIRST_INNINGS], (1.0, surplus, resources))
+
+        target = first["runs"] + 1
+        need = target - second["runs"]
+        balls_left = total - min(overs_to_balls(second.get("overs", 0)), total)
+        wickets_in_hand = 10 - second["wickets"]
+        group = fmt["groups"][CHASE]
+        if need <= 0:
+            return MatchFeatures(group, (0.0, 0.0, 0.0), decided=0.0)
+        if balls_left == 0 or wickets_in_hand <= 0:
+            # Scores level with the chase over is a tie
+            return MatchFeatures(group, (0.0, 0.0, 0.0), decided=0.5 if need == 1 else 1.0)
+        surplus = (balls_left * per_ball - need) / math.sqrt(balls_left)
+        resources = wickets_in_hand / 10 - balls_left / total
+        return MatchFeatures(group, (1.0, surplus, resources))
+
+    def predict(self, rows: List[MatchFeatures]) -> np.ndarray:
+        """Probability that the team batting first wins, for every row"""
+        if not rows:
+            return np.zeros(0)
+        values = np.array([row.values for row in rows], dtype=np.float64)
+        groups = np.fromiter((row.group for row in rows), dtype=np.intp, count=len(rows))
+        logits = np.einsum("ij,ij->i", values, self.weights[groups])
+        batting = 1.0 / (1.0 + np.exp(-logits))
+        # The chasing side is the one batting in the second innings
+        chasing = (groups % 2) == CHASE
+        first_wins = np.where(chasing, 1.0 - batting, batting)
+        decided = np.array([np.nan if row.decided is None else row.decided for row in rows])
+        return np.where(np.isnan(decided), first_wins, decided)
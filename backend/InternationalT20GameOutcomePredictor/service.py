@@ -0,0 +1,124 @@
+"""
+In-process win-probability service
+Scores every live match in the MatchStateStore in one batch per poll tick,
+and only re-scores a match when its (innings, ball, score) state changed.
+Matches whose batting order cannot be told are skipped, not guessed
+"""
+import time
+from typing import Dict, Hashable, Optional, Tuple
+
+from match_state import MatchStateStore
+
+from .model import MatchFeatures, WinProbabilityModel, batting_first
+
+
+def _state_key(match: Dict, first_side: str) -> Hashable:
+    """What a prediction depends on: format, batting order and both innings' runs, wickets and overs"""
+    score = match.get("score") or {}
+    return (match.get("format"), first_side) + tuple(
+        (innings.get("runs"), innings.get("wickets"), innings.get("overs")) if innings else None
+        for innings in (score.get("team1"), score.get("team2"))
+    )
+
+
+def _result(probability: float, first_side: str) -> Dict:
+    """Per-team probabilities from the probability that the side batting first wins"""
+    if first_side == "team2":
+        probability = 1.0 - probability
+    return {"team1": round(probability, 3), "team2": round(1.0 - probability, 3)}
+
+
+class WinProbabilityService:
+    """Cached per-match win probabilities, refreshed by score() once per poll tick"""
+
+    def __init__(self, model: WinProbabilityModel):
+        self.model = model
+        # match id -> (state key, {"team1": p, "team2": 1 - p})
+        self._cache: Dict[str, Tuple[Hashable, Dict]] = {}
+        # match id -> side seen batting first, kept once the score has shown it
+        self._batting_first: Dict[str, str] = {}
+        self.batches = 0
+        self.scored = 0
+        self.reused = 0
+        self.unknown_order = 0
+        self.last_batch_ms = 0.0
+
+    def score(self, store: MatchStateStore) -> int:
+        """Re-score live matches whose state changed; returns how many were scored"""
+        keys = []
+        rows = []
+        live = set()
+        for match_id, state in store.matches.items():
+            match = state.statistics or state.summary
+            if state.status != "live" or not match or not self.model.supports(match.get("format")):
+                continue
+            live.add(match_id)
+            first_side = self._batting_order(match_id, match)
+            if first_side is None:
+                self.unknown_order += 1
+                self._cache.pop(match_id, None)
+                continue
+            key = _state_key(match, first_side)
+            cached = self._cache.get(match_id)
+            if cached is not None and cached[0] == key:
+                self.reused += 1
+                continue
+            features = self.model.features(match, first_side)
+            if features is None:
+                self._cache.pop(match_id, None)
+                continue
+            keys.append((match_id, key, first_side))
+            rows.append(features)
+
+        # Forget matches that finished or dropped off the list
+        for match_id in [m for m in self._cache if m not in live]:
+            del self._cache[match_id]
+        for match_id in [m for m in self._batting_first if m not in live]:
+            del self._batting_first[match_id]
+        if not rows:
+            return 0
+
+        start = time.perf_counter()
+        probabilities = self.model.predict(rows)
+        for (match_id, key, first_side), probability in zip(keys, probabilities.tolist()):
+            self._cache[match_id] = (key, _result(probability, first_side))
+        self.last_batch_ms = (time.perf_counter() - start) * 1000
+        self.batches += 1
+        self.scored += len(rows)
+        return len(rows)
+
+    def _batting_order(self, match_id: str, match: Dict) -> Optional[str]:
+        """Side batting first: remembered once seen, since both innings in progress can look alike"""
+        first_side = self._batting_first.get(match_id)
+        if first_side is None:
+            first_side = batting_first(match, self.model.total_balls(match.get("format")))
+            if first_side is not None:
+                self._batting_first[match_id] = first_side
+        return first_side
+
+    def get(self, match_id: str) -> Optional[Tuple[Hashable, Dict]]:
+        """(state key, probabilities) last scored for a live match"""
+        return self._cache.get(match_id)
+
+    def predict_match(self, match: Dict) -> Optional[Dict]:
+        """Uncached single prediction for a transformed match not held in the store"""
+        if match.get("status") != "live" or not self.model.supports(match.get("format")):
+            return None
+        first_side = batting_first(match, self.model.total_balls(match.get("format")))
+        if first_side is None:
+            return None
+        features: Optional[MatchFeatures] = self.model.features(match, first_side)
+        if features is None:
+            return None
+        return _result(float(self.model.predict([features])[0]), first_side)
+
+    def stats(self) -> Dict:
+        return {
+            "modelVersion": self.model.version,
+            "cached": len(self._cache),
+            "batches": self.batches,
+            "scored": self.scored,
+            "reused": self.reused,
+            "unknownOrder": self.unknown_order,
+            "lastBatchMs": round(self.last_batch_ms, 3),
+        }
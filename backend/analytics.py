@@ -0,0 +1,212 @@
+"""
+Vectorized match analytics
+A match's deliveries are turned into NumPy columns once, and the per-over
+(Manhattan, worm, run rate), partnership and phase breakdowns of every innings
+are computed with bincount/cumsum/reduceat instead of Python loops over dicts
+"""
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from delivery_store import FLAG_CATCH_DROP, FLAG_COMMENTARY, FLAG_FOUR, FLAG_SIX, FLAG_WICKET, DeliveryStore
+
+# (name, first over, end over) per format, zero-based overs; Tests have no phases
+PHASES = {
+    "T20": (("powerplay", 0, 6), ("middle", 6, 15), ("death", 15, 20)),
+    "ODI": (("powerplay", 0, 10), ("middle", 10, 40), ("death", 40, 50)),
+}
+
+
+class MatchColumns:
+    """Ball rows of one match (commentary dropped), oldest first, as NumPy arrays.
+
+    Innings are not in the feed; a new one starts wherever the (over, ball)
+    position goes backwards.
+    """
+
+    __slots__ = ("over", "ball", "runs", "wicket", "four", "six", "batsman", "bowler", "names", "innings")
+
+    def __init__(self, over, ball, runs, flags, batsman, bowler, names: List[str]):
+        keep = (flags & FLAG_COMMENTARY) == 0
+        self.over = over[keep].astype(np.int64)
+        self.ball = ball[keep].astype(np.int64)
+        self.runs = runs[keep].astype(np.int64)
+        flags = flags[keep]
+        # The feed flags a dropped catch as a wicket, but no one is out
+        self.wicket = (flags & (FLAG_WICKET | FLAG_CATCH_DROP)) == FLAG_WICKET
+        self.four = (flags & FLAG_FOUR) != 0
+        self.six = (flags & FLAG_SIX) != 0
+        self.batsman = batsman[keep].astype(np.int64)
+        self.bowler = bowler[keep].astype(np.int64)
+        self.names = names
+        position = self.over * 10 + self.ball
+        restarts = np.zeros(len(position), dtype=np.int64)
+        restarts[1:] = np.diff(position) < 0
+        self.innings = np.cumsum(restarts)
+
+    def __len__(self) -> int:
+        return len(self.runs)
+
+    @classmethod
+    def from_store(cls, history: DeliveryStore) -> "MatchColumns":
+        columns = history.columns()
+        return cls(
+            np.frombuffer(columns["overs"], dtype=np.int32),
+            np.frombuffer(columns["balls"], dtype=np.int32),
+            np.frombuffer(columns["runs"], dtype=np.int32),
+            np.frombuffer(columns["flags"], dtype=np.uint8),
+            np.frombuffer(columns["batsmen"], dtype=np.uint32),
+            np.frombuffer(columns["bowlers"], dtype=np.uint32),
+            columns["names"],
+        )
+
+    @classmethod
+    def from_deliveries(cls, deliveries: Iterable[Dict]) -> "MatchColumns":
+        """Columns from Delivery dicts, oldest first"""
+        names: List[str] = [""]
+        name_index: Dict[str, int] = {"": 0}
+
+        def intern(name: Optional[str]) -> int:
+            name = name or ""
+            if name not in name_index:
+                name_index[name] = len(names)
+                names.append(name)
+            return name_index[name]
+
+        rows = [
+            (
+                d.get("over", 0), d.get("ball", 0), d.get("runs", 0),
+                (FLAG_WICKET if d.get("isWicket") else 0) | (FLAG_FOUR if d.get("isFour") else 0)
+                | (FLAG_SIX if d.get("isSix") else 0) | (FLAG_COMMENTARY if d.get("_type") == "commentary" else 0)
+                | (FLAG_CATCH_DROP if d.get("_catchDrop") else 0),
+                intern(d.get("batsman")), intern(d.get("bowler")),
+            )
+            for d in deliveries
+        ]
+        table = np.array(rows, dtype=np.int64).reshape(-1, 6)
+        return cls(table[:, 0], table[:, 1], table[:, 2], table[:, 3], table[:, 4], table[:, 5], names)
+
+
+def _round(values: np.ndarray) -> List[float]:
+    return np.round(values, 2).tolist()
+
+
+def _rate(runs: np.ndarray, balls: np.ndarray) -> np.ndarray:
+    """Runs per six balls, 0 where no balls were bowled"""
+    return np.divide(runs * 6.0, balls, out=np.zeros(len(runs)), where=balls > 0)
+
+
+def _partnerships(columns: MatchColumns) -> List[List[Dict]]:
+    """Per innings, the stands between consecutive wickets"""
+    count = len(columns)
+    starts_mask = np.zeros(count, dtype=bool)
+    starts_mask[0] = True
+    starts_mask[1:] = (columns.innings[1:] != columns.innings[:-1]) | columns.wicket[:-1]
+    starts = np.flatnonzero(starts_mask)
+    ends = np.append(starts[1:], count)
+    runs = np.add.reduceat(columns.runs, starts)
+    balls = ends - starts
+    fours = np.add.reduceat(columns.four.astype(np.int64), starts)
+    sixes = np.add.reduceat(columns.six.astype(np.int64), starts)
+    broken = columns.wicket[ends - 1]
+
+    # Batsmen of each stand in order of first appearance: first row of every (stand, batsman) pair
+    stand = np.cumsum(starts_mask) - 1
+    pairs = stand * len(columns.names) + columns.batsman
+    _, first_rows = np.unique(pairs, return_index=True)
+    first_rows.sort()
+    first_rows = first_rows[columns.batsman[first_rows] != 0]
+    batsmen: List[List[str]] = [[] for _ in range(len(starts))]
+    for row_stand, batsman in zip(stand[first_rows].tolist(), columns.batsman[first_rows].tolist()):
+        batsmen[row_stand].append(columns.names[batsman])
+
+    by_innings: List[List[Dict]] = [[] for _ in range(int(columns.innings[-1]) + 1)]
+    for i, innings in enumerate(columns.innings[starts].tolist()):
+        by_innings[innings].append({
+            "batsmen": batsmen[i],
+            "runs": int(runs[i]),
+            "balls": int(balls[i]),
+            "fours": int(fours[i]),
+            "sixes": int(sixes[i]),
+            "brokenByWicket": bool(broken[i]),
+        })
+    return by_innings
+
+
+def _phases(columns: MatchColumns, innings_count: int, match_format: Optional[str]) -> List[List[Dict]]:
+    phases = PHASES.get(match_format or "")
+    if not phases:
+        return [[] for _ in range(innings_count)]
+    bounds = np.array([start for _, start, _ in phases])
+    # Overs past the last phase (rare, e.g. rain-adjusted feeds) count towards it
+    phase = np.searchsorted(bounds, columns.over, side="right") - 1
+    key = columns.innings * len(phases) + phase
+    size = innings_count * len(phases)
+
+    def totals(weights=None) -> np.ndarray:
+        return np.bincount(key, weights=weights, minlength=size).reshape(innings_count, len(phases))
+
+    runs = totals(columns.runs).astype(np.int64)
+    balls = totals()
+    wickets = totals(columns.wicket).astype(np.int64)
+    fours = totals(columns.four).astype(np.int64)
+    sixes = totals(columns.six).astype(np.int64)
+    rates = _rate(runs.ravel(), balls.ravel()).reshape(innings_count, len(phases))
+    return [
+        [
+            {
+                "phase": name,
+                "overs": f"{start + 1}-{end}",
+                "runs": int(runs[inn, p]),
+                "balls": int(balls[inn, p]),
+                "wickets": int(wickets[inn, p]),
+                "fours": int(fours[inn, p]),
+                "sixes": int(sixes[inn, p]),
+                "runRate": round(float(rates[inn, p]), 2),
+            }
+            for p, (name, start, end) in enumerate(phases)
+        ]
+        for inn in range(innings_count)
+    ]
+
+
+def match_analytics(columns: MatchColumns, match_format: Optional[str] = None) -> List[Dict]:
+    """Per-innings Manhattan, worm, run rate, partnerships and phase splits"""
+    if not len(columns):
+        return []
+    innings_count = int(columns.innings[-1]) + 1
+    over_count = int(columns.over.max()) + 1
+    key = columns.innings * over_count + columns.over
+    size = innings_count * over_count
+
+    def per_over(weights=None) -> np.ndarray:
+        return np.bincount(key, weights=weights, minlength=size).reshape(innings_count, over_count)
+
+    runs = per_over(columns.runs).astype(np.int64)
+    balls = per_over().astype(np.int64)
+    wickets = per_over(columns.wicket).astype(np.int64)
+    worm = np.cumsum(runs, axis=1)
+    cumulative_balls = np.cumsum(balls, axis=1)
+    run_rate = _rate(worm.ravel(), cumulative_balls.ravel()).reshape(innings_count, over_count)
+    # Last over reached in each innings bounds its series
+    innings_starts = np.flatnonzero(np.diff(columns.innings, prepend=-1))
+    last_over = np.maximum.reduceat(columns.over, innings_starts)
+
+    partnerships = _partnerships(columns)
+    phases = _phases(columns, innings_count, match_format)
+    result = []
+    for inn in range(innings_count):
+        overs = int(last_over[inn]) + 1
+        result.append({
+            "innings": inn + 1,
+            "runs": int(worm[inn, overs - 1]),
+            "wickets": int(wickets[inn].sum()),
+            "balls": int(balls[inn].sum()),
+            "manhattan": runs[inn, :overs].tolist(),
+            "worm": worm[inn, :overs].tolist(),
+            "runRate": _round(run_rate[inn, :overs]),
+            "wicketsPerOver": wickets[inn, :overs].tolist(),
+            "partnerships": partnerships[inn],
+            "phases": phases[inn],
+        })
+    return result
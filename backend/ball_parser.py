@@ -0,0 +1,272 @@
+"""
+Ball-feed parser for CricAPI Commentary items
+Per-field helpers with module-level compiled patterns and the batch
+transformer used everywhere a getBallFeeds response becomes Delivery dicts
+"""
+import re
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# HTML tags, stripped with a plain substitution (no per-match callback), and the
+# entities the commentary feed uses, decoded with str.replace; "&amp;" goes last
+# so "&amp;lt;" decodes to "&lt;" as a single left-to-right pass would
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+_ENTITIES = (
+    ("&nbsp;", " "),
+    ("&lt;", "<"),
+    ("&gt;", ">"),
+    ("&quot;", '"'),
+    ("&#39;", "'"),
+    ("&amp;", "&"),
+)
+
+
+# Every wicket indicator and wicket type in one alternation of literals, matched against
+# the lowercased raw commentary. No capture groups, so the regex engine can use its
+# literal-prefix fast scan; matches are classified with a dict lookup instead.
+_WICKET_PATTERN = re.compile(
+    r"bowled|caught|lbw|leg before(?: wicket)?|run out|stumped|wicket[!.,:;]|dismissed|out[!.,:;]"
+)
+# matched text -> (wicket type, is a dismissal indicator); anything else is an
+# indicator with no type ("wicket!", "dismissed", "out." ...). "leg before" on its
+# own names the type but is not an indicator; "leg before wicket" is both.
+_WICKET_TOKENS = {
+    "bowled": ("bowled", True),
+    "caught": ("caught", True),
+    "lbw": ("lbw", True),
+    "leg before": ("lbw", False),
+    "leg before wicket": ("lbw", True),
+    "run out": ("run out", True),
+    "stumped": ("stumped", True),
+}
+# Wicket type precedence when the commentary mentions several
+_WICKET_TYPE_ORDER = ("bowled", "caught", "lbw", "run out", "stumped")
+_NO_TYPE = (None, True)
+
+# Kind of extra, read from the token the commentary opens with ("Wide down leg",
+# "No ball! overstepped", "leg byes, ..."). Only consulted when the run notation
+# has an extras part, so a legal ball described as "short and wide" or "wide of
+# mid-off" is never taken for a wide.
+_EXTRA_TOKEN_PATTERN = re.compile(r"\s*(wides?|no[- ]?balls?|(?:leg[- ]?)?byes?)\b")
+# Byes and leg byes are handled alike: legal deliveries not charged to the bowler
+EXTRA_KINDS = ("wide", "no ball", "bye")
+
+
+def clean_commentary(text: Optional[str]) -> str:
+    """Strip HTML tags and decode entities"""
+    if not text:
+        return ""
+    if "<" in text:
+        text = _TAG_PATTERN.sub("", text)
+    if "&" in text:
+        for entity, char in _ENTITIES:
+            text = text.replace(entity, char)
+    return text
+
+
+def scan_wicket(commentary: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """Scan commentary once for wicket indicators and the wicket type.
+
+    Returns (has_wicket_indicator, wicket_type).
+    """
+    if not commentary:
+        return False, None
+    tokens = _WICKET_PATTERN.findall(commentary.lower())
+    if not tokens:
+        return False, None
+    has_indicator = False
+    found = set()
+    for token in tokens:
+        wicket_type, is_indicator = _WICKET_TOKENS.get(token, _NO_TYPE)
+        has_indicator = has_indicator or is_indicator
+        if wicket_type:
+            found.add(wicket_type)
+    wicket_type = next((name for name in _WICKET_TYPE_ORDER if name in found), None) if found else None
+    return has_indicator, wicket_type
+
+
+def parse_over_ball(value: Optional[str]) -> Tuple[int, int]:
+    """Parse "48.4" into (48, 4)"""
+    over = 0
+    ball = 0
+    if value:
+        try:
+            parts = value.split(".")
+            over = int(parts[0]) if parts[0] else 0
+            ball = int(parts[1]) if len(parts) > 1 and parts[1] else 0
+        except (ValueError, IndexError, AttributeError):
+            pass
+    return over, ball
+
+
+def parse_runs(value) -> int:
+    """Parse runs like "4", "1" or "0+1" (runs off the bat + extras)"""
+    if value is None:
+        return 0
+    try:
+        return int(str(value).split("+", 1)[0])
+    except ValueError:
+        return 0
+
+
+def parse_extras(value) -> int:
+    """Extras from run notation like "0+1" (0 for "4" or unparseable values)"""
+    if value is None:
+        return 0
+    parts = str(value).split("+", 1)
+    if len(parts) < 2:
+        return 0
+    try:
+        return int(parts[1])
+    except ValueError:
+        return 0
+
+
+def classify_extra(description: str) -> str:
+    """'wide', 'no ball' or 'bye' for a ball whose run notation has extras.
+
+    Only the commentary's opening token counts; extras it does not name are
+    taken as byes, which leave the bowler's figures alone.
+    """
+    match = _EXTRA_TOKEN_PATTERN.match(description.lower())
+    if match is None:
+        return "bye"
+    token = match.group(1)
+    if token.startswith("wide"):
+        return "wide"
+    if token.startswith("no"):
+        return "no ball"
+    return "bye"
+
+
+def parse_players(c1: Optional[str]) -> Tuple[str, str]:
+    """Parse "K Clarke to K Rahul" into (bowler, batsman)"""
+    if not c1 or " to " not in c1:
+        return "", ""
+    parts = c1.split(" to ")
+    return parts[0].strip(), parts[1].strip()
+
+
+# Local "YYYY-MM-DDTHH:MM" prefixes by minute. UTC offsets change on minute boundaries,
+# so only the seconds and milliseconds need formatting per ball.
+_MINUTE_PREFIXES: Dict[int, str] = {}
+
+
+def feed_timestamp(feed_id: int) -> str:
+    """ISO timestamp for a feed id (a millisecond timestamp), same as
+    datetime.fromtimestamp(feed_id / 1000).isoformat()"""
+    if not feed_id:
+        return datetime.now().isoformat()
+    minute, remainder = divmod(feed_id, 60000)
+    prefix = _MINUTE_PREFIXES.get(minute)
+    if prefix is None:
+        if len(_MINUTE_PREFIXES) > 4096:
+            _MINUTE_PREFIXES.clear()
+        prefix = datetime.fromtimestamp(minute * 60).isoformat(timespec="minutes")
+        _MINUTE_PREFIXES[minute] = prefix
+    seconds, millis = divmod(remainder, 1000)
+    if millis:
+        return f"{prefix}:{seconds:02d}.{millis:03d}000"
+    return f"{prefix}:{seconds:02d}"
+
+
+def parse_ball_item(item: Dict, match_id: str) -> Dict:
+    """Parse a ball item (type "b") into a Delivery dict"""
+    over, ball = parse_over_ball(item.get("o", ""))
+    runs = parse_runs(item.get("b", "0"))
+    raw_commentary = item.get("c2") or ""
+
+    # Wickets have 0 runs off the bat, so 6-run deliveries are never marked as wickets;
+    # is_catch_drop is an explicit upstream flag. Only those balls need the commentary
+    # scanned, which skips it for every ball that scored.
+    is_catch_drop = item.get("is_catch_drop", False) == True
+    is_wicket = is_catch_drop
+    wicket_type = None
+    if runs == 0 or is_catch_drop:
+        has_indicator, wicket_type = scan_wicket(raw_commentary)
+        is_wicket = is_catch_drop or has_indicator
+
+    bowler, batsman = parse_players(item.get("c1"))
+    description = clean_commentary(raw_commentary)
+
+    feed_id = item.get("id", 0)
+    delivery = {
+        "id": f"{match_id}_{feed_id}",
+        "matchId": match_id,
+        "over": over,
+        "ball": ball,
+        "bowler": bowler,
+        "batsman": batsman,
+        "runs": runs,
+        "isWicket": is_wicket,
+        "wicketType": wicket_type if is_wicket else None,
+        "isFour": runs == 4,
+        "isSix": runs == 6,
+        "description": description,
+        "timestamp": feed_timestamp(feed_id),
+        "commentCount": 0
+    }
+    if is_catch_drop:
+        # Still reported as a wicket, but marked so stats do not count it as a dismissal
+        delivery["_catchDrop"] = True
+    runs_value = item.get("b")
+    if isinstance(runs_value, str) and "+" in runs_value:
+        extra_runs = parse_extras(runs_value)
+        if extra_runs > 0:
+            # Not part of the API response; used for bowling figures
+            delivery["_extra"] = classify_extra(description)
+            delivery["_extraRuns"] = extra_runs
+    return delivery
+
+
+def parse_text_item(item: Dict, match_id: str) -> Dict:
+    """Parse a text commentary item (type "t") into a Delivery dict"""
+    feed_id = item.get("id", 0)
+    # Use over from "on" field if available
+    over = item.get("on", -1)
+    return {
+        "id": f"{match_id}_{feed_id}",
+        "matchId": match_id,
+        "over": over if isinstance(over, int) and over >= 0 else 0,
+        "ball": 0,
+        "bowler": "",
+        "batsman": "",
+        "runs": 0,
+        "isWicket": False,
+        "wicketType": None,
+        "isFour": False,
+        "isSix": False,
+        "description": clean_commentary(item.get("c", "")),
+        "timestamp": feed_timestamp(feed_id),
+        "commentCount": 0,
+        "_type": "commentary"  # Mark as commentary type
+    }
+
+
+_ITEM_PARSERS = {
+    "b": parse_ball_item,
+    "t": parse_text_item,
+}
+
+
+def transform_feed(items: Iterable[Dict], match_id: str) -> List[Dict]:
+    """Transform a getBallFeeds item list into Delivery dicts, most recent first.
+
+    Ball items (type "b") and text commentary (type "t") go through the same
+    loop; other item types are ignored, as are ball items at 0.0.
+    """
+    deliveries = []
+    for item in items:
+        parser = _ITEM_PARSERS.get(item.get("type"))
+        if parser is None:
+            continue
+        delivery = parser(item, match_id)
+        if parser is parse_ball_item and not (
+            delivery["over"] > 0 or (delivery["over"] == 0 and delivery["ball"] > 0)
+        ):
+            continue
+        deliveries.append(delivery)
+
+    # Most recent first; for items with the same timestamp, by over and ball
+    deliveries.sort(key=lambda d: (d["timestamp"], d["over"], d["ball"]), reverse=True)
+    return deliveries
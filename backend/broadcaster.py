@@ -0,0 +1,94 @@
+"""
+Per-match event fan-out for the delivery stream endpoints
+One upstream poll publishes each event once; every subscriber gets its own
+bounded queue that drops the oldest events when a slow client falls behind
+"""
+import asyncio
+import json
+from collections import deque
+from typing import Dict, Optional, Set
+
+
+class StreamEvent:
+    """A single stream event (a new delivery or a score change)"""
+
+    __slots__ = ("event", "data", "id")
+
+    def __init__(self, event: str, data: Dict, id: Optional[int] = None):
+        self.event = event
+        self.data = data
+        self.id = id
+
+    def to_sse(self) -> str:
+        lines = []
+        if self.id is not None:
+            lines.append(f"id: {self.id}")
+        lines.append(f"event: {self.event}")
+        lines.append(f"data: {json.dumps(self.data, separators=(',', ':'))}")
+        return "\n".join(lines) + "\n\n"
+
+    def to_dict(self) -> Dict:
+        return {"event": self.event, "id": self.id, "data": self.data}
+
+
+class Subscription:
+    """Bounded per-subscriber queue with drop-oldest backpressure"""
+
+    def __init__(self, match_id: str, max_queue: int):
+        self.match_id = match_id
+        self._queue = deque(maxlen=max_queue)
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, event: StreamEvent):
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1
+        self._queue.append(event)
+        self._ready.set()
+
+    async def get(self) -> StreamEvent:
+        while not self._queue:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._queue.popleft()
+
+
+class MatchBroadcaster:
+    """Fans out match events to all subscribers of that match"""
+
+    def __init__(self, max_queue: int = 256):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+
+    def subscribe(self, match_id: str) -> Subscription:
+        subscription = Subscription(match_id, self.max_queue)
+        self._subscribers.setdefault(match_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.match_id)
+        if subscribers is not None:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.match_id]
+
+    def has_subscribers(self, match_id: str) -> bool:
+        return bool(self._subscribers.get(match_id))
+
+    def publish(self, match_id: str, event: StreamEvent):
+        self.published += 1
+        for subscription in self._subscribers.get(match_id, ()):
+            subscription.put(event)
+            self.delivered += 1
+
+    def stats(self) -> Dict:
+        subscriptions = [s for subs in self._subscribers.values() for s in subs]
+        return {
+            "matches": len(self._subscribers),
+            "subscribers": len(subscriptions),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": sum(s.dropped for s in subscriptions),
+        }
@@ -0,0 +1,98 @@
+"""
+In-process TTL cache with stale-while-revalidate
+Used to absorb identical upstream fetches from many polling clients
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Async TTL cache that serves stale values while one background refresh runs.
+
+    - age <= ttl: fresh hit
+    - ttl < age <= ttl + stale_ttl: stale hit, a single background refresh is scheduled
+    - otherwise: miss, the caller awaits the loader (concurrent misses share one load)
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0.0, max_entries: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value if it is still fresh"""
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] <= self.ttl:
+            return entry[1]
+        return None
+
+    def set(self, key: Hashable, value: Any):
+        if key not in self._entries and len(self._entries) >= self.max_entries:
+            # Evict the oldest entry
+            oldest = min(self._entries, key=lambda k: self._entries[k][0])
+            del self._entries[oldest]
+        self._entries[key] = (time.monotonic(), value)
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything when no key is given"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        self.refreshes += 1
+        value = await loader()
+        self.set(key, value)
+        return value
+
+    def _start_refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._refreshing.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._load(key, loader))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda t, k=key: self._on_refresh_done(k, t))
+        return task
+
+    def _on_refresh_done(self, key: Hashable, task: asyncio.Task):
+        if self._refreshing.get(key) is task:
+            del self._refreshing[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.refresh_errors += 1
+            print(f"[{self.name} cache] refresh failed for {key}: {task.exception()}")
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Get a value, loading or revalidating it through loader() as needed"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age <= self.ttl:
+                self.hits += 1
+                return entry[1]
+            if age <= self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._start_refresh(key, loader)
+                return entry[1]
+
+        self.misses += 1
+        # shield() so a cancelled request does not cancel the shared load
+        return await asyncio.shield(self._start_refresh(key, loader))
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "staleHits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refreshErrors": self.refresh_errors,
+        }
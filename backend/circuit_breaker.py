@@ -0,0 +1,246 @@
+"""
+Circuit breakers and hedged fallback across upstream providers
+A breaker fails fast while its provider is erroring or slow and lets a probe
+through after a cool-down; FallbackChain walks the provider chain and can
+optionally start the next provider once the current one exceeds its p95 latency
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose breaker is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit open, retrying in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Per-provider breaker over a sliding window of recent calls.
+
+    Opens when at least min_calls of the last `window` calls were recorded and
+    either failure_rate of them failed or slow_call_rate of them took longer
+    than slow_call_ms. After open_seconds one probe call is let through
+    (half-open); it closes the breaker if it succeeds in time and reopens it
+    otherwise.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        failure_rate: float = 0.5,
+        slow_call_ms: float = 3000.0,
+        slow_call_rate: float = 0.5,
+        open_seconds: float = 30.0,
+        latency_window: int = 100,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_ms = slow_call_ms
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes: "deque[Tuple[bool, bool]]" = deque(maxlen=window)  # (failed, slow)
+        self._latencies: "deque[float]" = deque(maxlen=latency_window)  # successful calls, ms
+        self._opened_at = 0.0
+        self._probing = False
+        self.calls = 0
+        self.rejected = 0
+        self.failures = 0
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the probe slot when half-open)"""
+        if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def _open(self):
+        if self.state != OPEN:
+            self.opened += 1
+            logger.info("%s opened for %gs", self.name, self.open_seconds)
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+
+    def record(self, failed: bool, elapsed_ms: float):
+        slow = elapsed_ms > self.slow_call_ms
+        if failed:
+            self.failures += 1
+        else:
+            self._latencies.append(elapsed_ms)
+
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if failed or slow:
+                self._open()
+            else:
+                logger.info("%s closed", self.name)
+                self.state = CLOSED
+            return
+        if self.state == OPEN:
+            # A call that started before the breaker opened
+            return
+
+        self._outcomes.append((failed, slow))
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        failed_calls = sum(1 for f, _ in self._outcomes if f)
+        slow_calls = sum(1 for _, s in self._outcomes if s)
+        if failed_calls >= self.failure_rate * calls or slow_calls >= self.slow_call_rate * calls:
+            self._open()
+
+    def release(self):
+        """Give back the probe slot for a call that was cancelled before it finished"""
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() through the breaker, raising CircuitOpenError if it is open"""
+        self.calls += 1
+        if not self.allow():
+            self.rejected += 1
+            raise CircuitOpenError(self.name, self.open_seconds - (time.monotonic() - self._opened_at))
+        start = time.perf_counter()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # A hedged call that lost the race still counts if it was already slow
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms > self.slow_call_ms:
+                self.record(False, elapsed_ms)
+            else:
+                self.release()
+            raise
+        except Exception:
+            self.record(True, (time.perf_counter() - start) * 1000)
+            raise
+        self.record(False, (time.perf_counter() - start) * 1000)
+        return result
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        """q-quantile (ms) of recent successful call latencies, None until there are samples"""
+        if not self._latencies:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+    def stats(self) -> Dict:
+        p95 = self.latency_quantile(0.95)
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "failures": self.failures,
+            "opened": self.opened,
+            "p95Ms": round(p95, 1) if p95 is not None else None,
+        }
+
+
+class FallbackChain:
+    """Tries providers in order until one succeeds.
+
+    Each entry is (label, breaker, fn). Without hedging the next provider
+    starts only when the current one fails (an open breaker fails immediately).
+    With hedging, the next provider also starts once the current one has run
+    longer than its breaker's recent p95 latency, and the first success wins;
+    providers still running are cancelled (counted in `abandoned`), so provider
+    fns should be the upstream calls themselves rather than shielded or shared
+    loads that outlive the cancellation.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        hedging: bool = False,
+        hedge_quantile: float = 0.95,
+        min_hedge_delay: float = 0.05,
+        default_hedge_delay: float = 1.0,
+    ):
+        self.name = name
+        self.hedging = hedging
+        self.hedge_quantile = hedge_quantile
+        self.min_hedge_delay = min_hedge_delay
+        self.default_hedge_delay = default_hedge_delay
+        self.runs = 0
+        self.hedges = 0
+        self.exhausted = 0
+        self.abandoned = 0
+        self.wins: Dict[str, int] = {}
+
+    def hedge_delay(self, breaker: CircuitBreaker) -> float:
+        """Seconds to wait on a provider before also starting the next one"""
+        p = breaker.latency_quantile(self.hedge_quantile)
+        if p is None:
+            return self.default_hedge_delay
+        return max(p / 1000, self.min_hedge_delay)
+
+    async def run(self, providers: Sequence[Tuple[str, CircuitBreaker, Callable[[], Awaitable[Any]]]]) -> Any:
+        """Result of the first provider to succeed; re-raises the last error if all fail"""
+        self.runs += 1
+        remaining = list(providers)
+        running: Dict[asyncio.Future, Tuple[str, CircuitBreaker]] = {}
+        last_error: Optional[BaseException] = None
+
+        def start_next() -> Optional[CircuitBreaker]:
+            if not remaining:
+                return None
+            label, breaker, fn = remaining.pop(0)
+            running[asyncio.ensure_future(fn())] = (label, breaker)
+            return breaker
+
+        current = start_next()
+        try:
+            while running:
+                timeout = self.hedge_delay(current) if self.hedging and remaining else None
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    current = start_next()
+                    continue
+                for future in done:
+                    label, _ = running.pop(future)
+                    if future.exception() is None:
+                        self.wins[label] = self.wins.get(label, 0) + 1
+                        return future.result()
+                    last_error = future.exception()
+                    logger.info("%s: %s failed: %s", self.name, label, last_error)
+                    current = start_next() or current
+            self.exhausted += 1
+            if last_error is None:
+                raise RuntimeError(f"{self.name}: no providers configured")
+            raise last_error
+        finally:
+            for future in running:
+                if future.cancel():
+                    self.abandoned += 1
+
+    def stats(self) -> Dict:
+        return {
+            "hedging": self.hedging,
+            "runs": self.runs,
+            "hedges": self.hedges,
+            "exhausted": self.exhausted,
+            "abandoned": self.abandoned,
+            "wins": dict(self.wins),
+        }
@@ -0,0 +1,286 @@
+"""
+Paginated, depth-limited comment threads
+Root comments are keyset-paginated (sort "new" or "top") through the
+get_root_comments/get_comment_replies functions, or sliced from the in-memory
+ranked index (sort "best"); replies are loaded a fixed number of levels deep
+and fetched lazily below that
+"""
+import base64
+import json
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from cache import TTLCache
+from ranked_comments import RankedCommentIndex
+from user_loader import UserLoader, placeholder_user
+from write_behind import CommentWriteBehind, VoteWriteBehind
+
+COMMENT_SORTS = ("new", "top", "best")
+
+
+def encode_cursor(row: Dict, sort: str) -> str:
+    """Opaque cursor for the page after `row` (the last row of the current page)"""
+    if sort == "top":
+        key = {"s": row.get("score") or 0, "i": row["id"]}
+    elif sort == "best":
+        key = {"w": row["rank"], "i": row["id"]}
+    else:
+        key = {"c": row["created_at"], "i": row["id"]}
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], sort: str) -> Dict:
+    """RPC cursor parameters for a cursor from encode_cursor; raises ValueError if it is invalid"""
+    if not cursor:
+        return {}
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if sort == "top":
+            return {"p_cursor_score": int(key["s"]), "p_cursor_id": str(key["i"])}
+        if sort == "best":
+            return {"after": (float(key["w"]), str(key["i"]))}
+        return {"p_cursor_created_at": str(key["c"]), "p_cursor_id": str(key["i"])}
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def comment_from_row(row: Dict, user: Optional[Dict] = None) -> Dict:
+    """Comment response dict from a comments row and its author's User dict (shared, not copied)"""
+    if user is None:
+        user = row.get("_user") or placeholder_user(row["user_id"])
+    return {
+        "id": row["id"],
+        "deliveryId": row["delivery_id"],
+        "userId": row["user_id"],
+        "user": user,
+        "content": row["content"],
+        "createdAt": row["created_at"],
+        "upvotes": row.get("upvotes") or 0,
+        "downvotes": row.get("downvotes") or 0,
+        "parentId": row.get("parent_id"),
+        "replies": [],
+        "hasMoreReplies": False
+    }
+
+
+def build_comment_tree(
+    levels: List[List[Dict]],
+    depth: int,
+    truncated: Set[str] = frozenset(),
+    pending: List[Tuple[Dict, Optional[Dict]]] = (),
+    users: Dict[str, Dict] = {},
+) -> List[Dict]:
+    """Link rows into a tree, independent of the order rows arrive in.
+
+    levels[0] are the top-level rows (in page order) and levels[n] the replies
+    n levels below them. Comments at the last loaded level get replies=None
+    (not loaded; fetch them from /comments/{id}/replies). `truncated` holds ids
+    whose replies were cut at the per-parent limit. Pending (row, user) pairs
+    from the write-behind buffer are attached to any loaded parent. Authors are
+    looked up in `users` by user_id.
+    """
+    nodes: Dict[str, Dict] = {}
+    for level, rows in enumerate(levels):
+        for row in rows:
+            node = comment_from_row(row, users.get(row["user_id"]))
+            if level >= depth:
+                node["replies"] = None
+                node["hasMoreReplies"] = None
+            elif row["id"] in truncated:
+                node["hasMoreReplies"] = True
+            nodes[row["id"]] = node
+
+    roots = [nodes[row["id"]] for row in levels[0]] if levels else []
+    reply_rows = [row for rows in levels[1:] for row in rows]
+    for row, user in pending:
+        if row["id"] not in nodes and row.get("parent_id") in nodes:
+            nodes[row["id"]] = comment_from_row(row, user)
+            reply_rows.append(row)
+
+    # Link in a second pass so a reply never depends on its parent coming first
+    for row in reply_rows:
+        parent = nodes.get(row.get("parent_id"))
+        if parent is not None and parent["replies"] is not None:
+            parent["replies"].append(nodes[row["id"]])
+    for node in nodes.values():
+        if node["replies"]:
+            node["replies"].sort(key=lambda reply: (str(reply["createdAt"]), reply["id"]))
+    return roots
+
+
+class CommentThreads:
+    """Reads comment pages from Supabase and overlays writes that are still buffered.
+
+    The first page of each (delivery, sort, limit, depth) is materialized in a
+    short TTL cache, since that is what every viewer of a hot delivery loads.
+    Authors are resolved per request through the UserLoader instead of a users
+    join, so pages hold comment rows only.
+    """
+
+    def __init__(
+        self,
+        db,
+        supabase,
+        votes: VoteWriteBehind,
+        comments: CommentWriteBehind,
+        cache: TTLCache,
+        ranking: RankedCommentIndex,
+        users: UserLoader,
+        replies_per_parent: int = 10,
+    ):
+        self.db = db
+        self.supabase = supabase
+        self.votes = votes
+        self.comments = comments
+        self.cache = cache
+        self.ranking = ranking
+        self.users = users
+        self.replies_per_parent = replies_per_parent
+
+    async def _fetch_reply_levels(self, parent_ids: List[str], depth: int) -> Tuple[List[List[Dict]], Set[str]]:
+        """Up to replies_per_parent replies per parent, `depth` levels deep"""
+        levels: List[List[Dict]] = []
+        truncated: Set[str] = set()
+        for _ in range(depth):
+            if not parent_ids:
+                break
+            result = await self.db.execute(
+                self.supabase.rpc("get_comment_replies", {
+                    "p_parent_ids": parent_ids,
+                    "p_limit": self.replies_per_parent + 1
+                }),
+                "comments.replies"
+            )
+            kept: List[Dict] = []
+            per_parent: Dict[str, int] = {}
+            for row in result.data or []:
+                count = per_parent.get(row["parent_id"], 0) + 1
+                per_parent[row["parent_id"]] = count
+                if count > self.replies_per_parent:
+                    truncated.add(row["parent_id"])
+                else:
+                    kept.append(row)
+            levels.append(kept)
+            parent_ids = [row["id"] for row in kept]
+        return levels, truncated
+
+    async def _fetch_best_roots(self, delivery_id: str, limit: int, cursor: Optional[str]) -> List[Dict]:
+        """Root rows for a slice of the ranked index, in rank order, each with its "rank" key"""
+        ranking = await self.ranking.get(delivery_id)
+        entries = ranking.top(limit, **decode_cursor(cursor, "best"))
+        if not entries:
+            return []
+        ids = [comment_id for _, comment_id in entries]
+        result = await self.db.execute(
+            self.supabase.table("comments").select("*").in_("id", ids),
+            "comments.by_id"
+        )
+        rows = {row["id"]: row for row in result.data or []}
+        # Comments still in the write-behind buffer are ranked but not stored yet
+        for row, user in self.comments.pending_for(delivery_id=delivery_id):
+            if row["id"] not in rows:
+                rows[row["id"]] = {**row, "_user": user}
+        return [{**rows[comment_id], "rank": rank} for rank, comment_id in entries if comment_id in rows]
+
+    async def _load_root_page(self, delivery_id: str, sort: str, limit: int, cursor: Optional[str], depth: int) -> Dict:
+        loaded_at = time.monotonic()
+        if sort == "best":
+            roots = await self._fetch_best_roots(delivery_id, limit + 1, cursor)
+            next_cursor = encode_cursor(roots[limit - 1], sort) if len(roots) > limit else None
+            roots = roots[:limit]
+            levels, truncated = await self._fetch_reply_levels([row["id"] for row in roots], depth)
+            return {"loadedAt": loaded_at, "levels": [roots] + levels, "truncated": truncated, "next": next_cursor}
+        result = await self.db.execute(
+            self.supabase.rpc("get_root_comments", {
+                "p_delivery_id": delivery_id,
+                "p_sort": sort,
+                "p_limit": limit + 1,
+                **decode_cursor(cursor, sort)
+            }),
+            "comments.roots"
+        )
+        roots = result.data or []
+        next_cursor = encode_cursor(roots[limit - 1], sort) if len(roots) > limit else None
+        roots = roots[:limit]
+        levels, truncated = await self._fetch_reply_levels([row["id"] for row in roots], depth)
+        return {"loadedAt": loaded_at, "levels": [roots] + levels, "truncated": truncated, "next": next_cursor}
+
+    async def _load_authors(self, levels: List[List[Dict]]) -> Dict[str, Dict]:
+        return await self.users.load_many(row["user_id"] for rows in levels for row in rows)
+
+    def _apply_votes(self, comments: List[Dict], since: float):
+        stack = list(comments)
+        while stack:
+            comment = stack.pop()
+            up, down = self.votes.tally_delta(comment["id"], since=since)
+            comment["upvotes"] += up
+            comment["downvotes"] += down
+            if comment["replies"]:
+                stack.extend(comment["replies"])
+
+    async def root_page(
+        self,
+        delivery_id: str,
+        sort: str = "new",
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        depth: int = 2,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """One page of root comments with `depth` levels of replies, and the next cursor"""
+        if cursor:
+            page = await self._load_root_page(delivery_id, sort, limit, cursor, depth)
+        else:
+            page = await self.cache.get_or_load(
+                ("comments", delivery_id, sort, limit, depth),
+                lambda: self._load_root_page(delivery_id, sort, limit, None, depth)
+            )
+
+        since = page["loadedAt"]
+        pending = self.comments.pending_for(delivery_id=delivery_id, since=since)
+        users = await self._load_authors(page["levels"])
+        tree = build_comment_tree(page["levels"], depth, page["truncated"], pending, users)
+        if not cursor and sort != "best":
+            # New root comments only belong on the first page (the ranked index already has them)
+            stored = {row["id"] for rows in page["levels"] for row in rows}
+            new_roots = [
+                comment_from_row(row, user) for row, user in pending
+                if not row.get("parent_id") and row["id"] not in stored
+            ]
+            tree = new_roots[::-1] + tree if sort == "new" else tree + new_roots
+        self._apply_votes(tree, since)
+        return tree, page["next"]
+
+    async def replies_page(
+        self,
+        comment_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        depth: int = 2,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """One page of direct replies to a comment (oldest first) with `depth - 1` further levels"""
+        loaded_at = time.monotonic()
+        result = await self.db.execute(
+            self.supabase.rpc("get_comment_replies", {
+                "p_parent_ids": [comment_id],
+                "p_limit": limit + 1,
+                **decode_cursor(cursor, "new")
+            }),
+            "comments.replies"
+        )
+        replies = result.data or []
+        next_cursor = encode_cursor(replies[limit - 1], "new") if len(replies) > limit else None
+        replies = replies[:limit]
+        levels, truncated = await self._fetch_reply_levels([row["id"] for row in replies], depth - 1)
+
+        pending = self.comments.pending_for(since=loaded_at)
+        stored = {row["id"] for rows in [replies] + levels for row in rows}
+        users = await self._load_authors([replies] + levels)
+        tree = build_comment_tree([replies] + levels, depth - 1, truncated, pending, users)
+        if next_cursor is None:
+            # Buffered replies are the newest, so they go on the last page
+            tree += [
+                comment_from_row(row, user) for row, user in pending
+                if row.get("parent_id") == comment_id and row["id"] not in stored
+            ]
+        self._apply_votes(tree, loaded_at)
+        return tree, next_cursor
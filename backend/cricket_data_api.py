@@ -6,6 +6,7 @@ import httpx
 import os
 from typing import List, Dict, Optional
 from datetime import datetime
+from http_clients import HTTPClientRegistry
 
 CRICKET_DATA_API_BASE = "https://api.cricapi.com/v1"
 CRICKET_DATA_API_KEY = os.getenv("CRICKET_DATA_API_KEY", "")
@@ -14,52 +15,51 @@ CRICKET_DATA_API_KEY = os.getenv("CRICKET_DATA_API_KEY", "")
 class CricketDataAPI:
     """Service for interacting with Cricket Data API"""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, clients: Optional[HTTPClientRegistry] = None):
         self.api_key = api_key or CRICKET_DATA_API_KEY
         if not self.api_key:
             raise ValueError("CRICKET_DATA_API_KEY environment variable is required")
+        self.clients = clients or HTTPClientRegistry()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self.clients.get("cricket_data")
 
     async def get_current_matches(self, offset: int = 0) -> List[Dict]:
         """Get list of current/live matches"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{CRICKET_DATA_API_BASE}/currentMatches",
-                params={"apikey": self.api_key, "offset": offset},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            if data.get("status") == "success":
-                return data.get("data", [])
-            return []
+        response = await self.client.get(
+            f"{CRICKET_DATA_API_BASE}/currentMatches",
+            params={"apikey": self.api_key, "offset": offset}
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "success":
+            return data.get("data", [])
+        return []
 
     async def get_all_matches(self, offset: int = 0) -> List[Dict]:
         """Get list of all matches"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{CRICKET_DATA_API_BASE}/matches",
-                params={"apikey": self.api_key, "offset": offset},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            if data.get("status") == "success":
-                return data.get("data", [])
-            return []
+        response = await self.client.get(
+            f"{CRICKET_DATA_API_BASE}/matches",
+            params={"apikey": self.api_key, "offset": offset}
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "success":
+            return data.get("data", [])
+        return []
 
     async def get_match_info(self, match_id: str) -> Optional[Dict]:
         """Get detailed information about a specific match"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{CRICKET_DATA_API_BASE}/match_info",
-                params={"apikey": self.api_key, "id": match_id},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            if data.get("status") == "success":
-                return data.get("data")
-            return None
+        response = await self.client.get(
+            f"{CRICKET_DATA_API_BASE}/match_info",
+            params={"apikey": self.api_key, "id": match_id}
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "success":
+            return data.get("data")
+        return None
 
     async def get_series_list(self, offset: int = 0, search: Optional[str] = None) -> List[Dict]:
         """Get list of cricket series"""
@@ -67,17 +67,15 @@ class CricketDataAPI:
         if search:
             params["search"] = search
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{CRICKET_DATA_API_BASE}/series",
-                params=params,
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            if data.get("status") == "success":
-                return data.get("data", [])
-            return []
+        response = await self.client.get(
+            f"{CRICKET_DATA_API_BASE}/series",
+            params=params
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "success":
+            return data.get("data", [])
+        return []
 
     async def get_players(self, offset: int = 0, search: Optional[str] = None) -> List[Dict]:
         """Get list of players"""
@@ -85,31 +83,27 @@ class CricketDataAPI:
         if search:
             params["search"] = search
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{CRICKET_DATA_API_BASE}/players",
-                params=params,
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            if data.get("status") == "success":
-                return data.get("data", [])
-            return []
+        response = await self.client.get(
+            f"{CRICKET_DATA_API_BASE}/players",
+            params=params
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "success":
+            return data.get("data", [])
+        return []
 
     async def get_player_info(self, player_id: str) -> Optional[Dict]:
         """Get detailed information about a specific player"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{CRICKET_DATA_API_BASE}/players_info",
-                params={"apikey": self.api_key, "id": player_id},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            if data.get("status") == "success":
-                return data.get("data")
-            return None
+        response = await self.client.get(
+            f"{CRICKET_DATA_API_BASE}/players_info",
+            params={"apikey": self.api_key, "id": player_id}
+        )
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") == "success":
+            return data.get("data")
+        return None
 
     def transform_match_to_schema(self, match_data: Dict) -> Dict:
         """Transform Cricket Data API match format to our schema"""
@@ -0,0 +1,60 @@
+"""
+Non-blocking Supabase access
+The supabase-py client is synchronous, so every .execute() runs on a bounded
+thread pool instead of the event loop, with per-query latency histograms
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from metrics import LatencyHistogram
+
+
+class SupabaseExecutor:
+    """Runs Supabase query builders on a dedicated thread pool.
+
+    Build the query on the event loop as usual and pass it to execute() instead
+    of calling .execute() on it; a semaphore caps concurrent queries so a burst
+    of requests queues here rather than exhausting the pool or the database.
+    """
+
+    def __init__(self, max_workers: int = 16, max_concurrency: Optional[int] = None):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="supabase")
+        self._semaphore = asyncio.Semaphore(max_concurrency or max_workers)
+        self._latency: Dict[str, LatencyHistogram] = {}
+        self._wait = LatencyHistogram()
+        self.inflight = 0
+        self.errors = 0
+
+    async def execute(self, query, name: str = "query") -> Any:
+        """Execute a query builder off the event loop; `name` labels its latency histogram"""
+        queued = time.perf_counter()
+        async with self._semaphore:
+            started = time.perf_counter()
+            self._wait.observe((started - queued) * 1000)
+            self.inflight += 1
+            try:
+                return await asyncio.get_running_loop().run_in_executor(self._executor, query.execute)
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.inflight -= 1
+                histogram = self._latency.get(name)
+                if histogram is None:
+                    histogram = self._latency[name] = LatencyHistogram()
+                histogram.observe((time.perf_counter() - started) * 1000)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.max_workers,
+            "inflight": self.inflight,
+            "errors": self.errors,
+            "queueWait": self._wait.to_dict(),
+            "queries": {name: histogram.to_dict() for name, histogram in self._latency.items()},
+        }
@@ -0,0 +1,52 @@
+"""
+Bulk persistence of ingested deliveries
+Deliveries merged by the poller are queued here and upserted into the
+deliveries table in batches, keyed by their '{match_id}_{feed_id}' id so
+re-polls and restarts rewrite the same rows
+"""
+from datetime import datetime, timezone
+from typing import Dict, Iterable
+
+from delivery_store import delivery_feed_id
+from write_behind import WriteBehindBuffer
+
+
+def delivery_row(delivery: Dict) -> Dict:
+    """deliveries table row for a transformed Delivery dict.
+
+    comment_count is left out so an upsert never resets it; new rows get it
+    from the init_delivery_comment_count trigger.
+    """
+    feed_id = delivery_feed_id(delivery)
+    timestamp = (
+        datetime.fromtimestamp(feed_id / 1000, tz=timezone.utc).isoformat() if feed_id else delivery.get("timestamp")
+    )
+    return {
+        "id": delivery["id"],
+        "match_id": delivery["matchId"],
+        "over": delivery.get("over", 0),
+        "ball": delivery.get("ball", 0),
+        "bowler": delivery.get("bowler") or "",
+        "batsman": delivery.get("batsman") or "",
+        "runs": delivery.get("runs", 0),
+        "is_wicket": bool(delivery.get("isWicket")),
+        "wicket_type": delivery.get("wicketType"),
+        "is_four": bool(delivery.get("isFour")),
+        "is_six": bool(delivery.get("isSix")),
+        "description": delivery.get("description") or "",
+        "timestamp": timestamp,
+        "is_commentary": delivery.get("_type") == "commentary",
+        "is_catch_drop": bool(delivery.get("_catchDrop")),
+    }
+
+
+class DeliverySink(WriteBehindBuffer):
+    """Write-behind buffer of deliveries rows keyed by delivery id"""
+
+    # Rows have no foreign keys, so a failed batch is a database problem, not a bad row
+    split_failed_batches = False
+
+    async def add(self, deliveries: Iterable[Dict]):
+        for delivery in deliveries:
+            row = delivery_row(delivery)
+            await self.put(row["id"], row)
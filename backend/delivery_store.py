@@ -0,0 +1,345 @@
+"""
+Columnar per-match delivery history
+Keeps ball-by-ball data in typed arrays instead of one 14-key dict per delivery,
+and serializes pages straight to JSON without building Delivery dicts
+"""
+import bisect
+import json
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ball_parser import feed_timestamp
+
+FLAG_WICKET = 1
+FLAG_FOUR = 2
+FLAG_SIX = 4
+FLAG_COMMENTARY = 8
+FLAG_CATCH_DROP = 16
+# Kind of extra (at most one is set); byes and leg byes share FLAG_BYE
+FLAG_WIDE = 32
+FLAG_NO_BALL = 64
+FLAG_BYE = 128
+_EXTRA_FLAGS = {"wide": FLAG_WIDE, "no ball": FLAG_NO_BALL, "bye": FLAG_BYE}
+FLAG_EXTRA = FLAG_WIDE | FLAG_NO_BALL | FLAG_BYE  # any extra
+
+WICKET_TYPES = ("bowled", "caught", "lbw", "run out", "stumped")
+_WICKET_TYPE_CODES = {name: code for code, name in enumerate(WICKET_TYPES)}
+NO_WICKET_TYPE = -1
+UNKNOWN_WICKET_TYPE = -2  # a wicket type we have no code for (kept in _other_wicket_types)
+
+_json_string = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def delivery_feed_id(delivery: Dict) -> int:
+    """Feed id from a delivery id of the form '{match_id}_{feed_id}'"""
+    try:
+        return int(delivery["id"].rsplit("_", 1)[1])
+    except (KeyError, IndexError, ValueError):
+        return 0
+
+
+def public_delivery(delivery: Dict) -> Dict:
+    """Delivery dict without the internal '_'-prefixed keys, as clients see it"""
+    return {key: value for key, value in delivery.items() if not key.startswith("_")}
+
+
+class DeliveryView:
+    """Lightweight read-only view of one row of a DeliveryStore.
+
+    Views hold a row index, so they are only valid until the next merge.
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: "DeliveryStore", index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def feed_id(self) -> int:
+        return self._store._feed_ids[self._index]
+
+    @property
+    def id(self) -> str:
+        return f"{self._store.match_id}_{self.feed_id}"
+
+    @property
+    def over(self) -> int:
+        return self._store._overs[self._index]
+
+    @property
+    def ball(self) -> int:
+        return self._store._balls[self._index]
+
+    @property
+    def runs(self) -> int:
+        return self._store._runs[self._index]
+
+    @property
+    def bowler(self) -> str:
+        return self._store._names[self._store._bowlers[self._index]]
+
+    @property
+    def batsman(self) -> str:
+        return self._store._names[self._store._batsmen[self._index]]
+
+    @property
+    def is_wicket(self) -> bool:
+        return bool(self._store._flags[self._index] & FLAG_WICKET)
+
+    @property
+    def is_four(self) -> bool:
+        return bool(self._store._flags[self._index] & FLAG_FOUR)
+
+    @property
+    def is_six(self) -> bool:
+        return bool(self._store._flags[self._index] & FLAG_SIX)
+
+    @property
+    def is_commentary(self) -> bool:
+        return bool(self._store._flags[self._index] & FLAG_COMMENTARY)
+
+    @property
+    def is_catch_drop(self) -> bool:
+        return bool(self._store._flags[self._index] & FLAG_CATCH_DROP)
+
+    @property
+    def extra(self) -> Optional[str]:
+        """'wide', 'no ball', 'bye' or None"""
+        flags = self._store._flags[self._index]
+        if not flags & FLAG_EXTRA:
+            return None
+        return next(kind for kind, flag in _EXTRA_FLAGS.items() if flags & flag)
+
+    @property
+    def extra_runs(self) -> int:
+        return self._store._extra_runs[self._index]
+
+    @property
+    def wicket_type(self) -> Optional[str]:
+        return self._store._wicket_type(self._index)
+
+    @property
+    def description(self) -> str:
+        return self._store._descriptions[self._index]
+
+    @property
+    def timestamp(self) -> str:
+        return feed_timestamp(self.feed_id)
+
+    def to_dict(self) -> Dict:
+        delivery = {
+            "id": self.id,
+            "matchId": self._store.match_id,
+            "over": self.over,
+            "ball": self.ball,
+            "bowler": self.bowler,
+            "batsman": self.batsman,
+            "runs": self.runs,
+            "isWicket": self.is_wicket,
+            "wicketType": self.wicket_type,
+            "isFour": self.is_four,
+            "isSix": self.is_six,
+            "description": self.description,
+            "timestamp": self.timestamp,
+            "commentCount": 0
+        }
+        if self.is_commentary:
+            delivery["_type"] = "commentary"
+        if self.is_catch_drop:
+            delivery["_catchDrop"] = True
+        extra = self.extra
+        if extra is not None:
+            delivery["_extra"] = extra
+            delivery["_extraRuns"] = self.extra_runs
+        return delivery
+
+
+class DeliveryStore:
+    """Ball-by-ball history for one match in columnar form.
+
+    Rows are ordered by feed id, which is the upstream millisecond timestamp:
+    chronological, and unlike (over, ball) correct across innings in Tests.
+    high_water/low_water are the newest and oldest feed ids seen, used as
+    lastDocId cursors for delta and backfill fetches. gaps holds
+    (floor, cursor) pairs for stretches a delta fetch gave up on: feed ids
+    between floor and cursor are still missing and are fetched from cursor down.
+    """
+
+    def __init__(self, match_id: str):
+        self.match_id = match_id
+        self._match_id_json = _json_string(match_id)
+        self._feed_ids = array("q")
+        self._overs = array("i")
+        self._balls = array("i")
+        self._runs = array("i")
+        self._extra_runs = array("B")
+        self._flags = array("B")
+        self._wicket_types = array("b")
+        self._bowlers = array("I")
+        self._batsmen = array("I")
+        self._descriptions: List[str] = []
+        self._other_wicket_types: Dict[int, str] = {}
+        # Interned player names; index 0 is the empty name used by text items
+        self._names: List[str] = [""]
+        self._name_index: Dict[str, int] = {"": 0}
+        self._names_json: List[str] = ['""']
+        self.high_water = 0
+        self.low_water = 0
+        self.gaps: List[Tuple[int, int]] = []
+        self._complete = False
+        self.version = 0  # bumped whenever the served pages change
+
+    def __len__(self) -> int:
+        return len(self._feed_ids)
+
+    @property
+    def complete(self) -> bool:
+        """True once backfill reached the start of the feed"""
+        return self._complete
+
+    @complete.setter
+    def complete(self, value: bool):
+        if value != self._complete:
+            self._complete = value
+            self.version += 1
+
+    def _intern_name(self, name: str) -> int:
+        index = self._name_index.get(name)
+        if index is None:
+            index = len(self._names)
+            self._names.append(name)
+            self._names_json.append(_json_string(name))
+            self._name_index[name] = index
+        return index
+
+    def _wicket_type(self, index: int) -> Optional[str]:
+        code = self._wicket_types[index]
+        if code >= 0:
+            return WICKET_TYPES[code]
+        if code == UNKNOWN_WICKET_TYPE:
+            return self._other_wicket_types.get(self._feed_ids[index])
+        return None
+
+    def advance(self, feed_ids: Iterable[int]):
+        """Move the watermarks to cover raw feed ids seen (including skipped items)"""
+        for feed_id in feed_ids:
+            if not feed_id:
+                continue
+            if feed_id > self.high_water:
+                self.high_water = feed_id
+            if not self.low_water or feed_id < self.low_water:
+                self.low_water = feed_id
+
+    def merge(self, deliveries: List[Dict]) -> List[Dict]:
+        """Insert deliveries not seen before; returns the newly added ones"""
+        added = []
+        for delivery in deliveries:
+            feed_id = delivery_feed_id(delivery)
+            # The sorted id column doubles as the seen set; new balls almost always
+            # land at the end, so the lookup and insert are O(log n) + O(1)
+            index = bisect.bisect_left(self._feed_ids, feed_id)
+            if index < len(self._feed_ids) and self._feed_ids[index] == feed_id:
+                continue
+            flags = 0
+            if delivery.get("isWicket"):
+                flags |= FLAG_WICKET
+            if delivery.get("isFour"):
+                flags |= FLAG_FOUR
+            if delivery.get("isSix"):
+                flags |= FLAG_SIX
+            if delivery.get("_type") == "commentary":
+                flags |= FLAG_COMMENTARY
+            if delivery.get("_catchDrop"):
+                flags |= FLAG_CATCH_DROP
+            extra = delivery.get("_extra")
+            if extra:
+                flags |= _EXTRA_FLAGS.get(extra, FLAG_BYE)
+            wicket_type = delivery.get("wicketType")
+            wicket_code = NO_WICKET_TYPE
+            if wicket_type:
+                wicket_code = _WICKET_TYPE_CODES.get(wicket_type, UNKNOWN_WICKET_TYPE)
+                if wicket_code == UNKNOWN_WICKET_TYPE:
+                    self._other_wicket_types[feed_id] = wicket_type
+
+            self._feed_ids.insert(index, feed_id)
+            self._overs.insert(index, delivery.get("over", 0))
+            self._balls.insert(index, delivery.get("ball", 0))
+            self._runs.insert(index, delivery.get("runs", 0))
+            self._extra_runs.insert(index, min(delivery.get("_extraRuns", 0), 255) if extra else 0)
+            self._flags.insert(index, flags)
+            self._wicket_types.insert(index, wicket_code)
+            self._bowlers.insert(index, self._intern_name(delivery.get("bowler") or ""))
+            self._batsmen.insert(index, self._intern_name(delivery.get("batsman") or ""))
+            self._descriptions.insert(index, delivery.get("description") or "")
+            added.append(delivery)
+        if added:
+            self.version += 1
+        return added
+
+    def view(self, index: int) -> DeliveryView:
+        return DeliveryView(self, index)
+
+    def columns(self) -> Dict:
+        """Copies of the per-row arrays (oldest first) plus the interned names, for bulk analysis"""
+        return {
+            "feed_ids": self._feed_ids[:],
+            "overs": self._overs[:],
+            "balls": self._balls[:],
+            "runs": self._runs[:],
+            "extra_runs": self._extra_runs[:],
+            "flags": self._flags[:],
+            "bowlers": self._bowlers[:],
+            "batsmen": self._batsmen[:],
+            "names": list(self._names),
+        }
+
+    def since(self, feed_id: int) -> List[Dict]:
+        """Deliveries newer than feed_id, oldest first (for stream resume)"""
+        start = bisect.bisect_right(self._feed_ids, feed_id)
+        return [DeliveryView(self, i).to_dict() for i in range(start, len(self._feed_ids))]
+
+    def page_range(self, before: Optional[int] = None, limit: int = 50) -> Optional[range]:
+        """Row indexes of a newest-first page older than the `before` feed id.
+
+        Returns None when the page is older than anything ingested so far.
+        """
+        end = len(self._feed_ids) if before is None else bisect.bisect_left(self._feed_ids, before)
+        if before is not None and end == 0 and not self._complete:
+            return None
+        return range(end - 1, max(end - limit, 0) - 1, -1)
+
+    def page(self, before: Optional[int] = None, limit: int = 50) -> Optional[List[Dict]]:
+        """Newest-first page of Delivery dicts, or None if not covered"""
+        rows = self.page_range(before, limit)
+        if rows is None:
+            return None
+        return [DeliveryView(self, i).to_dict() for i in rows]
+
+    def page_json(self, before: Optional[int] = None, limit: int = 50) -> Optional[bytes]:
+        """Newest-first page encoded straight to a JSON array of Delivery objects"""
+        rows = self.page_range(before, limit)
+        if rows is None:
+            return None
+        match_id = self.match_id
+        match_id_json = self._match_id_json
+        feed_ids, overs, balls, runs = self._feed_ids, self._overs, self._balls, self._runs
+        flags, bowlers, batsmen = self._flags, self._bowlers, self._batsmen
+        names_json, descriptions = self._names_json, self._descriptions
+        parts = []
+        for i in rows:
+            feed_id = feed_ids[i]
+            flag = flags[i]
+            wicket_type = self._wicket_type(i)
+            parts.append(
+                f'{{"id":{_json_string(f"{match_id}_{feed_id}")},"matchId":{match_id_json},'
+                f'"over":{overs[i]},"ball":{balls[i]},'
+                f'"bowler":{names_json[bowlers[i]]},"batsman":{names_json[batsmen[i]]},'
+                f'"runs":{runs[i]},"isWicket":{"true" if flag & FLAG_WICKET else "false"},'
+                f'"wicketType":{_json_string(wicket_type) if wicket_type else "null"},'
+                f'"isFour":{"true" if flag & FLAG_FOUR else "false"},'
+                f'"isSix":{"true" if flag & FLAG_SIX else "false"},'
+                f'"description":{_json_string(descriptions[i])},'
+                f'"timestamp":"{feed_timestamp(feed_id)}","commentCount":0}}'
+            )
+        return ("[" + ",".join(parts) + "]").encode("utf-8")
@@ -0,0 +1,79 @@
+"""
+Shared HTTP client registry for upstream providers
+One pooled httpx.AsyncClient per provider, created once for the app lifetime
+"""
+import httpx
+from typing import Dict, Optional
+
+# Per-provider connection settings. Each provider talks to a single host, so
+# the pool limits below are effectively per-host limits.
+PROVIDER_SETTINGS = {
+    "live_matches": {
+        # api-v1.com - liveMatches2.php and sV3.php
+        "timeout": httpx.Timeout(8.0, connect=3.0),
+        "limits": httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0),
+    },
+    "cricket_data": {
+        # api.cricapi.com - fallback provider, slower and rate limited
+        "timeout": httpx.Timeout(15.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=30.0),
+    },
+    "commentary": {
+        # content.crickapi.com - getBallFeeds
+        "timeout": httpx.Timeout(10.0, connect=3.0),
+        "limits": httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0),
+    },
+}
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClientRegistry:
+    """Holds one keep-alive AsyncClient per upstream provider.
+
+    Clients are created lazily on first use (or eagerly via start()) and closed
+    by aclose() from the FastAPI lifespan hook.
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Dict]] = None):
+        self.settings = settings or PROVIDER_SETTINGS
+        self.http2 = _http2_available()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _create_client(self, provider: str) -> httpx.AsyncClient:
+        config = self.settings.get(provider, {})
+        return httpx.AsyncClient(
+            http2=self.http2,
+            timeout=config.get("timeout", httpx.Timeout(10.0, connect=3.0)),
+            limits=config.get("limits", httpx.Limits(max_connections=20, max_keepalive_connections=10)),
+        )
+
+    def get(self, provider: str) -> httpx.AsyncClient:
+        """Get the shared client for a provider, creating it if needed"""
+        client = self._clients.get(provider)
+        if client is None or client.is_closed:
+            client = self._create_client(provider)
+            self._clients[provider] = client
+        return client
+
+    async def start(self):
+        """Create all configured clients up front"""
+        for provider in self.settings:
+            self.get(provider)
+        print(f"HTTP client registry started (http2={self.http2}, providers={list(self.settings)})")
+
+    async def aclose(self):
+        """Close all clients and their connection pools"""
+        for provider, client in list(self._clients.items()):
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"Error closing HTTP client for {provider}: {e}")
+        self._clients.clear()
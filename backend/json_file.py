@@ -0,0 +1,55 @@
+"""
+Atomic, versioned JSON file writes for small runtime-learned registries
+Each write goes to a temp file that is renamed over the target, off the event
+loop when one is running; writes finishing out of order never replace newer data
+"""
+import asyncio
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+
+class JSONFileWriter:
+    """Writes successive versions of one JSON document to `path`.
+
+    schedule() numbers each document; write() skips any version older than the
+    one already on disk, since executor threads may finish in any order.
+    """
+
+    def __init__(self, path: Optional[str], label: str):
+        self.path = path
+        self.label = label
+        self._lock = threading.Lock()
+        self._version = 0
+        self._saved_version = 0
+        self.writes = 0
+        self.errors = 0
+
+    def schedule(self, data: Dict):
+        """Write `data` in the background (or inline with no running loop)"""
+        if not self.path:
+            return
+        self._version += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.write(data, self._version)
+            return
+        loop.run_in_executor(None, self.write, data, self._version)
+
+    def write(self, data: Dict, version: int):
+        """Write one version to disk (blocking); temp file plus rename so a crash never truncates it"""
+        try:
+            with self._lock:
+                if version < self._saved_version:
+                    return
+                self._saved_version = version
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.path)
+                self.writes += 1
+        except OSError as e:
+            self.errors += 1
+            print(f"[{self.label}] could not save {self.path}: {e}")
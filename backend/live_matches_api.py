@@ -6,25 +6,34 @@ import httpx
 import re
 from typing import List, Dict, Optional
 from datetime import datetime
-from team_mapping import get_team_info, map_team_code, get_team_flag, get_team_short_name
+from team_mapping import get_team_info, map_team_code, get_team_flag, get_team_short_name, team_registry
+from venue_directory import venue_directory
+from http_clients import HTTPClientRegistry
 
 LIVE_MATCHES_API_URL = "https://api-v1.com/w/liveMatches2.php"
+MATCH_STATISTICS_API_URL = "https://api-v1.com/w/sV3.php"
 
 
 class LiveMatchesAPI:
     """Service for interacting with Live Matches API"""
 
+    def __init__(self, clients: Optional[HTTPClientRegistry] = None):
+        self.clients = clients or HTTPClientRegistry()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self.clients.get("live_matches")
+
     async def get_live_matches(self) -> List[Dict]:
         """Get list of live/current matches"""
-        async with httpx.AsyncClient() as client:
-            response = await client.get(LIVE_MATCHES_API_URL, timeout=30.0)
-            response.raise_for_status()
-            data = response.json()
-            # The API returns a dict where keys are match IDs and values are match data
-            matches = []
-            for match_id, match_data in data.items():
-                matches.append({**match_data, "_id": match_id})
-            return matches
+        response = await self.client.get(LIVE_MATCHES_API_URL)
+        response.raise_for_status()
+        data = response.json()
+        # The API returns a dict where keys are match IDs and values are match data
+        matches = []
+        for match_id, match_data in data.items():
+            matches.append({**match_data, "_id": match_id})
+        return matches
 
     def parse_score(self, score_str: str) -> Optional[Dict]:
         """Parse score string like '300/8(50.0' to {runs, wickets, overs}"""
@@ -123,9 +132,10 @@ class LiveMatchesAPI:
         else:
             date_str = datetime.now().isoformat()
         
-        # Get venue code (v) - we'll use it as venue for now
+        # Venue code (v), named from the venue directory
         venue_code = match_data.get("v", "")
-        venue = venue_code  # You may want to map venue codes to names
+        venue_directory.note_match(match_id, venue_code)
+        venue = venue_directory.resolve(venue_code)
         
         # Get result/reservation text
         result = match_data.get("res", "")
@@ -140,7 +150,9 @@ class LiveMatchesAPI:
             "team2": team2,
             "team1Logo": team1_logo,
             "team2Logo": team2_logo,
-            "venue": venue,
+            "venue": venue["name"],
+            "venueCode": venue["code"] or None,
+            "venueLocation": venue["location"],
             "status": status,
             "date": date_str,
             "format": format_type,
@@ -162,16 +174,14 @@ class LiveMatchesAPI:
     async def get_match_statistics(self, match_id: str) -> Optional[Dict]:
         """Get detailed match statistics for a specific match"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    "https://api-v1.com/w/sV3.php",
-                    params={"key": match_id},
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                # The API returns a dict with match statistics
-                return data
+            response = await self.client.get(
+                MATCH_STATISTICS_API_URL,
+                params={"key": match_id}
+            )
+            response.raise_for_status()
+            data = response.json()
+            # The API returns a dict with match statistics
+            return data
         except Exception as e:
             print(f"Error fetching match statistics for {match_id}: {e}")
             return None
@@ -210,6 +220,8 @@ class LiveMatchesAPI:
         team_codes = stats_data.get("a", "").split(".") if stats_data.get("a") else []
         team1_code = team_codes[0] if len(team_codes) > 0 else stats_data.get("b", "Team 1")
         team2_code = team_codes[1] if len(team_codes) > 1 else stats_data.get("c", "Team 2")
+        # Statistics may name teams the code table does not know yet
+        team_registry.learn_from_statistics(stats_data, team1_code, team2_code)
         
         # Map team codes to full team names
         team1_info = get_team_info(team1_code)
@@ -261,9 +273,8 @@ class LiveMatchesAPI:
         else:
             date_str = datetime.now().isoformat()
         
-        # Get venue code
-        venue_code = stats_data.get("v", "")
-        venue = venue_code
+        # Venue, backfilling the directory from this payload
+        venue = venue_directory.backfill(match_id, stats_data)
         
         # Get result
         result = stats_data.get("res", "")
@@ -278,7 +289,9 @@ class LiveMatchesAPI:
             "team2": team2,
             "team1Logo": team1_logo,
             "team2Logo": team2_logo,
-            "venue": venue,
+            "venue": venue["name"],
+            "venueCode": venue["code"] or None,
+            "venueLocation": venue["location"],
             "status": status,
             "date": date_str,
             "format": format_type,
@@ -1,18 +1,90 @@
-from fastapi import FastAPI, HTTPException, Depends, Header
+from fastapi import FastAPI, HTTPException, Depends, Header, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
 from datetime import datetime
+from contextlib import asynccontextmanager
+import asyncio
 import os
 import re
-import httpx
+import uuid
 from dotenv import load_dotenv
 from supabase import create_client, Client
+from postgrest.types import ReturnMethod
+from http_clients import HTTPClientRegistry
+from cricapi_commentary import CricAPICommentary
+from cache import TTLCache
+from ball_parser import transform_feed
+from singleflight import SingleFlight
+from delivery_store import public_delivery
+from match_state import MatchStateStore
+from poller import LiveMatchPoller
+from broadcaster import MatchBroadcaster, StreamEvent
+from responses import EncodedResponseCache
+from db import SupabaseExecutor
+from metrics import EventLoopLagMonitor
+from write_behind import CommentWriteBehind, VoteWriteBehind
+from comment_threads import COMMENT_SORTS, CommentThreads
+from circuit_breaker import CircuitBreaker, FallbackChain
+from ranked_comments import RankedCommentIndex
+from snapshot import MatchSnapshot, SnapshotWriter
+from delivery_sink import DeliverySink
+from timeline import EVENT_TYPES, GlobalTimeline, decode_timeline_cursor, encode_timeline_cursor
+from user_loader import UserLoader
+from team_mapping import team_registry
+from venue_directory import venue_directory
+from player_stats_engine import PlayerStatsEngine, PlayerStatsSink
+from analytics import MatchColumns, match_analytics
+from InternationalT20GameOutcomePredictor import DEFAULT_MODEL_PATH, WinProbabilityModel, WinProbabilityService
 
 load_dotenv()
 
-app = FastAPI(title="CricBase API", version="1.0.0")
+# Pooled upstream HTTP clients shared by all providers for the app lifetime
+http_clients = HTTPClientRegistry()
+
+# Supabase queries run on this bounded thread pool, never on the event loop
+db = SupabaseExecutor(max_workers=int(os.getenv("SUPABASE_MAX_WORKERS", "16")))
+loop_lag = EventLoopLagMonitor()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_clients.start()
+    await loop_lag.start()
+    if WRITE_BEHIND_ENABLED:
+        await vote_buffer.start()
+        await comment_buffer.start()
+    if live_poller and PLAYER_STATS_ENABLED and await load_player_ids():
+        await player_stats_sink.start()
+    if snapshot_writer:
+        # Serve the last known state (stale but valid) until the first polls land
+        if await match_snapshot.load(match_store):
+            histories = [state.deliveries for state in match_store.matches.values() if state.deliveries is not None]
+            delivery_timeline.rebuild(histories)
+            await player_stats_engine.rebuild(histories)
+        await snapshot_writer.start()
+    if live_poller:
+        if DELIVERY_SINK_ENABLED:
+            await delivery_sink.start()
+        await live_poller.start()
+    yield
+    if live_poller:
+        await live_poller.stop()
+    await delivery_sink.stop()
+    await player_stats_sink.stop()
+    if snapshot_writer:
+        await snapshot_writer.stop()
+    # Drain buffered writes before the database pool goes away
+    await comment_buffer.stop()
+    await vote_buffer.stop()
+    await loop_lag.stop()
+    await http_clients.aclose()
+    db.shutdown()
+
+
+app = FastAPI(title="CricBase API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -21,6 +93,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
 
 # Supabase client
@@ -42,7 +115,7 @@ cricket_data_api_key = os.getenv("CRICKET_DATA_API_KEY")
 if cricket_data_api_key:
     try:
         from cricket_data_api import CricketDataAPI
-        cricket_api = CricketDataAPI(api_key=cricket_data_api_key)
+        cricket_api = CricketDataAPI(api_key=cricket_data_api_key, clients=http_clients)
         print("Cricket Data API initialized successfully.")
     except (ValueError, ImportError) as e:
         print(f"Warning: Could not initialize Cricket Data API: {e}. Proceeding without external API.")
@@ -53,12 +126,148 @@ else:
 # Initialize Live Matches API (preferred for live matches)
 try:
     from live_matches_api import LiveMatchesAPI
-    live_matches_api = LiveMatchesAPI()
+    live_matches_api = LiveMatchesAPI(clients=http_clients)
     print("Live Matches API initialized successfully.")
 except ImportError as e:
     print(f"Warning: Could not initialize Live Matches API: {e}. Proceeding without it.")
     live_matches_api = None
 
+commentary_api = CricAPICommentary(clients=http_clients)
+
+# Short-lived cache for the transformed match lists, keyed by (provider, status, ...)
+matches_cache = TTLCache(
+    name="matches",
+    ttl=float(os.getenv("MATCHES_CACHE_TTL", "5")),
+    stale_ttl=float(os.getenv("MATCHES_CACHE_STALE_TTL", "30")),
+)
+
+# Per-provider breakers for the match list chain (Live Matches API -> Cricket Data API -> mock)
+def provider_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        failure_rate=float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+        slow_call_ms=float(os.getenv("BREAKER_SLOW_CALL_MS", "3000")),
+        open_seconds=float(os.getenv("BREAKER_OPEN_SECONDS", "30")),
+    )
+
+live_matches_breaker = provider_breaker("live_matches")
+cricket_data_breaker = provider_breaker("cricket_data")
+match_list_chain = FallbackChain("match list", hedging=os.getenv("UPSTREAM_HEDGING", "0") == "1")
+
+# Coalesces concurrent per-match upstream fetches keyed by (endpoint, match_id, lastDocId)
+upstream_flight = SingleFlight("upstream")
+
+# Per-match state written by the background poller and read by the request handlers
+match_store = MatchStateStore()
+DELIVERIES_PAGE_SIZE = 50
+
+# Live T20/ODI win probabilities, loaded once and scored in batch on each poll tick
+win_probability = WinProbabilityService(WinProbabilityModel.load(os.getenv("WIN_MODEL_PATH", DEFAULT_MODEL_PATH)))
+
+# Fan-out of newly ingested deliveries and score changes to stream subscribers
+match_broadcaster = MatchBroadcaster(max_queue=int(os.getenv("STREAM_QUEUE_SIZE", "256")))
+STREAM_KEEPALIVE_SECONDS = 15
+
+# Encoded JSON bodies per (endpoint, params), reused until the underlying data version changes
+response_cache = EncodedResponseCache("responses", max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")))
+
+
+# Votes and new comments are acknowledged immediately and written to Supabase in
+# batches (WRITE_BEHIND_ENABLED=0 writes each one synchronously instead)
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1") == "1"
+
+async def flush_votes(rows: List[dict]):
+    await db.execute(
+        supabase.table("comment_votes").upsert(rows, on_conflict="comment_id,user_id", returning=ReturnMethod.minimal),
+        "comment_votes.upsert_batch"
+    )
+
+async def flush_comments(rows: List[dict]):
+    await db.execute(
+        supabase.table("comments").insert(rows, returning=ReturnMethod.minimal), "comments.insert_batch"
+    )
+
+vote_buffer = VoteWriteBehind(
+    flush_votes,
+    max_batch=int(os.getenv("WRITE_BEHIND_MAX_BATCH", "500")),
+    flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.25")),
+)
+comment_buffer = CommentWriteBehind(
+    flush_comments,
+    max_batch=int(os.getenv("WRITE_BEHIND_MAX_BATCH", "500")),
+    flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.25")),
+)
+
+# Comment threads: keyset-paginated roots, replies loaded COMMENT_REPLY_DEPTH levels deep,
+# first pages of hot deliveries materialized for a few seconds
+COMMENTS_PAGE_SIZE = 50
+COMMENTS_MAX_PAGE_SIZE = 200
+COMMENT_REPLY_DEPTH = int(os.getenv("COMMENT_REPLY_DEPTH", "2"))
+comments_cache = TTLCache(
+    name="comments",
+    ttl=float(os.getenv("COMMENTS_CACHE_TTL", "5")),
+    stale_ttl=float(os.getenv("COMMENTS_CACHE_STALE_TTL", "30")),
+)
+RANKED_SEED_PAGE_SIZE = 1000  # PostgREST's default max rows per response
+
+async def load_ranked_roots(delivery_id: str) -> List[dict]:
+    """All root comments of a delivery with their tallies (plus buffered writes), for the ranked index"""
+    rows: List[dict] = []
+    last_id = None
+    while True:
+        query = supabase.table("comments").select("id,upvotes,downvotes").eq("delivery_id", delivery_id).is_("parent_id", "null")
+        if last_id:
+            query = query.gt("id", last_id)
+        result = await db.execute(query.order("id").limit(RANKED_SEED_PAGE_SIZE), "comments.rank_seed")
+        page = result.data or []
+        rows.extend(page)
+        if len(page) < RANKED_SEED_PAGE_SIZE:
+            break
+        last_id = page[-1]["id"]
+    for row in rows:
+        up, down = vote_buffer.tally_delta(row["id"])
+        row["upvotes"] = (row.get("upvotes") or 0) + up
+        row["downvotes"] = (row.get("downvotes") or 0) + down
+    stored = {row["id"] for row in rows}
+    rows.extend(
+        {"id": row["id"], "upvotes": 0, "downvotes": 0}
+        for row, _ in comment_buffer.pending_for(delivery_id=delivery_id)
+        if not row.get("parent_id") and row["id"] not in stored
+    )
+    return rows
+
+# Root comments of recently read deliveries ranked by Wilson score, for sort=best
+ranked_comments = RankedCommentIndex(
+    load_ranked_roots,
+    max_deliveries=int(os.getenv("RANKED_COMMENTS_MAX_DELIVERIES", "256")),
+    refresh_interval=float(os.getenv("RANKED_COMMENTS_REFRESH_INTERVAL", "300")),
+)
+
+async def fetch_users(user_ids: List[str]) -> List[dict]:
+    result = await db.execute(
+        supabase.table("users").select("id,username,email,avatar,created_at").in_("id", user_ids),
+        "users.by_id"
+    )
+    return result.data or []
+
+# Comment authors, batched per event-loop tick and shared across responses
+user_loader = UserLoader(
+    fetch_users,
+    max_entries=int(os.getenv("USER_CACHE_MAX_ENTRIES", "5000")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "300")),
+)
+
+comment_threads = CommentThreads(
+    db,
+    supabase,
+    vote_buffer,
+    comment_buffer,
+    comments_cache,
+    ranked_comments,
+    user_loader,
+    replies_per_parent=int(os.getenv("COMMENT_REPLIES_PER_PARENT", "10")),
+)
+
 
 security = HTTPBearer()
 
@@ -77,12 +286,15 @@ class Match(BaseModel):
     team1Logo: Optional[str] = None
     team2Logo: Optional[str] = None
     venue: str
+    venueCode: Optional[str] = None
+    venueLocation: Optional[str] = None
     status: str  # 'live', 'completed', 'upcoming'
     date: str
     format: str  # 'T20', 'ODI', 'Test'
     score: Optional[dict] = None
     currentOver: Optional[int] = None
     currentBall: Optional[int] = None
+    winProbability: Optional[dict] = None  # {'team1': p, 'team2': 1 - p} while live
 
 class Delivery(BaseModel):
     id: str
@@ -100,6 +312,10 @@ class Delivery(BaseModel):
     timestamp: str
     commentCount: int = 0
 
+# Validate/dump once per data version on the pre-encoded response paths
+match_adapter = TypeAdapter(Match)
+match_list_adapter = TypeAdapter(List[Match])
+
 class Comment(BaseModel):
     id: str
     deliveryId: str
@@ -110,7 +326,8 @@ class Comment(BaseModel):
     upvotes: int = 0
     downvotes: int = 0
     parentId: Optional[str] = None
-    replies: Optional[List['Comment']] = None
+    replies: Optional[List['Comment']] = None  # None: not loaded, see /comments/{id}/replies
+    hasMoreReplies: Optional[bool] = None
     userVote: Optional[str] = None
 
 class CommentCreate(BaseModel):
@@ -149,51 +366,217 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         "createdAt": datetime.now().isoformat()
     }
 
+async def fetch_live_match_list(status: Optional[str] = None) -> List[dict]:
+    """Transformed Live Matches API list; the upstream call runs through the breaker, uncached,
+    so a hedge that loses the race cancels the request itself"""
+    # The unfiltered list is shared across statuses while it is fresh
+    matches = matches_cache.get(("live_matches", None))
+    if matches is None:
+        api_matches = await live_matches_breaker.call(live_matches_api.get_live_matches)
+        print(f"Fetched {len(api_matches)} matches from Live Matches API")
+        matches = [live_matches_api.transform_match_to_schema(match) for match in api_matches]
+        matches_cache.set(("live_matches", None), matches)
+    if status:
+        return [m for m in matches if m.get("status") == status]
+    return matches
+
+async def fetch_cricket_data_match_list(status: Optional[str] = None, offset: int = 0) -> List[dict]:
+    """Transformed Cricket Data API list; the upstream call runs through the breaker, uncached"""
+    if status == "live":
+        api_matches = await cricket_data_breaker.call(lambda: cricket_api.get_current_matches(offset=offset))
+    else:
+        api_matches = await cricket_data_breaker.call(lambda: cricket_api.get_all_matches(offset=offset))
+    
+    matches = [cricket_api.transform_match_to_schema(match) for match in api_matches]
+    
+    # Filter by status if needed (for non-live requests)
+    if status and status != "live":
+        matches = [m for m in matches if m.get("status") == status]
+    
+    print(f"Fetched {len(matches)} matches from Cricket Data API")
+    return matches
+
+# Deliveries ingested by the poller, upserted into the deliveries table in batches
+DELIVERY_SINK_ENABLED = os.getenv("DELIVERY_SINK_ENABLED", "1") == "1"
+
+async def flush_deliveries(rows: List[dict]):
+    # Keyed on '{match_id}_{feed_id}', so re-polled balls rewrite the same rows
+    await db.execute(
+        supabase.table("deliveries").upsert(rows, on_conflict="id", returning=ReturnMethod.minimal),
+        "deliveries.upsert"
+    )
+
+delivery_sink = DeliverySink(
+    "deliveries",
+    flush_deliveries,
+    max_batch=int(os.getenv("DELIVERY_SINK_MAX_BATCH", "500")),
+    flush_interval=float(os.getenv("DELIVERY_SINK_FLUSH_INTERVAL", "1")),
+)
+
+# Running per-player totals folded from ingested balls, upserted per (player, match)
+PLAYER_STATS_ENABLED = os.getenv("PLAYER_STATS_ENABLED", "1") == "1"
+
+async def flush_player_stats(rows: List[dict]):
+    # Absolute per-match totals; the player_match_stats trigger rolls the change into player_stats
+    await db.execute(
+        supabase.table("player_match_stats").upsert(
+            rows, on_conflict="player_id,match_id", returning=ReturnMethod.minimal
+        ),
+        "player_match_stats.upsert"
+    )
+
+player_stats_sink = PlayerStatsSink(
+    "player_stats",
+    flush_player_stats,
+    max_batch=int(os.getenv("PLAYER_STATS_MAX_BATCH", "500")),
+    flush_interval=float(os.getenv("PLAYER_STATS_FLUSH_INTERVAL", "5")),
+)
+player_stats_engine = PlayerStatsEngine(player_stats_sink, match_store)
+PLAYER_IDS_PAGE_SIZE = 1000
+
+async def load_player_ids() -> bool:
+    """Seed the engine with the ids of existing player_stats rows; without them writes would duplicate players"""
+    try:
+        rows = []
+        while True:
+            result = await db.execute(
+                supabase.table("player_stats").select("player_id,player_name")
+                .order("player_id").range(len(rows), len(rows) + PLAYER_IDS_PAGE_SIZE - 1),
+                "player_stats.ids"
+            )
+            rows.extend(result.data)
+            if len(result.data) < PLAYER_IDS_PAGE_SIZE:
+                break
+    except Exception as e:
+        print(f"Error loading player ids, player stats will not be written: {e}")
+        return False
+    print(f"Loaded {player_stats_engine.seed_player_ids(rows)} player ids from player_stats")
+    return True
+
+# Latest balls across all matches for /deliveries/feed, filled by the poller
+FEED_MAX_PAGE_SIZE = 200
+delivery_timeline = GlobalTimeline(
+    capacity=int(os.getenv("FEED_TIMELINE_CAPACITY", "5000")),
+    type_capacity=int(os.getenv("FEED_TIMELINE_TYPE_CAPACITY", "1000")),
+)
+
+# Local snapshot of match_store, restored on startup (disable with SNAPSHOT_ENABLED=0)
+match_snapshot = MatchSnapshot(
+    os.getenv("SNAPSHOT_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "match_snapshot.sqlite3")),
+    max_bytes=int(float(os.getenv("SNAPSHOT_MAX_MB", "64")) * 1024 * 1024),
+    max_age=float(os.getenv("SNAPSHOT_MAX_AGE", str(6 * 3600))),
+)
+snapshot_writer = None
+if os.getenv("SNAPSHOT_ENABLED", "1") == "1":
+    snapshot_writer = SnapshotWriter(match_snapshot, match_store, interval=float(os.getenv("SNAPSHOT_INTERVAL", "60")))
+
+# Background poller keeping match_store warm (disable with LIVE_POLLER_ENABLED=0)
+live_poller = None
+if live_matches_api and os.getenv("LIVE_POLLER_ENABLED", "1") == "1":
+    live_poller = LiveMatchPoller(
+        live_matches_api,
+        commentary_api,
+        match_store,
+        transform_feed=transform_feed,
+        flight=upstream_flight,
+        broadcaster=match_broadcaster,
+        sink=delivery_sink,
+        timeline=delivery_timeline,
+        player_stats=player_stats_engine,
+        win_probability=win_probability,
+    )
+
+def parse_event_id(value: Optional[str]) -> int:
+    """Feed id from a Last-Event-ID value ('1768145205762' or 'V6C_1768145205762')"""
+    if not value:
+        return 0
+    try:
+        return int(str(value).rsplit("_", 1)[-1])
+    except ValueError:
+        return 0
+
+def stream_replay(match_id: str, last_event_id: int) -> List[StreamEvent]:
+    """Deliveries missed since last_event_id, for stream resume"""
+    state = match_store.get(match_id)
+    if not last_event_id or state is None or state.deliveries is None:
+        return []
+    return [
+        StreamEvent("delivery", public_delivery(delivery), id=parse_event_id(delivery["id"]))
+        for delivery in state.deliveries.since(last_event_id)
+    ]
+
 # Routes
 @app.get("/")
 async def root():
     return {"message": "CricBase API", "version": "1.0.0"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """In-process cache and upstream metrics"""
+    return {
+        "matchesCache": matches_cache.stats(),
+        "commentsCache": comments_cache.stats(),
+        "rankedComments": ranked_comments.stats(),
+        "users": user_loader.stats(),
+        "upstreamSingleFlight": upstream_flight.stats(),
+        "upstreamBreakers": {
+            "liveMatches": live_matches_breaker.stats(),
+            "cricketData": cricket_data_breaker.stats(),
+            "matchListChain": match_list_chain.stats(),
+        },
+        "matchStore": match_store.stats(),
+        "timeline": delivery_timeline.stats(),
+        "playerStats": player_stats_engine.stats(),
+        "winProbability": win_probability.stats(),
+        "teams": team_registry.stats(),
+        "venues": venue_directory.stats(),
+        "snapshot": match_snapshot.stats() if snapshot_writer else None,
+        "poller": live_poller.stats() if live_poller else None,
+        "streams": match_broadcaster.stats(),
+        "responses": response_cache.stats(),
+        "supabase": db.stats(),
+        "eventLoopLag": loop_lag.stats(),
+        "writeBehind": {
+            "votes": vote_buffer.stats(),
+            "comments": comment_buffer.stats(),
+            "deliveries": delivery_sink.stats(),
+            "playerStats": player_stats_sink.stats(),
+        },
+    }
+
 @app.get("/matches", response_model=List[Match])
-async def get_matches(status: Optional[str] = None, offset: int = 0):
+async def get_matches(request: Request, status: Optional[str] = None, offset: int = 0):
     """Get all matches, optionally filtered by status. Uses Live Matches API preferentially."""
+    # Serve from the poller-maintained store when it is warm, encoded once per list version
+    stored_response = response_cache.respond(
+        request,
+        ("matches", status),
+        match_store.list_version,
+        lambda: match_store.get_match_list(status),
+        adapter=match_list_adapter,
+    )
+    if stored_response is not None:
+        return stored_response
+    
     try:
-        # Try Live Matches API first (preferred for live matches)
+        # Live Matches API first (preferred for live matches), then Cricket Data API.
+        # Providers with an open breaker are skipped immediately; with UPSTREAM_HEDGING=1
+        # the next provider also starts once the current one runs past its p95 latency.
+        # The whole chain is the cached (shared) load, so the hedged calls inside it are
+        # plain upstream requests and the losing one is really cancelled.
+        providers = []
         if live_matches_api:
-            try:
-                api_matches = await live_matches_api.get_live_matches()
-                
-                # Transform API matches to our schema
-                matches = [live_matches_api.transform_match_to_schema(match) for match in api_matches]
-                
-                # Filter by status if needed
-                if status:
-                    matches = [m for m in matches if m.get("status") == status]
-                
-                print(f"Fetched {len(matches)} matches from Live Matches API")
-                return matches
-            except Exception as api_error:
-                print(f"Error calling Live Matches API: {api_error}. Trying Cricket Data API.")
-        
-        # Fallback to Cricket Data API
+            providers.append(("Live Matches API", live_matches_breaker, lambda: fetch_live_match_list(status)))
         if cricket_api:
+            providers.append(("Cricket Data API", cricket_data_breaker, lambda: fetch_cricket_data_match_list(status, offset)))
+        if providers:
             try:
-                if status == "live":
-                    api_matches = await cricket_api.get_current_matches(offset=offset)
-                else:
-                    api_matches = await cricket_api.get_all_matches(offset=offset)
-                
-                # Transform API matches to our schema
-                matches = [cricket_api.transform_match_to_schema(match) for match in api_matches]
-                
-                # Filter by status if needed (for non-live requests)
-                if status and status != "live":
-                    matches = [m for m in matches if m.get("status") == status]
-                
-                print(f"Fetched {len(matches)} matches from Cricket Data API")
-                return matches
+                matches = await matches_cache.get_or_load(
+                    ("matches", status, offset), lambda: match_list_chain.run(providers)
+                )
+                return response_cache.encoded(request, matches, adapter=match_list_adapter)
             except Exception as api_error:
-                print(f"Error calling Cricket Data API: {api_error}. Falling back to Supabase.")
+                print(f"Error calling match list providers: {api_error}. Falling back to Supabase.")
         
         # Fallback to Supabase
         # query = supabase.table("matches").select("*")
@@ -225,15 +608,31 @@ async def get_matches(status: Optional[str] = None, offset: int = 0):
         return get_mock_matches(status)
 
 @app.get("/matches/{match_id}", response_model=Match)
-async def get_match(match_id: str):
+async def get_match(request: Request, match_id: str):
     """Get a specific match by ID. Calls Live Matches API statistics endpoint."""
+    # Serve from the poller-maintained store when it has this match
+    state = match_store.get(match_id)
+    if state is not None and state.statistics is not None:
+        scored = win_probability.get(match_id)
+        return response_cache.respond(
+            request,
+            ("match", match_id),
+            (state.statistics_version, scored[0] if scored else None),
+            lambda: {**state.statistics, "winProbability": scored[1]} if scored else state.statistics,
+            adapter=match_adapter,
+        )
+    
     try:
         # Try Live Matches API statistics endpoint first
         if live_matches_api:
             try:
-                stats_data = await live_matches_api.get_match_statistics(match_id)
+                stats_data = await upstream_flight.do(
+                    ("match_statistics", match_id, None),
+                    lambda: live_matches_api.get_match_statistics(match_id)
+                )
                 if stats_data:
                     transformed = live_matches_api.transform_match_statistics_to_schema(stats_data, match_id)
+                    transformed["winProbability"] = win_probability.predict_match(transformed)
                     print(f"Fetched match {match_id} statistics from Live Matches API")
                     return transformed
             except Exception as api_error:
@@ -254,7 +653,7 @@ async def get_match(match_id: str):
                 print(f"Error calling Cricket Data API for match {match_id}: {api_error}. Falling back to Supabase.")
         
         # Fallback to Supabase
-        result = supabase.table("matches").select("*").eq("id", match_id).execute()
+        result = await db.execute(supabase.table("matches").select("*").eq("id", match_id), "matches.get")
         if result.data:
             item = result.data[0]
             # Convert snake_case to camelCase
@@ -279,44 +678,156 @@ async def get_match(match_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching match: {str(e)}")
 
+@app.get("/matches/{match_id}/stream")
+async def stream_match(request: Request, match_id: str, last_event_id: Optional[str] = Header(None)):
+    """Server-Sent Events stream of new deliveries and score changes for a match.
+
+    Resumes from the Last-Event-ID header (a delivery feed id).
+    """
+    subscription = match_broadcaster.subscribe(match_id)
+    resume_from = parse_event_id(last_event_id)
+
+    async def event_stream():
+        try:
+            last_sent = resume_from
+            for event in stream_replay(match_id, resume_from):
+                last_sent = event.id
+                yield event.to_sse()
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event.id is not None:
+                    # Skip anything already sent during replay
+                    if event.id <= last_sent:
+                        continue
+                    last_sent = event.id
+                yield event.to_sse()
+        finally:
+            match_broadcaster.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/matches/{match_id}/ws")
+async def stream_match_ws(websocket: WebSocket, match_id: str, last_event_id: Optional[str] = None):
+    """WebSocket variant of the match stream; resume with ?last_event_id=<feed id>"""
+    await websocket.accept()
+    subscription = match_broadcaster.subscribe(match_id)
+    resume_from = parse_event_id(last_event_id)
+    try:
+        last_sent = resume_from
+        for event in stream_replay(match_id, resume_from):
+            last_sent = event.id
+            await websocket.send_json(event.to_dict())
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=STREAM_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                # Also surfaces closed sockets while the match is quiet
+                await websocket.send_json({"event": "keep-alive"})
+                continue
+            if event.id is not None:
+                if event.id <= last_sent:
+                    continue
+                last_sent = event.id
+            await websocket.send_json(event.to_dict())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        match_broadcaster.unsubscribe(subscription)
+
+def delivery_from_row(item: dict) -> dict:
+    """Delivery response dict from a deliveries row (snake_case to camelCase)"""
+    return {
+        "id": item.get("id"),
+        "matchId": item.get("match_id"),
+        "over": item.get("over"),
+        "ball": item.get("ball"),
+        "bowler": item.get("bowler"),
+        "batsman": item.get("batsman"),
+        "runs": item.get("runs", 0),
+        "isWicket": item.get("is_wicket", False),
+        "wicketType": item.get("wicket_type"),
+        "isFour": item.get("is_four", False),
+        "isSix": item.get("is_six", False),
+        "description": item.get("description"),
+        "timestamp": item.get("timestamp") or item.get("created_at"),
+        "commentCount": (item.get("comment_count") or 0) + comment_buffer.pending_count(item.get("id"))
+    }
+
 @app.get("/deliveries/feed", response_model=List[Delivery])
-async def get_deliveries_feed(limit: int = 20):
-    """Get recent deliveries for the feed"""
+async def get_deliveries_feed(
+    response: Response,
+    limit: int = 20,
+    before: Optional[str] = None,
+    type: Optional[str] = None
+):
+    """Get the latest balls across all matches, newest first.
+
+    Args:
+        limit: Deliveries per page
+        before: X-Next-Cursor header value from the previous page
+            ('<timestamp_ms>,<delivery id>')
+        type: Comma-separated event types to include: wicket, six, four
+    """
+    if not 1 <= limit <= FEED_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {FEED_MAX_PAGE_SIZE}")
+    types = [t.strip() for t in type.split(",") if t.strip()] if type else []
+    unknown = [t for t in types if t not in EVENT_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"type must be one of {', '.join(EVENT_TYPES)}")
     try:
-        result = supabase.table("deliveries").select("*").order("timestamp", desc=True).limit(limit).execute()
-        # Convert snake_case to camelCase for response
-        deliveries = []
-        for item in result.data:
-            delivery = {
-                "id": item.get("id"),
-                "matchId": item.get("match_id"),
-                "over": item.get("over"),
-                "ball": item.get("ball"),
-                "bowler": item.get("bowler"),
-                "batsman": item.get("batsman"),
-                "runs": item.get("runs", 0),
-                "isWicket": item.get("is_wicket", False),
-                "wicketType": item.get("wicket_type"),
-                "isFour": item.get("is_four", False),
-                "isSix": item.get("is_six", False),
-                "description": item.get("description"),
-                "timestamp": item.get("timestamp") or item.get("created_at"),
-                "commentCount": item.get("comment_count", 0)
-            }
-            deliveries.append(delivery)
+        before_key = decode_timeline_cursor(before)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Served from the in-memory timeline whenever the poller is feeding it
+    if live_poller is not None:
+        deliveries, next_key = delivery_timeline.page(before_key, limit, types)
+        if next_key is not None:
+            response.headers["X-Next-Cursor"] = encode_timeline_cursor(next_key)
         return deliveries
+
+    try:
+        # Newest balls across all matches, served by idx_deliveries_feed
+        result = await db.execute(
+            supabase.table("deliveries").select("*").eq("is_commentary", False)
+            .order("timestamp", desc=True).limit(limit),
+            "deliveries.feed"
+        )
+        return [delivery_from_row(item) for item in result.data]
     except Exception as e:
         # Return mock data for development
         return get_mock_deliveries()
 
 @app.get("/deliveries/match/{match_id}", response_model=List[Delivery])
-async def get_match_deliveries(match_id: str, last_doc_id: Optional[int] = None):
+async def get_match_deliveries(request: Request, match_id: str, last_doc_id: Optional[int] = None, limit: int = DELIVERIES_PAGE_SIZE):
     """Get deliveries for a specific match. Calls CricAPI Commentary API directly.
     
     Args:
         match_id: The match ID
         last_doc_id: Optional last document ID for pagination (from the last delivery's id field)
+        limit: Page size when served from the ingested history
     """
+    # Serve from the poller-maintained history when it covers the requested page.
+    # The store encodes the page itself, once per history version.
+    state = match_store.get(match_id)
+    if state is not None and state.deliveries is not None:
+        stored_response = response_cache.respond(
+            request,
+            ("deliveries", match_id, last_doc_id or None, limit),
+            state.deliveries.version,
+            lambda: match_store.get_deliveries_json(match_id, before=last_doc_id or None, limit=limit),
+        )
+        if stored_response is not None:
+            return stored_response
+    
     try:
         # Extract numeric ID from last_doc_id if it's a string like "V6C_1768145205762"
         last_doc_id_numeric = None
@@ -327,277 +838,161 @@ async def get_match_deliveries(match_id: str, last_doc_id: Optional[int] = None)
             else:
                 last_doc_id_numeric = int(last_doc_id)
         
-        # Call CricAPI Commentary API directly
-        payload = {
-            "matchKey": match_id,
-            "lastDocId": last_doc_id_numeric or 0,
-            "filters": {
-                "highlights": False,
-                "overs": False,
-                "wickets": False,
-                "sixes": False,
-                "fours": False,
-                "firstInning": False,
-                "secondInning": False,
-                "milestones": False,
-                "thirdInning": False,
-                "fourthInning": False
-            }
-        }
+        # Call CricAPI Commentary API, sharing the call with concurrent requests for the same page
+        data = await upstream_flight.do(
+            ("ball_feeds", match_id, last_doc_id_numeric),
+            lambda: commentary_api.get_feed_items(match_id, last_doc_id=last_doc_id_numeric)
+        )
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://content.crickapi.com/commentary/getBallFeeds",
-                json=payload,
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Filter for ball deliveries (type: "b") and text commentary (type: "t")
-            ball_feeds = [item for item in data if item.get("type") in ["b", "t"]]
-            
-            # Transform ball feeds to Delivery schema
-            deliveries = []
-            for ball_feed in ball_feeds:
-                feed_type = ball_feed.get("type", "")
-                
-                # Handle text commentary (type: "t")
-                if feed_type == "t":
-                    # Get description from "c" field (HTML content)
-                    description = ball_feed.get("c", "")
-                    description = re.sub(r'<[^>]+>', '', description)
-                    description = description.replace('&nbsp;', ' ')
-                    description = description.replace('&lt;', '<').replace('&gt;', '>')
-                    
-                    # Get timestamp from id (it's a timestamp in milliseconds)
-                    feed_id = ball_feed.get("id", 0)
-                    timestamp = datetime.fromtimestamp(feed_id / 1000).isoformat() if feed_id else datetime.now().isoformat()
-                    
-                    # Generate delivery ID from match_id and feed_id
-                    delivery_id = f"{match_id}_{feed_id}"
-                    
-                    # Use over from "on" field if available, otherwise use -1 for text items
-                    over = ball_feed.get("on", -1) if ball_feed.get("on", -1) >= 0 else 0
-                    ball = 0
-                    
-                    deliveries.append({
-                        "id": delivery_id,
-                        "matchId": match_id,
-                        "over": over,
-                        "ball": ball,
-                        "bowler": "",
-                        "batsman": "",
-                        "runs": 0,
-                        "isWicket": False,
-                        "wicketType": None,
-                        "isFour": False,
-                        "isSix": False,
-                        "description": description,
-                        "timestamp": timestamp,
-                        "commentCount": 0,
-                        "_type": "commentary"  # Mark as commentary type
-                    })
-                    continue
-                
-                # Handle ball deliveries (type: "b")
-                # Parse over and ball from "o" field (e.g., "48.4" -> over: 48, ball: 4)
-                over_ball = ball_feed.get("o", "")
-                over = 0
-                ball = 0
-                if over_ball:
-                    try:
-                        over_ball_parts = over_ball.split(".")
-                        over = int(over_ball_parts[0]) if over_ball_parts[0] else 0
-                        ball = int(over_ball_parts[1]) if len(over_ball_parts) > 1 and over_ball_parts[1] else 0
-                    except (ValueError, IndexError):
-                        pass
-                
-                # Parse runs from "b" field (e.g., "4", "1", "0+1")
-                runs_str = ball_feed.get("b", "0")
-                runs = 0
-                is_four = False
-                is_six = False
-                try:
-                    if "+" in runs_str:
-                        runs = int(runs_str.split("+")[0])
-                    else:
-                        runs = int(runs_str)
-                    is_four = runs == 4
-                    is_six = runs == 6
-                except (ValueError, AttributeError):
-                    runs = 0
-                
-                # Parse wicket info - check for explicit wicket indicators
-                # Only mark as wicket if there's a clear wicket indication AND runs are 0
-                # This prevents 6-run deliveries from being incorrectly marked as wickets
-                is_wicket = False
-                wicket_type = None
-                
-                # Check for explicit wicket field or clear wicket indicators
-                commentary_lower = str(ball_feed.get("c2", "")).lower()
-                
-                # Look for explicit wicket indicators (not just the word "wicket" which might appear in other contexts)
-                wicket_indicators = [
-                    "wicket!", "wicket.", "wicket,", "wicket:", "wicket;",
-                    "bowled", "caught", "lbw", "leg before wicket", "run out", "stumped",
-                    "dismissed", "out!", "out.", "out,", "out:", "out;"
-                ]
-                
-                # Check if any wicket indicator appears in commentary
-                has_wicket_indicator = any(indicator in commentary_lower for indicator in wicket_indicators)
-                
-                # Mark as wicket ONLY if:
-                # 1. There's a clear wicket indicator AND runs are 0 (wickets have 0 runs)
-                # 2. OR is_catch_drop is explicitly True
-                # This ensures 6-run deliveries are never marked as wickets
-                if runs == 0 and has_wicket_indicator:
-                    is_wicket = True
-                elif ball_feed.get("is_catch_drop", False) == True:
-                    is_wicket = True
-                
-                if is_wicket:
-                    if "bowled" in commentary_lower:
-                        wicket_type = "bowled"
-                    elif "caught" in commentary_lower:
-                        wicket_type = "caught"
-                    elif "lbw" in commentary_lower or "leg before" in commentary_lower:
-                        wicket_type = "lbw"
-                    elif "run out" in commentary_lower:
-                        wicket_type = "run out"
-                    elif "stumped" in commentary_lower:
-                        wicket_type = "stumped"
-                
-                # Parse bowler and batsman from "c1" field (e.g., "K Clarke to K Rahul")
-                bowler = ""
-                batsman = ""
-                c1 = ball_feed.get("c1", "")
-                if c1 and " to " in c1:
-                    parts = c1.split(" to ")
-                    bowler = parts[0].strip() if len(parts) > 0 else ""
-                    batsman = parts[1].strip() if len(parts) > 1 else ""
-                
-                # Get description from "c2" field (HTML content)
-                description = ball_feed.get("c2", "")
-                description = re.sub(r'<[^>]+>', '', description)
-                description = description.replace('&nbsp;', ' ')
-                
-                # Get timestamp from id (it's a timestamp in milliseconds)
-                feed_id = ball_feed.get("id", 0)
-                timestamp = datetime.fromtimestamp(feed_id / 1000).isoformat() if feed_id else datetime.now().isoformat()
-                
-                # Generate delivery ID from match_id and feed_id
-                delivery_id = f"{match_id}_{feed_id}"
-                
-                # Only add ball deliveries if over > 0 or (over == 0 and ball > 0)
-                if over > 0 or (over == 0 and ball > 0):
-                    deliveries.append({
-                        "id": delivery_id,
-                        "matchId": match_id,
-                        "over": over,
-                        "ball": ball,
-                        "bowler": bowler,
-                        "batsman": batsman,
-                        "runs": runs,
-                        "isWicket": is_wicket,
-                        "wicketType": wicket_type,
-                        "isFour": is_four,
-                        "isSix": is_six,
-                        "description": description,
-                        "timestamp": timestamp,
-                        "commentCount": 0
-                    })
-            
-            # Sort by timestamp (most recent first for reverse chronological order)
-            # For items with same timestamp, sort by over and ball
-            deliveries.sort(key=lambda x: (x.get("timestamp", ""), x.get("over", 0), x.get("ball", 0)), reverse=True)
-            
-            print(f"Fetched {len(deliveries)} deliveries from CricAPI Commentary for match {match_id} (lastDocId: {last_doc_id_numeric})")
-            return deliveries
-            
+        deliveries = transform_feed(data, match_id)
+        
+        print(f"Fetched {len(deliveries)} deliveries from CricAPI Commentary for match {match_id} (lastDocId: {last_doc_id_numeric})")
+        return deliveries
+
     except Exception as e:
         print(f"Error calling CricAPI Commentary API: {e}")
         raise HTTPException(status_code=500, detail=f"Error fetching match deliveries: {str(e)}")
 
+ANALYTICS_PAGE_SIZE = 1000
+
+def match_format(state) -> Optional[str]:
+    for source in (state.summary, state.statistics) if state is not None else ():
+        if source and source.get("format"):
+            return source["format"]
+    return None
+
+@app.get("/matches/{match_id}/analytics")
+async def get_match_analytics(request: Request, match_id: str):
+    """Per-innings run rate per over, Manhattan and worm series, partnerships and phase splits"""
+    state = match_store.get(match_id)
+    fmt = match_format(state)
+    if state is not None and state.deliveries is not None and len(state.deliveries):
+        history = state.deliveries
+        return response_cache.respond(
+            request,
+            ("analytics", match_id),
+            (history.version, fmt),
+            lambda: {
+                "matchId": match_id,
+                "format": fmt,
+                "innings": match_analytics(MatchColumns.from_store(history), fmt),
+            },
+        )
+
+    # Not polled here: use the ingested rows, oldest first
+    try:
+        rows = []
+        while True:
+            result = await db.execute(
+                supabase.table("deliveries")
+                .select("over,ball,runs,is_wicket,is_four,is_six,bowler,batsman,is_commentary")
+                .eq("match_id", match_id).order("timestamp")
+                .range(len(rows), len(rows) + ANALYTICS_PAGE_SIZE - 1),
+                "deliveries.analytics"
+            )
+            rows.extend(result.data)
+            if len(result.data) < ANALYTICS_PAGE_SIZE:
+                break
+    except Exception as e:
+        print(f"Error loading deliveries for analytics of match {match_id}: {e}")
+        raise HTTPException(status_code=500, detail="Error loading match deliveries")
+    if not rows:
+        raise HTTPException(status_code=404, detail="No deliveries for this match")
+    deliveries = [
+        {
+            "over": row.get("over") or 0,
+            "ball": row.get("ball") or 0,
+            "runs": row.get("runs") or 0,
+            "isWicket": row.get("is_wicket"),
+            "isFour": row.get("is_four"),
+            "isSix": row.get("is_six"),
+            "bowler": row.get("bowler"),
+            "batsman": row.get("batsman"),
+            "_type": "commentary" if row.get("is_commentary") else None,
+            "_catchDrop": row.get("is_catch_drop"),
+        }
+        for row in rows
+    ]
+    return {
+        "matchId": match_id,
+        "format": fmt,
+        "innings": match_analytics(MatchColumns.from_deliveries(deliveries), fmt),
+    }
+
 @app.get("/deliveries/{delivery_id}", response_model=Delivery)
 async def get_delivery(delivery_id: str):
     """Get a specific delivery by ID"""
     try:
-        result = supabase.table("deliveries").select("*").eq("id", delivery_id).execute()
+        result = await db.execute(supabase.table("deliveries").select("*").eq("id", delivery_id), "deliveries.get")
         if result.data:
-            item = result.data[0]
-            # Convert snake_case to camelCase
-            delivery = {
-                "id": item.get("id"),
-                "matchId": item.get("match_id"),
-                "over": item.get("over"),
-                "ball": item.get("ball"),
-                "bowler": item.get("bowler"),
-                "batsman": item.get("batsman"),
-                "runs": item.get("runs", 0),
-                "isWicket": item.get("is_wicket", False),
-                "wicketType": item.get("wicket_type"),
-                "isFour": item.get("is_four", False),
-                "isSix": item.get("is_six", False),
-                "description": item.get("description"),
-                "timestamp": item.get("timestamp") or item.get("created_at"),
-                "commentCount": item.get("comment_count", 0)
-            }
-            return delivery
+            return delivery_from_row(result.data[0])
         raise HTTPException(status_code=404, detail="Delivery not found")
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching delivery: {str(e)}")
 
+def comment_page_params(sort: str, limit: int, depth: Optional[int]) -> int:
+    """Validate shared comment paging parameters; returns the reply depth to load"""
+    if sort not in COMMENT_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(COMMENT_SORTS)}")
+    if not 1 <= limit <= COMMENTS_MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {COMMENTS_MAX_PAGE_SIZE}")
+    if depth is None:
+        return COMMENT_REPLY_DEPTH
+    return max(0, min(depth, COMMENT_REPLY_DEPTH))
+
 @app.get("/deliveries/{delivery_id}/comments", response_model=List[Comment])
-async def get_comments(delivery_id: str):
-    """Get all comments for a delivery, organized in a thread structure"""
+async def get_comments(
+    delivery_id: str,
+    response: Response,
+    sort: str = "new",
+    limit: int = COMMENTS_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    depth: Optional[int] = None
+):
+    """Get a page of root comments for a delivery with their replies nested.
+
+    Args:
+        sort: "new" (newest first), "top" (upvotes - downvotes) or "best"
+            (Wilson score lower bound, served from the ranked index)
+        limit: Root comments per page
+        cursor: X-Next-Cursor header value from the previous page
+        depth: Reply levels to include (up to COMMENT_REPLY_DEPTH); deeper
+            replies have replies=null and load from /comments/{id}/replies
+    """
+    depth = comment_page_params(sort, limit, depth)
     try:
-        result = supabase.table("comments").select("*, user:users(*)").eq("delivery_id", delivery_id).order("created_at", desc=False).execute()
-        comments = result.data
-        
-        # Convert user data from snake_case to camelCase
-        for comment in comments:
-            user_data = comment.get("user", {})
-            if user_data and isinstance(user_data, dict):
-                comment["user"] = {
-                    "id": user_data.get("id"),
-                    "username": user_data.get("username"),
-                    "email": user_data.get("email"),
-                    "avatar": user_data.get("avatar"),
-                    "createdAt": user_data.get("created_at")
-                }
-        
-        # Organize comments into thread structure
-        comment_map = {}
-        root_comments = []
-        
-        for comment in comments:
-            comment_obj = {
-                "id": comment["id"],
-                "deliveryId": comment["delivery_id"],
-                "userId": comment["user_id"],
-                "user": comment.get("user", {}),
-                "content": comment["content"],
-                "createdAt": comment["created_at"],
-                "upvotes": comment.get("upvotes", 0),
-                "downvotes": comment.get("downvotes", 0),
-                "parentId": comment.get("parent_id"),
-                "replies": []
-            }
-            comment_map[comment["id"]] = comment_obj
-            
-            if comment.get("parent_id"):
-                if comment["parent_id"] in comment_map:
-                    comment_map[comment["parent_id"]]["replies"].append(comment_obj)
-            else:
-                root_comments.append(comment_obj)
-        
-        return root_comments
+        comments, next_cursor = await comment_threads.root_page(delivery_id, sort, limit, cursor, depth)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
+        print(f"Error fetching comments for delivery {delivery_id}: {e}")
         # Return mock data for development
         return get_mock_comments()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return comments
+
+@app.get("/comments/{comment_id}/replies", response_model=List[Comment])
+async def get_comment_replies(
+    comment_id: str,
+    response: Response,
+    limit: int = COMMENTS_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    depth: Optional[int] = None
+):
+    """Get a page of replies to a comment (oldest first), for threads deeper than the initial load"""
+    depth = max(comment_page_params("new", limit, depth), 1)
+    try:
+        replies, next_cursor = await comment_threads.replies_page(comment_id, limit, cursor, depth)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching replies: {str(e)}")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return replies
 
 @app.post("/deliveries/{delivery_id}/comments", response_model=Comment)
 async def create_comment(
@@ -616,13 +1011,6 @@ async def create_comment(
             "downvotes": 0,
             "created_at": datetime.now().isoformat()
         }
-        result = supabase.table("comments").insert(comment).execute()
-        
-        # Update delivery comment count
-        delivery_result = supabase.table("deliveries").select("comment_count").eq("id", delivery_id).execute()
-        current_count = delivery_result.data[0].get("comment_count", 0) if delivery_result.data else 0
-        supabase.table("deliveries").update({"comment_count": current_count + 1}).eq("id", delivery_id).execute()
-        
         user_obj = {
             "id": current_user["id"],
             "username": current_user.get("username", "user"),
@@ -631,8 +1019,21 @@ async def create_comment(
             "createdAt": current_user.get("createdAt", datetime.now().isoformat())
         }
         
+        if comment_buffer.running:
+            # Acknowledge now; the row is inserted with the next batch
+            comment["id"] = str(uuid.uuid4())
+            await comment_buffer.add(comment, user_obj)
+            comment_id = comment["id"]
+        else:
+            # deliveries.comment_count is incremented by a trigger in the same transaction
+            result = await db.execute(supabase.table("comments").insert(comment), "comments.insert")
+            comment_id = result.data[0]["id"]
+        if not comment_data.parentId:
+            ranked_comments.add_comment(delivery_id, comment_id)
+        delivery_timeline.add_comment(delivery_id)
+        
         return {
-            "id": result.data[0]["id"],
+            "id": comment_id,
             "deliveryId": delivery_id,
             "userId": current_user["id"],
             "user": user_obj,
@@ -653,31 +1054,29 @@ async def vote_comment(
     current_user: dict = Depends(get_current_user)
 ):
     """Vote on a comment (upvote or downvote)"""
+    if vote_data.vote not in ("up", "down"):
+        raise HTTPException(status_code=400, detail="vote must be 'up' or 'down'")
     try:
-        # Check if user already voted
-        existing_vote = supabase.table("comment_votes").select("*").eq("comment_id", comment_id).eq("user_id", current_user["id"]).execute()
-        
-        if existing_vote.data:
-            # Update existing vote
-            supabase.table("comment_votes").update({"vote": vote_data.vote}).eq("comment_id", comment_id).eq("user_id", current_user["id"]).execute()
-        else:
-            # Create new vote
-            supabase.table("comment_votes").insert({
-                "comment_id": comment_id,
-                "user_id": current_user["id"],
-                "vote": vote_data.vote
-            }).execute()
-        
-        # Update comment vote counts
-        upvotes = supabase.table("comment_votes").select("*", count="exact").eq("comment_id", comment_id).eq("vote", "up").execute()
-        downvotes = supabase.table("comment_votes").select("*", count="exact").eq("comment_id", comment_id).eq("vote", "down").execute()
+        if vote_buffer.running:
+            # Coalesced per (comment, user) and upserted with the next batch
+            up_delta, down_delta = await vote_buffer.vote(comment_id, current_user["id"], vote_data.vote)
+            ranked_comments.apply_vote(comment_id, up_delta, down_delta)
+            return {"success": True, "pending": True}
         
-        supabase.table("comments").update({
-            "upvotes": len(upvotes.data) if upvotes.data else 0,
-            "downvotes": len(downvotes.data) if downvotes.data else 0
-        }).eq("id", comment_id).execute()
+        # Upsert the vote and adjust the tallies atomically in one round trip
+        result = await db.execute(
+            supabase.rpc("cast_comment_vote", {
+                "p_comment_id": comment_id,
+                "p_user_id": current_user["id"],
+                "p_vote": vote_data.vote
+            }),
+            "comments.vote"
+        )
+        tally = result.data[0] if result.data else {}
+        if tally:
+            ranked_comments.set_tally(comment_id, tally.get("upvotes") or 0, tally.get("downvotes") or 0)
         
-        return {"success": True}
+        return {"success": True, "upvotes": tally.get("upvotes", 0), "downvotes": tally.get("downvotes", 0)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -685,7 +1084,7 @@ async def vote_comment(
 async def get_player_stats():
     """Get player statistics"""
     try:
-        result = supabase.table("player_stats").select("*").order("runs", desc=True).limit(50).execute()
+        result = await db.execute(supabase.table("player_stats").select("*").order("runs", desc=True).limit(50), "player_stats.list")
         # Convert snake_case to camelCase
         players = []
         for item in result.data:
@@ -709,7 +1108,7 @@ async def get_player_stats():
 async def get_team_stats():
     """Get team statistics"""
     try:
-        result = supabase.table("team_stats").select("*").order("wins", desc=True).execute()
+        result = await db.execute(supabase.table("team_stats").select("*").order("wins", desc=True), "team_stats.list")
         # Convert snake_case to camelCase
         teams = []
         for item in result.data:
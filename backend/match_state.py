@@ -0,0 +1,132 @@
+"""
+In-memory per-match state store
+Filled by the background poller, read by the request handlers without any upstream call
+"""
+import time
+from typing import Dict, Iterable, List, Optional
+
+from delivery_store import DeliveryStore, delivery_feed_id
+
+
+class MatchState:
+    """Latest known data for one match"""
+
+    def __init__(self, match_id: str):
+        self.match_id = match_id
+        self.summary: Optional[Dict] = None      # entry from the transformed match list
+        self.statistics: Optional[Dict] = None   # transformed sV3 statistics
+        self.deliveries: Optional[DeliveryStore] = None
+        self.status: str = "upcoming"
+        self.updated_at: float = 0.0
+        self.deliveries_updated_at: float = 0.0
+        self.statistics_version = 0  # bumped when the statistics change
+
+    def to_dict(self) -> Dict:
+        return {
+            "matchId": self.match_id,
+            "status": self.status,
+            "hasStatistics": self.statistics is not None,
+            "deliveries": len(self.deliveries) if self.deliveries is not None else None,
+            "updatedAt": self.updated_at,
+            "deliveriesUpdatedAt": self.deliveries_updated_at,
+        }
+
+
+class MatchStateStore:
+    """Per-match state plus the match list, pre-split by status for O(1) reads"""
+
+    def __init__(self):
+        self.matches: Dict[str, MatchState] = {}
+        self._match_list: Optional[List[Dict]] = None
+        self._match_list_by_status: Dict[str, List[Dict]] = {}
+        self.list_updated_at: float = 0.0
+        self.list_version = 0  # bumped when the match list changes
+
+    def _state(self, match_id: str) -> MatchState:
+        state = self.matches.get(match_id)
+        if state is None:
+            state = MatchState(match_id)
+            self.matches[match_id] = state
+        return state
+
+    def get(self, match_id: str) -> Optional[MatchState]:
+        return self.matches.get(match_id)
+
+    def has_match_list(self) -> bool:
+        return self._match_list is not None
+
+    def set_match_list(self, matches: List[Dict]):
+        """Replace the match list, refresh per-match summaries and drop matches no longer listed"""
+        by_status: Dict[str, List[Dict]] = {}
+        listed = {match["id"] for match in matches}
+        for match_id in [m for m in self.matches if m not in listed]:
+            del self.matches[match_id]
+        for match in matches:
+            status = match.get("status", "upcoming")
+            by_status.setdefault(status, []).append(match)
+            state = self._state(match["id"])
+            state.summary = match
+            state.status = status
+            state.updated_at = time.time()
+        if matches != self._match_list:
+            self.list_version += 1
+        self._match_list = matches
+        self._match_list_by_status = by_status
+        self.list_updated_at = time.time()
+
+    def get_match_list(self, status: Optional[str] = None) -> Optional[List[Dict]]:
+        """Match list (optionally by status), or None if it was never loaded"""
+        if self._match_list is None:
+            return None
+        if status:
+            return self._match_list_by_status.get(status, [])
+        return self._match_list
+
+    def set_statistics(self, match_id: str, statistics: Dict):
+        state = self._state(match_id)
+        if statistics != state.statistics:
+            state.statistics_version += 1
+        state.statistics = statistics
+        state.status = statistics.get("status", state.status)
+        state.updated_at = time.time()
+
+    def get_statistics(self, match_id: str) -> Optional[Dict]:
+        state = self.matches.get(match_id)
+        return state.statistics if state else None
+
+    def delivery_history(self, match_id: str) -> DeliveryStore:
+        state = self._state(match_id)
+        if state.deliveries is None:
+            state.deliveries = DeliveryStore(match_id)
+        return state.deliveries
+
+    def merge_deliveries(self, match_id: str, deliveries: List[Dict], feed_ids: Iterable[int] = ()) -> List[Dict]:
+        """Merge newly fetched deliveries into the match history; returns the new ones"""
+        history = self.delivery_history(match_id)
+        history.advance(feed_ids)
+        added = history.merge(deliveries)
+        self._state(match_id).deliveries_updated_at = time.time()
+        return added
+
+    def get_deliveries(self, match_id: str, before: Optional[int] = None, limit: int = 50) -> Optional[List[Dict]]:
+        """Newest-first page of a match's deliveries, or None if not covered by the store"""
+        state = self.matches.get(match_id)
+        if state is None or state.deliveries is None:
+            return None
+        return state.deliveries.page(before, limit)
+
+    def get_deliveries_json(self, match_id: str, before: Optional[int] = None, limit: int = 50) -> Optional[bytes]:
+        """Same page as get_deliveries, already encoded as a JSON array"""
+        state = self.matches.get(match_id)
+        if state is None or state.deliveries is None:
+            return None
+        return state.deliveries.page_json(before, limit)
+
+    def stats(self) -> Dict:
+        return {
+            "matches": len(self.matches),
+            "listLoaded": self._match_list is not None,
+            "listUpdatedAt": self.list_updated_at,
+            "withStatistics": sum(1 for s in self.matches.values() if s.statistics is not None),
+            "withDeliveries": sum(1 for s in self.matches.values() if s.deliveries is not None),
+        }
@@ -0,0 +1,91 @@
+"""
+Lightweight in-process latency metrics
+Fixed-bucket histograms and an event-loop lag monitor, reported via /metrics
+"""
+import asyncio
+import time
+from typing import Dict, Optional, Sequence
+
+# Upper bounds in milliseconds; the last bucket counts everything slower
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Cumulative fixed-bucket latency histogram (milliseconds)"""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float):
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        for i, bound in enumerate(self.buckets_ms):
+            if ms <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None if empty or past the last bucket)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bound in enumerate(self.buckets_ms):
+            seen += self.counts[i]
+            if seen >= rank:
+                return bound
+        return None
+
+    def to_dict(self) -> Dict:
+        buckets = {f"le{bound:g}": count for bound, count in zip(self.buckets_ms, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avgMs": round(self.total_ms / self.count, 3) if self.count else None,
+            "maxMs": round(self.max_ms, 3),
+            "p50Ms": self.quantile(0.5),
+            "p99Ms": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+class EventLoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task.
+
+    Anything blocking the loop (sync I/O, heavy CPU in a handler) shows up as lag.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        self.interval = interval
+        self.histogram = LatencyHistogram()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - started - self.interval
+            self.histogram.observe(max(lag, 0.0) * 1000)
+
+    def stats(self) -> Dict:
+        return self.histogram.to_dict()
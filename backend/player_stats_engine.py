@@ -0,0 +1,267 @@
+"""
+Streaming per-player aggregation over ingested deliveries
+Every ball updates running batting and bowling totals for its batsman and
+bowler in O(1); the per-match totals are queued as absolute rows and upserted
+into player_match_stats, whose trigger folds the change into player_stats
+"""
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from match_state import MatchStateStore
+from write_behind import WriteBehindBuffer
+
+# Ids for players not in player_stats yet: stable across restarts and instances,
+# derived from the name the feed uses
+PLAYER_NAMESPACE = uuid.UUID("5b0f6c1e-8a3d-4f57-9c0e-6d2a7e4b9c31")
+
+# Extras that are not legal deliveries and are charged to the bowler
+BOWLER_EXTRAS = frozenset({"wide", "no ball"})
+
+# Dismissals not credited to the bowler
+NON_BOWLER_WICKETS = frozenset({"run out"})
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(name.lower().split())
+
+
+def player_id(name: str) -> str:
+    return str(uuid.uuid5(PLAYER_NAMESPACE, normalize_name(name)))
+
+
+class PlayerMatchTotals:
+    """One player's running totals in one match"""
+
+    __slots__ = (
+        "player_id", "player_name", "match_id",
+        "runs", "balls_faced", "fours", "sixes", "dismissals",
+        "wickets", "runs_conceded", "legal_deliveries",
+    )
+
+    def __init__(self, player_id: str, player_name: str, match_id: str):
+        self.player_id = player_id
+        self.player_name = player_name
+        self.match_id = match_id
+        self.runs = 0
+        self.balls_faced = 0
+        self.fours = 0
+        self.sixes = 0
+        self.dismissals = 0
+        self.wickets = 0
+        self.runs_conceded = 0
+        self.legal_deliveries = 0
+
+    @property
+    def average(self) -> float:
+        return self.runs / self.dismissals if self.dismissals else float(self.runs)
+
+    @property
+    def strike_rate(self) -> float:
+        return self.runs * 100 / self.balls_faced if self.balls_faced else 0.0
+
+    @property
+    def economy(self) -> Optional[float]:
+        return self.runs_conceded * 6 / self.legal_deliveries if self.legal_deliveries else None
+
+    def to_row(self) -> Dict:
+        return {
+            "player_id": self.player_id,
+            "match_id": self.match_id,
+            "player_name": self.player_name,
+            "runs": self.runs,
+            "balls_faced": self.balls_faced,
+            "fours": self.fours,
+            "sixes": self.sixes,
+            "dismissals": self.dismissals,
+            "wickets": self.wickets,
+            "runs_conceded": self.runs_conceded,
+            "legal_deliveries": self.legal_deliveries,
+        }
+
+
+class PlayerStatsSink(WriteBehindBuffer):
+    """Write-behind buffer of player_match_stats rows keyed by (player id, match id)"""
+
+    # Rows are absolute totals with no foreign keys; a newer row supersedes a failed one anyway
+    split_failed_batches = False
+
+
+class PlayerStatsEngine:
+    """Folds the delivery stream into per-(player, match) totals.
+
+    Rows are absolute per-match totals and the database applies only the
+    difference, so a row may only be written once it covers the whole match:
+    a partial row would lower the player's career totals. Rows of a match are
+    held until its delivery history is complete (backfilled to the start of
+    the feed) and released in full by release(). Player ids come from the
+    existing player_stats rows (seed_player_ids) so known players are not
+    duplicated; unknown names get a stable uuid5.
+    """
+
+    def __init__(self, sink: Optional[PlayerStatsSink] = None, store: Optional[MatchStateStore] = None):
+        self.sink = sink
+        self.store = store
+        # match id -> player id -> totals
+        self._totals: Dict[str, Dict[str, PlayerMatchTotals]] = {}
+        # normalized name -> player id
+        self._player_ids: Dict[str, str] = {}
+        # Matches with rows not written yet because their history is incomplete
+        self._held = set()
+        self.seeded_ids = 0
+        self.balls = 0
+        self.extras = 0
+
+    def seed_player_ids(self, rows: Iterable[Dict]) -> int:
+        """Use the ids of existing player_stats rows ({player_id, player_name}) for those names"""
+        for row in rows:
+            if row.get("player_id") and row.get("player_name"):
+                self._player_ids.setdefault(normalize_name(row["player_name"]), str(row["player_id"]))
+        self.seeded_ids = len(self._player_ids)
+        return self.seeded_ids
+
+    def player_id(self, name: str) -> str:
+        key = normalize_name(name)
+        pid = self._player_ids.get(key)
+        if pid is None:
+            pid = player_id(name)
+            self._player_ids[key] = pid
+        return pid
+
+    def _player(self, name: str, match_id: str) -> PlayerMatchTotals:
+        players = self._totals.get(match_id)
+        if players is None:
+            players = self._totals[match_id] = {}
+        pid = self.player_id(name)
+        totals = players.get(pid)
+        if totals is None:
+            totals = players[pid] = PlayerMatchTotals(pid, name, match_id)
+        return totals
+
+    def _apply(
+        self,
+        match_id: str,
+        bowler: str,
+        batsman: str,
+        runs: int,
+        extra: Optional[str],
+        extra_runs: int,
+        is_wicket: bool,
+        wicket_type: Optional[str],
+    ) -> Tuple[Optional[PlayerMatchTotals], Optional[PlayerMatchTotals]]:
+        """Fold in one ball; `extra` is the parser's 'wide', 'no ball' or 'bye'"""
+        self.balls += 1
+        if extra:
+            self.extras += 1
+        batting = bowling = None
+        if batsman:
+            batting = self._player(batsman, match_id)
+            batting.runs += runs
+            if extra != "wide":
+                batting.balls_faced += 1
+            if runs == 4:
+                batting.fours += 1
+            elif runs == 6:
+                batting.sixes += 1
+            if is_wicket:
+                batting.dismissals += 1
+        if bowler:
+            bowling = self._player(bowler, match_id)
+            # Wides and no-balls are charged to the bowler with their extras; byes are not
+            bowling.runs_conceded += runs + (extra_runs if extra in BOWLER_EXTRAS else 0)
+            if extra not in BOWLER_EXTRAS:
+                bowling.legal_deliveries += 1
+            if is_wicket and wicket_type not in NON_BOWLER_WICKETS:
+                bowling.wickets += 1
+        return batting, bowling
+
+    async def add(self, deliveries: Iterable[Dict]):
+        """Fold newly ingested deliveries in and queue the changed rows"""
+        changed: Dict[Tuple[str, str], PlayerMatchTotals] = {}
+        for delivery in deliveries:
+            if delivery.get("_type") == "commentary":
+                continue
+            for totals in self._apply(
+                delivery["matchId"],
+                delivery.get("bowler") or "",
+                delivery.get("batsman") or "",
+                delivery.get("runs", 0),
+                delivery.get("_extra"),
+                delivery.get("_extraRuns", 0),
+                # A dropped catch is flagged as a wicket by the feed but dismisses no one
+                bool(delivery.get("isWicket")) and not delivery.get("_catchDrop"),
+                delivery.get("wicketType"),
+            ):
+                if totals is not None:
+                    changed[(totals.player_id, totals.match_id)] = totals
+        await self._queue(changed.values())
+
+    async def rebuild(self, histories: Iterable) -> int:
+        """Fold in whole DeliveryStore histories (e.g. restored from a snapshot); returns balls added"""
+        changed: Dict[Tuple[str, str], PlayerMatchTotals] = {}
+        before = self.balls
+        for history in histories:
+            for index in range(len(history)):
+                view = history.view(index)
+                if view.is_commentary:
+                    continue
+                for totals in self._apply(
+                    history.match_id, view.bowler, view.batsman, view.runs, view.extra, view.extra_runs,
+                    view.is_wicket and not view.is_catch_drop, view.wicket_type,
+                ):
+                    if totals is not None:
+                        changed[(totals.player_id, totals.match_id)] = totals
+        await self._queue(changed.values())
+        return self.balls - before
+
+    def _complete(self, match_id: str) -> bool:
+        if self.store is None:
+            return True
+        state = self.store.get(match_id)
+        history = state.deliveries if state is not None else None
+        # Backfilled to the start of the feed with no delta gap left open
+        return history is not None and history.complete and not history.gaps
+
+    async def _queue(self, changed: Iterable[PlayerMatchTotals]):
+        if self.sink is None or not self.sink.running:
+            return
+        complete: Dict[str, bool] = {}
+        for totals in changed:
+            match_id = totals.match_id
+            if match_id not in complete:
+                complete[match_id] = self._complete(match_id)
+            if not complete[match_id]:
+                self._held.add(match_id)
+                continue
+            await self.sink.put((totals.player_id, match_id), totals.to_row())
+
+    async def release(self, match_id: str):
+        """Queue every row of a match held back while its history was incomplete"""
+        if match_id not in self._held or not self._complete(match_id):
+            return
+        self._held.discard(match_id)
+        await self._queue(list(self._totals.get(match_id, {}).values()))
+
+    def prune(self) -> List[str]:
+        """Drop the totals of matches no longer in the store; returns their ids"""
+        if self.store is None:
+            return []
+        dropped = [match_id for match_id in self._totals if self.store.get(match_id) is None]
+        for match_id in dropped:
+            del self._totals[match_id]
+            self._held.discard(match_id)
+        return dropped
+
+    def match_totals(self, match_id: str) -> Dict[str, PlayerMatchTotals]:
+        """Totals of every player seen in a match, by player id"""
+        return dict(self._totals.get(match_id, {}))
+
+    def stats(self) -> Dict:
+        return {
+            "matches": len(self._totals),
+            "players": len({pid for players in self._totals.values() for pid in players}),
+            "rows": sum(len(players) for players in self._totals.values()),
+            "heldMatches": len(self._held),
+            "seededIds": self.seeded_ids,
+            "balls": self.balls,
+            "extras": self.extras,
+        }
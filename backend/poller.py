@@ -0,0 +1,316 @@
+"""
+Background live-match poller
+Polls liveMatches2.php and per-match statistics/ball feeds on an adaptive
+interval and writes the results into the MatchStateStore
+"""
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Optional
+
+from broadcaster import MatchBroadcaster, StreamEvent
+from delivery_sink import DeliverySink
+from timeline import GlobalTimeline
+from player_stats_engine import PlayerStatsEngine
+from InternationalT20GameOutcomePredictor import WinProbabilityService
+from delivery_store import DeliveryStore, public_delivery
+from match_state import MatchStateStore, delivery_feed_id
+from singleflight import SingleFlight
+
+# Seconds between polls of one match, by match status
+POLL_INTERVALS = {
+    "live": float(os.getenv("POLL_INTERVAL_LIVE", "5")),
+    "upcoming": float(os.getenv("POLL_INTERVAL_UPCOMING", "120")),
+    "completed": float(os.getenv("POLL_INTERVAL_COMPLETED", "300")),
+}
+# Match list refresh interval while any match is live, and otherwise
+LIST_INTERVAL_LIVE = float(os.getenv("POLL_LIST_INTERVAL_LIVE", "5"))
+LIST_INTERVAL_IDLE = float(os.getenv("POLL_LIST_INTERVAL_IDLE", "30"))
+# Live matches with no new balls (drinks, innings break, rain) back off up to this
+LIVE_IDLE_MAX_INTERVAL = float(os.getenv("POLL_LIVE_IDLE_MAX_INTERVAL", "30"))
+# Upper bound on pages fetched to close a gap after a long outage
+MAX_GAP_PAGES = 5
+
+
+class LiveMatchPoller:
+    """Keeps the MatchStateStore warm so request handlers never wait on upstreams"""
+
+    def __init__(
+        self,
+        live_api,
+        commentary_api,
+        store: MatchStateStore,
+        transform_feed: Callable[[List[Dict], str], List[Dict]],
+        flight: Optional[SingleFlight] = None,
+        broadcaster: Optional[MatchBroadcaster] = None,
+        sink: Optional[DeliverySink] = None,
+        timeline: Optional[GlobalTimeline] = None,
+        player_stats: Optional[PlayerStatsEngine] = None,
+        win_probability: Optional[WinProbabilityService] = None,
+        concurrency: int = 8,
+    ):
+        self.live_api = live_api
+        self.commentary_api = commentary_api
+        self.store = store
+        self.transform_feed = transform_feed
+        self.flight = flight or SingleFlight("poller")
+        self.broadcaster = broadcaster
+        self.sink = sink
+        self.timeline = timeline
+        self.player_stats = player_stats
+        self.win_probability = win_probability
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._next_list_poll = 0.0
+        self._next_poll: Dict[str, float] = {}
+        self._idle_polls: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self.ticks = 0
+        self.match_polls = 0
+        self.errors = 0
+        self.gaps_opened = 0
+        self.gaps_closed = 0
+
+    async def start(self):
+        if self._task is None:
+            self._stopping = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            print("Live match poller started")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping.set()
+        try:
+            await asyncio.wait_for(self._task, timeout=10)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+        print("Live match poller stopped")
+
+    def interval_for(self, match_id: str, status: str) -> float:
+        """Adaptive poll interval: fast for live overs, backing off when nothing changes"""
+        interval = POLL_INTERVALS.get(status, POLL_INTERVALS["upcoming"])
+        if status == "live":
+            idle = self._idle_polls.get(match_id, 0)
+            interval = min(interval * (2 ** min(idle, 3)), max(interval, LIVE_IDLE_MAX_INTERVAL))
+        return interval
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await self.tick()
+            except Exception as e:
+                self.errors += 1
+                print(f"Poller tick failed: {e}")
+
+            now = time.monotonic()
+            next_due = min([self._next_list_poll, *self._next_poll.values()])
+            delay = min(max(next_due - now, 0.5), LIST_INTERVAL_IDLE)
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def tick(self):
+        """Refresh the match list if due, then poll every match whose interval elapsed"""
+        self.ticks += 1
+        now = time.monotonic()
+        if now >= self._next_list_poll:
+            await self.poll_match_list()
+
+        due = [match_id for match_id in self.store.matches if self._next_poll.get(match_id, 0.0) <= now]
+        if due:
+            await asyncio.gather(*(self._poll_match_guarded(match_id) for match_id in due))
+        if self.win_probability is not None:
+            # One batch for every live match whose score moved, after this tick's polls landed
+            self.win_probability.score(self.store)
+
+    async def poll_match_list(self):
+        try:
+            api_matches = await self.flight.do(("live_matches", None, None), self.live_api.get_live_matches)
+        except Exception as e:
+            self.errors += 1
+            self._next_list_poll = time.monotonic() + LIST_INTERVAL_LIVE
+            print(f"Poller: error fetching live matches: {e}")
+            return
+
+        matches = [self.live_api.transform_match_to_schema(match) for match in api_matches]
+        self.store.set_match_list(matches)
+
+        # Forget schedules for matches that dropped off the list
+        for match_id in [m for m in self._next_poll if m not in self.store.matches]:
+            self._next_poll.pop(match_id, None)
+            self._idle_polls.pop(match_id, None)
+        if self.player_stats is not None:
+            self.player_stats.prune()
+
+        any_live = any(match.get("status") == "live" for match in matches)
+        self._next_list_poll = time.monotonic() + (LIST_INTERVAL_LIVE if any_live else LIST_INTERVAL_IDLE)
+
+    async def _poll_match_guarded(self, match_id: str):
+        async with self._semaphore:
+            try:
+                await self.poll_match(match_id)
+            except Exception as e:
+                self.errors += 1
+                print(f"Poller: error polling match {match_id}: {e}")
+            finally:
+                state = self.store.get(match_id)
+                if state is not None:
+                    self._next_poll[match_id] = time.monotonic() + self.interval_for(match_id, state.status)
+
+    async def poll_match(self, match_id: str):
+        """Fetch statistics and, for live/finished matches, the ball feed"""
+        self.match_polls += 1
+        stats_data = await self.flight.do(
+            ("match_statistics", match_id, None),
+            lambda: self.live_api.get_match_statistics(match_id)
+        )
+        if stats_data:
+            previous = self.store.get_statistics(match_id)
+            statistics = self.live_api.transform_match_statistics_to_schema(stats_data, match_id)
+            self.store.set_statistics(match_id, statistics)
+            self._publish_score_change(match_id, previous, statistics)
+
+        state = self.store.get(match_id)
+        if state is None or state.status == "upcoming":
+            return
+        # Finished matches only need their history loaded once
+        if state.status != "completed" or state.deliveries is None:
+            added = await self.ingest_new_deliveries(match_id)
+            if added:
+                self._idle_polls[match_id] = 0
+                self._publish_deliveries(match_id, added)
+            else:
+                self._idle_polls[match_id] = self._idle_polls.get(match_id, 0) + 1
+
+        if state.deliveries is not None and state.deliveries.gaps:
+            await self.fill_gap(match_id)
+        if state.deliveries is not None and not state.deliveries.complete:
+            await self.backfill_deliveries(match_id)
+
+    def _publish_deliveries(self, match_id: str, deliveries: List[Dict]):
+        if not self.broadcaster or not self.broadcaster.has_subscribers(match_id):
+            return
+        for delivery in sorted(deliveries, key=delivery_feed_id):
+            self.broadcaster.publish(
+                match_id, StreamEvent("delivery", public_delivery(delivery), id=delivery_feed_id(delivery))
+            )
+
+    def _publish_score_change(self, match_id: str, previous: Optional[Dict], current: Dict):
+        if not self.broadcaster or not self.broadcaster.has_subscribers(match_id):
+            return
+        fields = ("score", "status", "currentOver", "currentBall")
+        if previous is not None and all(previous.get(f) == current.get(f) for f in fields):
+            return
+        self.broadcaster.publish(match_id, StreamEvent("score", {"matchId": match_id, **{f: current.get(f) for f in fields}}))
+
+    async def _on_ingested(self, deliveries: List[Dict]):
+        """Hand newly merged deliveries to the global timeline, player stats and the database sink"""
+        if not deliveries:
+            return
+        if self.timeline is not None:
+            self.timeline.add(deliveries)
+        if self.player_stats is not None:
+            # merge_deliveries returns only balls not seen before, so each is counted once
+            await self.player_stats.add(deliveries)
+        if self.sink is not None and self.sink.running:
+            await self.sink.add(deliveries)
+
+    async def _fetch_feed_page(self, match_id: str, last_doc_id: Optional[int] = None) -> List[Dict]:
+        return await self.flight.do(
+            ("ball_feeds", match_id, last_doc_id),
+            lambda: self.commentary_api.get_feed_items(match_id, last_doc_id=last_doc_id)
+        )
+
+    async def ingest_new_deliveries(self, match_id: str) -> List[Dict]:
+        """Fetch the head of the feed and parse only items newer than the high-water mark.
+
+        lastDocId pages backwards from a feed id, so deltas come from the head
+        page; if the whole head page is new we page back until we reach the
+        high-water mark.
+        """
+        items = await self._fetch_feed_page(match_id)
+        # Only create the history once the feed has answered, otherwise a failed
+        # first fetch would leave an empty store that serves [] as a cache hit
+        history = self.store.delivery_history(match_id)
+        high_water = history.high_water
+        new_items = [item for item in items if item.get("id", 0) > high_water]
+
+        pages = 1
+        page_all_new = bool(items) and len(new_items) == len(items)
+        while high_water and page_all_new and pages < MAX_GAP_PAGES:
+            oldest = min(item.get("id", 0) for item in items)
+            items = await self._fetch_feed_page(match_id, last_doc_id=oldest)
+            page_new = [item for item in items if item.get("id", 0) > high_water]
+            new_items.extend(page_new)
+            page_all_new = bool(items) and len(page_new) == len(items)
+            pages += 1
+
+        if high_water and page_all_new:
+            # Still no overlap with what we had: remember where to resume so later
+            # ticks page down to the old high-water mark instead of leaving a hole
+            cursor = min(item.get("id", 0) for item in items)
+            history.gaps.append((high_water, cursor))
+            self.gaps_opened += 1
+            print(f"Poller: match {match_id} gap after {pages} pages, resuming below {cursor} down to {high_water}")
+
+        if not new_items:
+            return []
+        deliveries = self.transform_feed(new_items, match_id)
+        added = self.store.merge_deliveries(
+            match_id, deliveries, feed_ids=[item.get("id", 0) for item in new_items]
+        )
+        await self._on_ingested(added)
+        return added
+
+    async def backfill_deliveries(self, match_id: str):
+        """Fetch one page of older history per poll until the start of the feed"""
+        state = self.store.get(match_id)
+        history = state.deliveries if state is not None else None
+        if history is None or not history.low_water:
+            return
+        items = await self._fetch_feed_page(match_id, last_doc_id=history.low_water)
+        items = [item for item in items if 0 < item.get("id", 0) < history.low_water]
+        if not items:
+            history.complete = True
+            await self._release_player_stats(match_id, history)
+            return
+        deliveries = self.transform_feed(items, match_id)
+        added = self.store.merge_deliveries(match_id, deliveries, feed_ids=[item.get("id", 0) for item in items])
+        await self._on_ingested(added)
+
+    async def fill_gap(self, match_id: str):
+        """Fetch one page of the newest open gap per poll until it meets its floor"""
+        history = self.store.get(match_id).deliveries
+        floor, cursor = history.gaps[-1]
+        items = await self._fetch_feed_page(match_id, last_doc_id=cursor)
+        closed = not items or any(item.get("id", 0) <= floor for item in items)
+        items = [item for item in items if floor < item.get("id", 0) < cursor]
+        if items:
+            deliveries = self.transform_feed(items, match_id)
+            added = self.store.merge_deliveries(match_id, deliveries, feed_ids=[item.get("id", 0) for item in items])
+            await self._on_ingested(added)
+        if closed or not items:
+            history.gaps.pop()
+            self.gaps_closed += 1
+            await self._release_player_stats(match_id, history)
+        else:
+            history.gaps[-1] = (floor, min(item.get("id", 0) for item in items))
+
+    async def _release_player_stats(self, match_id: str, history: DeliveryStore):
+        # Per-match totals can be written once they cover the whole match
+        if self.player_stats is not None and history.complete and not history.gaps:
+            await self.player_stats.release(match_id)
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "ticks": self.ticks,
+            "matchPolls": self.match_polls,
+            "errors": self.errors,
+            "gapsOpened": self.gaps_opened,
+            "gapsClosed": self.gaps_closed,
+            "scheduled": len(self._next_poll),
+        }
@@ -0,0 +1,159 @@
+"""
+Per-delivery ranked index of root comments
+Keeps each indexed delivery's root comments in a sorted list keyed by the Wilson
+score lower bound, updated in place on every vote and new comment, so a page of
+"best" comments is a slice instead of a scan of comment_votes
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sortedcontainers import SortedList
+
+from singleflight import SingleFlight
+
+# 95% confidence
+WILSON_Z = 1.96
+
+
+def wilson_lower_bound(upvotes: int, downvotes: int, z: float = WILSON_Z) -> float:
+    """Lower bound of the Wilson score interval for the fraction of upvotes"""
+    n = upvotes + downvotes
+    if n <= 0:
+        return 0.0
+    p = upvotes / n
+    z2 = z * z
+    return (p + z2 / (2 * n) - z * math.sqrt((p * (1 - p) + z2 / (4 * n)) / n)) / (1 + z2 / n)
+
+
+class DeliveryRanking:
+    """Root comments of one delivery ordered by Wilson lower bound, best first.
+
+    Entries are (-score, comment_id), so ties are broken by id and a page
+    cursor is just the last entry of the previous page.
+    """
+
+    def __init__(self, delivery_id: str):
+        self.delivery_id = delivery_id
+        self._entries = SortedList()
+        self._tallies: Dict[str, List[int]] = {}
+        self.seeded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._tallies)
+
+    def __contains__(self, comment_id: str) -> bool:
+        return comment_id in self._tallies
+
+    def _entry(self, comment_id: str) -> Tuple[float, str]:
+        up, down = self._tallies[comment_id]
+        return -wilson_lower_bound(up, down), comment_id
+
+    def set_tally(self, comment_id: str, upvotes: int, downvotes: int):
+        """Insert a comment or replace its tallies; O(log n)"""
+        if comment_id in self._tallies:
+            self._entries.remove(self._entry(comment_id))
+        self._tallies[comment_id] = [max(upvotes, 0), max(downvotes, 0)]
+        self._entries.add(self._entry(comment_id))
+
+    def apply_vote(self, comment_id: str, up_delta: int, down_delta: int):
+        """Adjust a comment's tallies by a vote's effect; O(log n)"""
+        tally = self._tallies.get(comment_id)
+        if tally is None or (up_delta == 0 and down_delta == 0):
+            return
+        self.set_tally(comment_id, tally[0] + up_delta, tally[1] + down_delta)
+
+    def tally(self, comment_id: str) -> Optional[Tuple[int, int]]:
+        tally = self._tallies.get(comment_id)
+        return (tally[0], tally[1]) if tally else None
+
+    def top(self, limit: int, after: Optional[Tuple[float, str]] = None) -> List[Tuple[float, str]]:
+        """Up to `limit` entries after the `after` entry; O(log n + limit)"""
+        start = self._entries.bisect_right(after) if after is not None else 0
+        return list(self._entries.islice(start, start + limit))
+
+
+class RankedCommentIndex:
+    """Rankings for recently read deliveries, seeded on first use and kept up to date in place.
+
+    `loader(delivery_id)` returns the delivery's root comments as rows with id,
+    upvotes and downvotes. Rankings are reseeded after refresh_interval seconds
+    to pick up votes written by other instances, and the least recently used
+    deliveries are dropped past max_deliveries.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[Iterable[Dict]]],
+        max_deliveries: int = 256,
+        refresh_interval: float = 300.0,
+    ):
+        self.loader = loader
+        self.max_deliveries = max_deliveries
+        self.refresh_interval = refresh_interval
+        self._rankings: "OrderedDict[str, DeliveryRanking]" = OrderedDict()
+        self._comment_delivery: Dict[str, str] = {}
+        self._flight = SingleFlight("ranked_comments")
+        self.seeds = 0
+        self.updates = 0
+
+    async def _seed(self, delivery_id: str) -> DeliveryRanking:
+        rows = await self.loader(delivery_id)
+        ranking = DeliveryRanking(delivery_id)
+        for row in rows:
+            ranking.set_tally(row["id"], row.get("upvotes") or 0, row.get("downvotes") or 0)
+        self._store(ranking)
+        self.seeds += 1
+        return ranking
+
+    def _store(self, ranking: DeliveryRanking):
+        previous = self._rankings.pop(ranking.delivery_id, None)
+        if previous is not None:
+            for comment_id in previous._tallies:
+                self._comment_delivery.pop(comment_id, None)
+        self._rankings[ranking.delivery_id] = ranking
+        for comment_id in ranking._tallies:
+            self._comment_delivery[comment_id] = ranking.delivery_id
+        while len(self._rankings) > self.max_deliveries:
+            _, evicted = self._rankings.popitem(last=False)
+            for comment_id in evicted._tallies:
+                self._comment_delivery.pop(comment_id, None)
+
+    async def get(self, delivery_id: str) -> DeliveryRanking:
+        """The delivery's ranking, seeding it (once for concurrent callers) if missing or old"""
+        ranking = self._rankings.get(delivery_id)
+        if ranking is not None and time.monotonic() - ranking.seeded_at < self.refresh_interval:
+            self._rankings.move_to_end(delivery_id)
+            return ranking
+        return await self._flight.do(("seed", delivery_id), lambda: self._seed(delivery_id))
+
+    def add_comment(self, delivery_id: str, comment_id: str):
+        """Index a new root comment if its delivery is indexed"""
+        ranking = self._rankings.get(delivery_id)
+        if ranking is not None and comment_id not in ranking:
+            ranking.set_tally(comment_id, 0, 0)
+            self._comment_delivery[comment_id] = delivery_id
+            self.updates += 1
+
+    def apply_vote(self, comment_id: str, up_delta: int, down_delta: int):
+        """Apply a vote's effect if the comment is indexed"""
+        delivery_id = self._comment_delivery.get(comment_id)
+        if delivery_id is not None:
+            self._rankings[delivery_id].apply_vote(comment_id, up_delta, down_delta)
+            self.updates += 1
+
+    def set_tally(self, comment_id: str, upvotes: int, downvotes: int):
+        """Set a comment's tallies (e.g. as returned by the database) if it is indexed"""
+        delivery_id = self._comment_delivery.get(comment_id)
+        if delivery_id is not None:
+            self._rankings[delivery_id].set_tally(comment_id, upvotes, downvotes)
+            self.updates += 1
+
+    def stats(self) -> Dict:
+        return {
+            "deliveries": len(self._rankings),
+            "comments": len(self._comment_delivery),
+            "seeds": self.seeds,
+            "updates": self.updates,
+        }
@@ -0,0 +1,117 @@
+"""
+Pre-encoded JSON responses with ETag revalidation
+Caches the encoded body per (endpoint, params) for one data version, so unchanged
+data is neither re-validated nor re-serialized, and answers If-None-Match with 304
+"""
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+
+    def encode_json(data: Any) -> bytes:
+        return orjson.dumps(data)
+except ImportError:  # orjson is optional; the stdlib encoder gives the same output, slower
+    def encode_json(data: Any) -> bytes:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if an If-None-Match header value lists this ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def encode_body(data: Any, adapter: Optional[TypeAdapter] = None) -> bytes:
+    """Encode data as the response model would: validated and dumped when an adapter is given"""
+    if isinstance(data, bytes):
+        return data
+    if adapter is not None:
+        data = adapter.dump_python(adapter.validate_python(data), mode="json")
+    return encode_json(data)
+
+
+class EncodedResponseCache:
+    """Encoded response bodies keyed by (endpoint, params), valid for one data version.
+
+    Only the latest version of each key is kept; the least recently used keys
+    are evicted past max_entries.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Hashable, bytes, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def respond(
+        self,
+        request: Request,
+        key: Hashable,
+        version: Hashable,
+        build: Callable[[], Any],
+        adapter: Optional[TypeAdapter] = None,
+    ) -> Optional[Response]:
+        """Response for key at version, building and encoding the body only on a version change.
+
+        Returns None if build() returns None (nothing to serve from this source).
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            _, body, etag = entry
+        else:
+            data = build()
+            if data is None:
+                return None
+            self.misses += 1
+            body = encode_body(data, adapter)
+            etag = make_etag(body)
+            self._entries[key] = (version, body, etag)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return self.response(request, body, etag)
+
+    def response(self, request: Request, body: bytes, etag: Optional[str] = None) -> Response:
+        """200 with the body, or 304 when the client already has this ETag"""
+        etag = etag or make_etag(body)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def encoded(self, request: Request, data: Any, adapter: Optional[TypeAdapter] = None) -> Response:
+        """Uncached variant for data without a version (still answers If-None-Match)"""
+        return self.response(request, encode_body(data, adapter))
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "notModified": self.not_modified,
+        }
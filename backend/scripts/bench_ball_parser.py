@@ -0,0 +1,192 @@
+"""
+Micro-benchmark for ball_parser against the previous inline per-ball parsing
+
+Usage (from backend/):
+    python scripts/bench_ball_parser.py                 # synthetic 300-over feed
+    python scripts/bench_ball_parser.py --feed feed.json  # recorded getBallFeeds response
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ball_parser import parse_ball_item, parse_text_item  # noqa: E402
+
+COMMENTARY = [
+    "<b>FOUR!</b> Driven through the covers, no chance for the fielder",
+    "<b>SIX!</b> Launched over long-on, that is huge",
+    "No run, defended back to the bowler&nbsp;",
+    "Pushed into the gap at mid-wicket for a single",
+    "Short of a length, left alone outside off",
+    "<b>OUT!</b> Caught at first slip, edged and taken",
+    "<b>Bowled!</b> Through the gate, the stumps are shattered",
+    "Appeal for leg before wicket... <b>OUT!</b> Plumb in front",
+    "Direct hit at the non-striker's end, <b>run out!</b>",
+    "Beaten outside off, good carry through to the keeper",
+    "Worked off the pads for two, good running between the wickets",
+    "Full and wide, slashed over point for <b>FOUR</b> &amp; the crowd loves it",
+]
+RUNS = ["0", "0", "0", "1", "1", "1", "2", "4", "6", "0+1", "1+4"]
+
+
+def synthetic_feed(overs: int = 300, seed: int = 7):
+    """Newest-first feed items in the getBallFeeds shape, one text item per over"""
+    rng = random.Random(seed)
+    feed_id = 1768145000000
+    items = []
+    for over in range(overs):
+        for ball in range(1, 7):
+            feed_id += rng.randint(20000, 60000)
+            items.append({
+                "type": "b",
+                "id": feed_id,
+                "o": f"{over}.{ball}",
+                "b": rng.choice(RUNS),
+                "c1": "K Clarke to K Rahul",
+                "c2": rng.choice(COMMENTARY),
+            })
+        feed_id += 1000
+        items.append({"type": "t", "id": feed_id, "on": over + 1, "c": f"End of over {over + 1} &lt;summary&gt;"})
+    items.reverse()
+    return items
+
+
+def legacy_parse(ball_feed, match_id):
+    """The per-ball logic previously inlined in main.get_match_deliveries"""
+    if ball_feed.get("type") == "t":
+        description = ball_feed.get("c", "")
+        description = re.sub(r'<[^>]+>', '', description)
+        description = description.replace('&nbsp;', ' ')
+        description = description.replace('&lt;', '<').replace('&gt;', '>')
+        feed_id = ball_feed.get("id", 0)
+        timestamp = datetime.fromtimestamp(feed_id / 1000).isoformat() if feed_id else datetime.now().isoformat()
+        over = ball_feed.get("on", -1) if ball_feed.get("on", -1) >= 0 else 0
+        return {
+            "id": f"{match_id}_{feed_id}", "matchId": match_id, "over": over, "ball": 0,
+            "bowler": "", "batsman": "", "runs": 0, "isWicket": False, "wicketType": None,
+            "isFour": False, "isSix": False, "description": description, "timestamp": timestamp,
+            "commentCount": 0, "_type": "commentary",
+        }
+
+    over_ball = ball_feed.get("o", "")
+    over = 0
+    ball = 0
+    if over_ball:
+        try:
+            over_ball_parts = over_ball.split(".")
+            over = int(over_ball_parts[0]) if over_ball_parts[0] else 0
+            ball = int(over_ball_parts[1]) if len(over_ball_parts) > 1 and over_ball_parts[1] else 0
+        except (ValueError, IndexError):
+            pass
+    runs_str = ball_feed.get("b", "0")
+    runs = 0
+    try:
+        if "+" in runs_str:
+            runs = int(runs_str.split("+")[0])
+        else:
+            runs = int(runs_str)
+    except (ValueError, AttributeError):
+        runs = 0
+    is_wicket = False
+    wicket_type = None
+    commentary_lower = str(ball_feed.get("c2", "")).lower()
+    wicket_indicators = [
+        "wicket!", "wicket.", "wicket,", "wicket:", "wicket;",
+        "bowled", "caught", "lbw", "leg before wicket", "run out", "stumped",
+        "dismissed", "out!", "out.", "out,", "out:", "out;"
+    ]
+    has_wicket_indicator = any(indicator in commentary_lower for indicator in wicket_indicators)
+    if runs == 0 and has_wicket_indicator:
+        is_wicket = True
+    elif ball_feed.get("is_catch_drop", False) == True:
+        is_wicket = True
+    if is_wicket:
+        if "bowled" in commentary_lower:
+            wicket_type = "bowled"
+        elif "caught" in commentary_lower:
+            wicket_type = "caught"
+        elif "lbw" in commentary_lower or "leg before" in commentary_lower:
+            wicket_type = "lbw"
+        elif "run out" in commentary_lower:
+            wicket_type = "run out"
+        elif "stumped" in commentary_lower:
+            wicket_type = "stumped"
+    bowler = ""
+    batsman = ""
+    c1 = ball_feed.get("c1", "")
+    if c1 and " to " in c1:
+        parts = c1.split(" to ")
+        bowler = parts[0].strip() if len(parts) > 0 else ""
+        batsman = parts[1].strip() if len(parts) > 1 else ""
+    description = ball_feed.get("c2", "")
+    description = re.sub(r'<[^>]+>', '', description)
+    description = description.replace('&nbsp;', ' ')
+    feed_id = ball_feed.get("id", 0)
+    timestamp = datetime.fromtimestamp(feed_id / 1000).isoformat() if feed_id else datetime.now().isoformat()
+    return {
+        "id": f"{match_id}_{feed_id}", "matchId": match_id, "over": over, "ball": ball,
+        "bowler": bowler, "batsman": batsman, "runs": runs, "isWicket": is_wicket,
+        "wicketType": wicket_type, "isFour": runs == 4, "isSix": runs == 6,
+        "description": description, "timestamp": timestamp, "commentCount": 0,
+    }
+
+
+def parse(item, match_id):
+    if item.get("type") == "t":
+        return parse_text_item(item, match_id)
+    return parse_ball_item(item, match_id)
+
+
+def bench(fns, items, repeat):
+    """Best time per parser; the parsers take turns each round so machine noise hits both alike"""
+    best = [float("inf")] * len(fns)
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for i, fn in enumerate(fns):
+                start = time.perf_counter()
+                for item in items:
+                    fn(item, "BENCH")
+                best[i] = min(best[i], time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--feed", help="JSON file with a recorded getBallFeeds response")
+    parser.add_argument("--overs", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.feed:
+        with open(args.feed) as f:
+            items = [item for item in json.load(f) if item.get("type") in ("b", "t")]
+    else:
+        items = synthetic_feed(args.overs)
+
+    # Wicket detection must agree with the previous implementation
+    for item in items:
+        if item.get("type") != "b":
+            continue
+        old, new = legacy_parse(item, "BENCH"), parse(item, "BENCH")
+        assert (old["isWicket"], old["wicketType"]) == (new["isWicket"], new["wicketType"]), item
+
+    balls = len(items)
+    legacy, current = bench((legacy_parse, parse), items, args.repeat)
+    print(f"{balls} feed items, best of {args.repeat}")
+    print(f"legacy inline parser: {legacy * 1e6 / balls:7.2f} us/item  ({legacy * 1e3:.2f} ms total)")
+    print(f"ball_parser:          {current * 1e6 / balls:7.2f} us/item  ({current * 1e3:.2f} ms total)")
+    print(f"speedup:              {legacy / current:7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Micro-benchmark for the vectorized match analytics against a pure-Python baseline
+
+The fixture is a 450-over Test (four innings) in a DeliveryStore. The baseline
+walks the Delivery dicts with per-ball loops; the vectorized path converts the
+store's columns to NumPy once and uses bincount/cumsum/reduceat. Both must
+produce identical output.
+
+Usage (from backend/):
+    python scripts/bench_match_analytics.py
+    python scripts/bench_match_analytics.py --innings 120,115,110,105 --format Test --repeat 50
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from analytics import PHASES, MatchColumns, match_analytics  # noqa: E402
+from delivery_store import DeliveryStore  # noqa: E402
+
+BATTERS = [f"Batter {i}" for i in range(1, 12)]
+BOWLERS = [f"Bowler {i}" for i in range(1, 7)]
+RUNS = [0, 0, 0, 0, 1, 1, 1, 2, 3, 4, 6]
+
+
+def synthetic_match(innings_overs, seed: int = 7):
+    """Delivery dicts, oldest first, with one commentary item per over"""
+    rng = random.Random(seed)
+    feed_id = 1768145000000
+    deliveries = []
+    for overs in innings_overs:
+        striker, wickets = 0, 0
+        for over in range(overs):
+            bowler = BOWLERS[over % len(BOWLERS)]
+            for ball in range(1, 7):
+                feed_id += rng.randint(20000, 60000)
+                runs = rng.choice(RUNS)
+                is_wicket = runs == 0 and wickets < 10 and rng.random() < 0.04
+                # Dropped catches come flagged as wickets and must not end a stand
+                catch_drop = not is_wicket and rng.random() < 0.005
+                delivery = {
+                    "id": f"BENCH_{feed_id}", "matchId": "BENCH", "over": over, "ball": ball,
+                    "bowler": bowler, "batsman": BATTERS[min(striker, len(BATTERS) - 1)],
+                    "runs": runs, "isWicket": is_wicket or catch_drop, "wicketType": "bowled" if is_wicket else None,
+                    "isFour": runs == 4, "isSix": runs == 6, "description": "", "commentCount": 0,
+                }
+                if catch_drop:
+                    delivery["_catchDrop"] = True
+                deliveries.append(delivery)
+                if is_wicket:
+                    wickets += 1
+                    striker = wickets + 1
+                elif runs % 2:
+                    striker = striker + 1 if striker == wickets else wickets
+            feed_id += 1000
+            deliveries.append({
+                "id": f"BENCH_{feed_id}", "matchId": "BENCH", "over": over + 1, "ball": 0,
+                "bowler": "", "batsman": "", "runs": 0, "isWicket": False, "isFour": False,
+                "isSix": False, "description": f"End of over {over + 1}", "_type": "commentary",
+            })
+    return deliveries
+
+
+def python_analytics(deliveries, match_format=None):
+    """Same output as analytics.match_analytics, built with per-ball Python loops"""
+    phases = PHASES.get(match_format or "", ())
+    innings = []
+    current = None
+    last_position = None
+    for d in deliveries:
+        if d.get("_type") == "commentary":
+            continue
+        position = d["over"] * 10 + d["ball"]
+        if current is None or position < last_position:
+            current = {"overs": {}, "partnerships": [], "phases": {}, "stand": None}
+            innings.append(current)
+        last_position = position
+        is_wicket = bool(d["isWicket"]) and not d.get("_catchDrop")
+        over = current["overs"].setdefault(d["over"], [0, 0, 0])
+        over[0] += d["runs"]
+        over[1] += 1
+        over[2] += int(is_wicket)
+
+        stand = current["stand"]
+        if stand is None:
+            stand = {"batsmen": [], "runs": 0, "balls": 0, "fours": 0, "sixes": 0, "brokenByWicket": False}
+            current["partnerships"].append(stand)
+            current["stand"] = stand
+        if d["batsman"] and d["batsman"] not in stand["batsmen"]:
+            stand["batsmen"].append(d["batsman"])
+        stand["runs"] += d["runs"]
+        stand["balls"] += 1
+        stand["fours"] += int(d["isFour"])
+        stand["sixes"] += int(d["isSix"])
+        if is_wicket:
+            stand["brokenByWicket"] = True
+            current["stand"] = None
+
+        if phases:
+            index = 0
+            for i, (_, start, _) in enumerate(phases):
+                if d["over"] >= start:
+                    index = i
+            phase = current["phases"].setdefault(index, [0, 0, 0, 0, 0])
+            phase[0] += d["runs"]
+            phase[1] += 1
+            phase[2] += int(is_wicket)
+            phase[3] += int(d["isFour"])
+            phase[4] += int(d["isSix"])
+
+    result = []
+    for number, inn in enumerate(innings, start=1):
+        last_over = max(inn["overs"])
+        manhattan, worm, run_rate, wickets = [], [], [], []
+        total_runs = total_balls = 0
+        for over in range(last_over + 1):
+            runs, balls, wkts = inn["overs"].get(over, (0, 0, 0))
+            total_runs += runs
+            total_balls += balls
+            manhattan.append(runs)
+            worm.append(total_runs)
+            run_rate.append(round(total_runs * 6.0 / total_balls, 2) if total_balls else 0.0)
+            wickets.append(wkts)
+        phase_rows = []
+        for i, (name, start, end) in enumerate(phases):
+            runs, balls, wkts, fours, sixes = inn["phases"].get(i, (0, 0, 0, 0, 0))
+            phase_rows.append({
+                "phase": name, "overs": f"{start + 1}-{end}", "runs": runs, "balls": balls,
+                "wickets": wkts, "fours": fours, "sixes": sixes,
+                "runRate": round(runs * 6.0 / balls, 2) if balls else 0.0,
+            })
+        result.append({
+            "innings": number,
+            "runs": total_runs,
+            "wickets": sum(wickets),
+            "balls": total_balls,
+            "manhattan": manhattan,
+            "worm": worm,
+            "runRate": run_rate,
+            "wicketsPerOver": wickets,
+            "partnerships": inn["partnerships"],
+            "phases": phase_rows,
+        })
+    return result
+
+
+def bench(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--innings", default="120,115,110,105", help="Overs per innings")
+    parser.add_argument("--format", default="Test")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    innings_overs = [int(overs) for overs in args.innings.split(",")]
+    deliveries = synthetic_match(innings_overs)
+    history = DeliveryStore("BENCH")
+    history.merge(deliveries)
+    # The baseline starts from the Delivery dicts the API serves
+    dicts = [history.view(i).to_dict() for i in range(len(history))]
+
+    expected = python_analytics(dicts, args.format)
+    assert match_analytics(MatchColumns.from_store(history), args.format) == expected
+    assert match_analytics(MatchColumns.from_deliveries(dicts), args.format) == expected
+
+    baseline = bench(lambda: python_analytics(dicts, args.format), args.repeat)
+    from_store = bench(lambda: match_analytics(MatchColumns.from_store(history), args.format), args.repeat)
+    from_dicts = bench(lambda: match_analytics(MatchColumns.from_deliveries(dicts), args.format), args.repeat)
+    print(f"{sum(innings_overs)} overs, {len(history)} rows, {len(expected)} innings, best of {args.repeat}")
+    print(f"pure Python over dicts:      {baseline * 1e3:8.2f} ms")
+    print(f"NumPy from store columns:    {from_store * 1e3:8.2f} ms  ({baseline / from_store:.1f}x)")
+    print(f"NumPy from dicts (DB path):  {from_dicts * 1e3:8.2f} ms  ({baseline / from_dicts:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
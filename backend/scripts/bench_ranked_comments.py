@@ -0,0 +1,104 @@
+"""
+Micro-benchmark for the ranked comment index against recomputing the ranking from comment_votes
+
+Simulates a hot delivery: every vote is followed by a read of the top page.
+The baseline tallies comment_votes, scores and sorts every comment per read
+(what an ORDER BY over aggregated votes does); the index applies the vote in
+place and slices the top page.
+
+Usage (from backend/):
+    python scripts/bench_ranked_comments.py
+    python scripts/bench_ranked_comments.py --comments 50000 --votes 200000 --reads 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ranked_comments import DeliveryRanking, wilson_lower_bound  # noqa: E402
+
+
+def synthetic_votes(comments: int, votes: int, seed: int = 7):
+    """Comment ids and (comment_id, user_id, vote) rows skewed towards a few popular comments"""
+    rng = random.Random(seed)
+    comment_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(comments)]
+    rows = {}
+    for _ in range(votes):
+        comment_id = comment_ids[min(int(rng.paretovariate(1.2)) - 1, comments - 1)]
+        user_id = rng.randrange(votes)
+        rows[(comment_id, user_id)] = "up" if rng.random() < 0.7 else "down"
+    return comment_ids, rows
+
+
+def recompute_top(comment_ids, votes, limit):
+    """Tally every vote row, then score and sort every comment"""
+    tallies = {comment_id: [0, 0] for comment_id in comment_ids}
+    for (comment_id, _), vote in votes.items():
+        tallies[comment_id][0 if vote == "up" else 1] += 1
+    ranked = sorted(
+        ((-wilson_lower_bound(up, down), comment_id) for comment_id, (up, down) in tallies.items())
+    )
+    return ranked[:limit]
+
+
+def vote_effect(previous, vote):
+    up = (vote == "up") - (previous == "up")
+    down = (vote == "down") - (previous == "down")
+    return up, down
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--votes", type=int, default=200000)
+    parser.add_argument("--reads", type=int, default=50, help="vote + top-page reads to time")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    comment_ids, votes = synthetic_votes(args.comments, args.votes)
+    rng = random.Random(11)
+    incoming = [
+        (rng.choice(comment_ids), args.votes + rng.randrange(args.reads), rng.choice(("up", "down")))
+        for _ in range(args.reads)
+    ]
+
+    start = time.perf_counter()
+    ranking = DeliveryRanking("BENCH")
+    tallies = {comment_id: [0, 0] for comment_id in comment_ids}
+    for (comment_id, _), vote in votes.items():
+        tallies[comment_id][0 if vote == "up" else 1] += 1
+    for comment_id, (up, down) in tallies.items():
+        ranking.set_tally(comment_id, up, down)
+    seed = time.perf_counter() - start
+
+    baseline_votes = dict(votes)
+    start = time.perf_counter()
+    for comment_id, user_id, vote in incoming:
+        baseline_votes[(comment_id, user_id)] = vote
+        expected = recompute_top(comment_ids, baseline_votes, args.limit)
+    recompute = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for comment_id, user_id, vote in incoming:
+        previous = votes.get((comment_id, user_id))
+        votes[(comment_id, user_id)] = vote
+        ranking.apply_vote(comment_id, *vote_effect(previous, vote))
+        top = ranking.top(args.limit)
+    incremental = time.perf_counter() - start
+
+    # Both must agree on the final top page
+    assert top == expected, "ranked index diverged from the recomputed ranking"
+
+    print(f"{args.comments} comments, {len(votes)} votes, {args.reads} vote+read rounds, top {args.limit}")
+    print(f"index seed (once):     {seed * 1e3:9.2f} ms")
+    print(f"recompute per read:    {recompute * 1e3 / args.reads:9.3f} ms")
+    print(f"ranked index per read: {incremental * 1e3 / args.reads:9.3f} ms")
+    print(f"speedup:               {recompute / incremental:9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
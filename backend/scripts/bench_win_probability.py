@@ -0,0 +1,102 @@
+"""
+Micro-benchmark for per-tick win-probability scoring
+
+Fills a MatchStateStore with live T20/ODI matches and times one scoring pass
+when every score moved (the worst case) and when none did (all cached).
+
+Usage (from backend/):
+    python scripts/bench_win_probability.py
+    python scripts/bench_win_probability.py --matches 200 --repeat 50
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from InternationalT20GameOutcomePredictor import WinProbabilityModel, WinProbabilityService  # noqa: E402
+from match_state import MatchStateStore  # noqa: E402
+
+
+def innings(rng, overs_cap, rate):
+    balls = rng.randint(1, overs_cap * 6)
+    return {
+        "runs": int(balls * rate / 6 * rng.uniform(0.7, 1.3)),
+        "wickets": rng.randint(0, 9),
+        "overs": float(f"{balls // 6}.{balls % 6}"),
+    }
+
+
+def live_matches(count, rng, round_no):
+    """Live T20/ODI matches; either side may be batting first"""
+    matches = []
+    for i in range(count):
+        fmt, overs, rate = rng.choice([("T20", 20, 8.0), ("ODI", 50, 5.5)])
+        first, second = rng.choice([("team1", "team2"), ("team2", "team1")])
+        score = {first: innings(rng, overs, rate)}
+        if rng.random() < 0.5:
+            score[first]["overs"] = float(overs)
+            score[second] = innings(rng, overs, rate)
+            score[second]["wickets"] = min(score[second]["wickets"], 9)
+            score[second]["overs"] = min(score[second]["overs"], overs - 1.0)
+        matches.append({"id": f"M{round_no}-{i}", "status": "live", "format": fmt, "score": score})
+    return matches
+
+
+def check_batting_order(model):
+    """Swapping which side batted first must mirror the probabilities"""
+    service = WinProbabilityService(model)
+    chase = {"runs": 30, "wickets": 0, "overs": 3.0}
+    set_total = {"runs": 180, "wickets": 5, "overs": 20.0}
+    for team1, team2 in ((set_total, chase), (chase, set_total)):
+        straight = service.predict_match({"status": "live", "format": "T20", "score": {"team1": team1, "team2": team2}})
+        swapped = service.predict_match({"status": "live", "format": "T20", "score": {"team1": team2, "team2": team1}})
+        assert straight == {"team1": swapped["team2"], "team2": swapped["team1"]}, (straight, swapped)
+        assert 0.0 < straight["team1"] < 1.0, straight
+    # Only team 2 has batted: it is batting first
+    first_innings = service.predict_match({"status": "live", "format": "T20", "score": {"team2": chase}})
+    assert first_innings is not None and first_innings["team2"] > 0.5, first_innings
+    # Level scores with the chase over is a tie, whichever side chased
+    tie = {"team1": {"runs": 150, "wickets": 10, "overs": 19.4}, "team2": {"runs": 150, "wickets": 6, "overs": 20.0}}
+    for first_side in ("team1", "team2"):
+        assert model.features({"format": "T20", "score": tie}, first_side).decided == 0.5
+    # Both innings over or both in progress: order unknown, no prediction
+    assert service.predict_match({"status": "live", "format": "T20", "score": {"team1": chase, "team2": chase}}) is None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--matches", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    model = WinProbabilityModel.load()
+    check_batting_order(model)
+    service = WinProbabilityService(model)
+    store = MatchStateStore()
+
+    changed = float("inf")
+    cached = float("inf")
+    for round_no in range(args.repeat):
+        # Fresh ids each round: a match's batting order never changes
+        store.set_match_list(live_matches(args.matches, rng, round_no))
+        start = time.perf_counter()
+        scored = service.score(store)
+        changed = min(changed, time.perf_counter() - start)
+        assert scored == args.matches
+        start = time.perf_counter()
+        assert service.score(store) == 0
+        cached = min(cached, time.perf_counter() - start)
+
+    print(f"{args.matches} live matches, best of {args.repeat}")
+    print(f"every score changed: {changed * 1e3:7.3f} ms per tick")
+    print(f"nothing changed:     {cached * 1e3:7.3f} ms per tick")
+    for match in store.get_match_list()[:5]:
+        print(f"  {match['format']:>3} {match['score']} -> {service.get(match['id'])[1]}")
+
+
+if __name__ == "__main__":
+    main()
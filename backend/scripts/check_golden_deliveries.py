@@ -0,0 +1,64 @@
+"""
+Check ball_parser.transform_feed against recorded golden deliveries
+
+Usage (from backend/):
+    python scripts/check_golden_deliveries.py            # exit 1 on any mismatch
+    python scripts/check_golden_deliveries.py --update   # rewrite expected output
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Feed timestamps are rendered in local time; pin it so fixtures are portable
+os.environ["TZ"] = "UTC"
+time.tzset()
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ball_parser import transform_feed  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--update", action="store_true", help="rewrite the expected deliveries")
+    args = parser.parse_args()
+
+    failures = 0
+    for name in sorted(os.listdir(FIXTURES_DIR)):
+        if not name.startswith("ball_feed_") or not name.endswith(".json"):
+            continue
+        path = os.path.join(FIXTURES_DIR, name)
+        with open(path) as f:
+            fixture = json.load(f)
+
+        actual = transform_feed(fixture["items"], fixture["matchId"])
+        if args.update:
+            fixture["expected"] = actual
+            with open(path, "w") as f:
+                json.dump(fixture, f, indent=2)
+                f.write("\n")
+            print(f"updated {name} ({len(actual)} deliveries)")
+            continue
+
+        expected = fixture["expected"]
+        if actual == expected:
+            print(f"ok      {name} ({len(actual)} deliveries)")
+            continue
+        failures += 1
+        print(f"FAILED  {name}")
+        if len(actual) != len(expected):
+            print(f"  expected {len(expected)} deliveries, got {len(actual)}")
+        for want, got in zip(expected, actual):
+            if want != got:
+                diff = {k: (want.get(k), got.get(k)) for k in set(want) | set(got) if want.get(k) != got.get(k)}
+                print(f"  {want.get('id')}: {diff}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
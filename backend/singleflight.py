@@ -0,0 +1,53 @@
+"""
+Request coalescing (single-flight) for upstream fetches
+Concurrent callers with the same key share one in-flight upstream call
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls by key.
+
+    The first caller for a key starts the upstream call; everyone arriving
+    while it is in flight awaits the same future. Nothing is cached once the
+    call completes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executed = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() once for all concurrent callers with the same key"""
+        self.calls += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield() so one cancelled caller does not cancel the shared call
+            return await asyncio.shield(future)
+
+        self.executed += 1
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+        future.add_done_callback(lambda f, k=key: self._on_done(k, f))
+        return await asyncio.shield(future)
+
+    def _on_done(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled() and future.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict:
+        return {
+            "inflight": len(self._inflight),
+            "calls": self.calls,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+        }
@@ -0,0 +1,312 @@
+"""
+Persistent snapshot of the match state store
+The match list, match statistics and delivery histories are written to a local
+SQLite file periodically and on shutdown, and loaded on startup so a restarted
+process serves the last known data while the poller warms up
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+from delivery_store import FLAG_CATCH_DROP, FLAG_COMMENTARY, FLAG_EXTRA, DeliveryStore
+from match_state import MatchStateStore
+
+# Bump when the layout or the shape of the stored data changes; older files are ignored
+SNAPSHOT_FORMAT_VERSION = 4
+
+# Live matches are kept first when the size cap is reached, then the most recently updated
+_STATUS_PRIORITY = {"live": 0, "completed": 1, "upcoming": 2}
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE match_list (position INTEGER PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE statistics (match_id TEXT PRIMARY KEY, data BLOB NOT NULL);
+CREATE TABLE deliveries (
+    match_id TEXT PRIMARY KEY,
+    high_water INTEGER NOT NULL,
+    low_water INTEGER NOT NULL,
+    complete INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode(), 1)
+
+
+def _unpack(data: bytes):
+    return json.loads(zlib.decompress(data))
+
+
+def _pack_history(history: DeliveryStore) -> bytes:
+    """Newest-first Delivery rows plus the positions of flagged rows among them.
+
+    page_json is the API encoding and carries neither '_type', '_catchDrop'
+    nor '_extra', so those are stored next to it; without them restored
+    commentary would read as balls, dropped catches as dismissals and wides as
+    legal deliveries. Open feed gaps are kept too so the poller resumes filling
+    them after a restart.
+    """
+    count = len(history)
+    flags = history.columns()["flags"]
+    commentary = []
+    catch_drops = []
+    extras = []
+    for position, i in enumerate(range(count - 1, -1, -1)):
+        if flags[i] & FLAG_COMMENTARY:
+            commentary.append(position)
+        if flags[i] & FLAG_CATCH_DROP:
+            catch_drops.append(position)
+        if flags[i] & FLAG_EXTRA:
+            view = history.view(i)
+            extras.append([position, view.extra, view.extra_runs])
+    body = (
+        b'{"commentary":' + json.dumps(commentary).encode()
+        + b',"catchDrops":' + json.dumps(catch_drops).encode()
+        + b',"extras":' + json.dumps(extras).encode()
+        + b',"gaps":' + json.dumps(history.gaps).encode()
+        + b',"rows":' + history.page_json(None, count) + b"}"
+    )
+    return zlib.compress(body, 1)
+
+
+def _unpack_history(data: bytes) -> Tuple[list, list]:
+    """Newest-first Delivery dicts with '_type', '_catchDrop' and '_extra' restored, plus the open gaps"""
+    history = _unpack(data)
+    rows = history["rows"]
+    for position in history["commentary"]:
+        rows[position]["_type"] = "commentary"
+    for position in history["catchDrops"]:
+        rows[position]["_catchDrop"] = True
+    for position, extra, extra_runs in history["extras"]:
+        rows[position]["_extra"] = extra
+        rows[position]["_extraRuns"] = extra_runs
+    return rows, [tuple(gap) for gap in history.get("gaps", [])]
+
+
+class MatchSnapshot:
+    """Writes and restores MatchStateStore snapshots.
+
+    Snapshots are written to a temporary file and renamed over the previous
+    one, so a crash mid-write never leaves a torn file. Delivery histories are
+    dropped (lowest priority first) once the file would exceed max_bytes;
+    snapshots older than max_age seconds or from another format version are
+    not loaded.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, max_age: float = 6 * 3600):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        # Compressed delivery blobs by match id, reused while the history version is unchanged
+        self._delivery_blobs: Dict[str, Tuple[int, bytes]] = {}
+        self._saved_signature = None
+        self.saves = 0
+        self.skipped = 0
+        self.errors = 0
+        self.bytes = 0
+        self.saved_at: Optional[float] = None
+        self.loaded_at: Optional[float] = None
+        self.loaded_matches = 0
+        self.dropped_histories = 0
+
+    def _signature(self, store: MatchStateStore) -> Tuple:
+        return (store.list_version, tuple(
+            (match_id, state.statistics_version, state.deliveries.version if state.deliveries is not None else -1)
+            for match_id, state in store.matches.items()
+        ))
+
+    def collect(self, store: MatchStateStore) -> Optional[Dict]:
+        """Everything to persist, gathered on the event loop; None if unchanged since the last save"""
+        if not store.has_match_list():
+            return None
+        signature = self._signature(store)
+        if signature == self._saved_signature:
+            return None
+
+        statistics = {
+            match_id: _pack(state.statistics)
+            for match_id, state in store.matches.items() if state.statistics is not None
+        }
+        match_list = [_pack(match) for match in store.get_match_list()]
+        budget = self.max_bytes - sum(len(blob) for blob in statistics.values()) - sum(len(b) for b in match_list)
+
+        ranked = sorted(
+            (state for state in store.matches.values() if state.deliveries is not None and len(state.deliveries)),
+            key=lambda state: (_STATUS_PRIORITY.get(state.status, 3), -state.deliveries_updated_at)
+        )
+        deliveries = []
+        dropped = 0
+        for state in ranked:
+            history = state.deliveries
+            cached = self._delivery_blobs.get(state.match_id)
+            if cached is None or cached[0] != history.version:
+                cached = (history.version, _pack_history(history))
+                self._delivery_blobs[state.match_id] = cached
+            blob = cached[1]
+            if len(blob) > budget:
+                dropped += 1
+                continue
+            budget -= len(blob)
+            deliveries.append((state.match_id, history.high_water, history.low_water, int(history.complete), blob))
+        for match_id in [m for m in self._delivery_blobs if m not in store.matches]:
+            del self._delivery_blobs[match_id]
+
+        self.dropped_histories = dropped
+        return {
+            "signature": signature,
+            "match_list": match_list,
+            "statistics": statistics,
+            "deliveries": deliveries,
+        }
+
+    def write(self, payload: Dict):
+        """Write a collected payload to disk (blocking; run it off the event loop)"""
+        tmp_path = f"{self.path}.tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(SCHEMA)
+            conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("format_version", str(SNAPSHOT_FORMAT_VERSION)),
+                ("saved_at", repr(time.time())),
+            ])
+            conn.executemany("INSERT INTO match_list VALUES (?, ?)", enumerate(payload["match_list"]))
+            conn.executemany("INSERT INTO statistics VALUES (?, ?)", payload["statistics"].items())
+            conn.executemany("INSERT INTO deliveries VALUES (?, ?, ?, ?, ?)", payload["deliveries"])
+            conn.commit()
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.path)
+        self.bytes = os.path.getsize(self.path)
+
+    async def save(self, store: MatchStateStore) -> bool:
+        """Snapshot the store if it changed since the last save"""
+        payload = self.collect(store)
+        if payload is None:
+            self.skipped += 1
+            return False
+        try:
+            await asyncio.to_thread(self.write, payload)
+        except Exception as e:
+            self.errors += 1
+            print(f"[snapshot] write to {self.path} failed: {e}")
+            return False
+        self._saved_signature = payload["signature"]
+        self.saves += 1
+        self.saved_at = time.time()
+        return True
+
+    def read(self) -> Optional[Dict]:
+        """Decoded snapshot contents, or None if missing, too old or of another version (blocking)"""
+        if not os.path.exists(self.path):
+            return None
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            if meta.get("format_version") != str(SNAPSHOT_FORMAT_VERSION):
+                print(f"[snapshot] ignoring {self.path}: format {meta.get('format_version')} != {SNAPSHOT_FORMAT_VERSION}")
+                return None
+            age = time.time() - float(meta.get("saved_at", 0))
+            if age > self.max_age:
+                print(f"[snapshot] ignoring {self.path}: {age:.0f}s old")
+                return None
+            return {
+                "age": age,
+                "match_list": [_unpack(data) for (data,) in conn.execute("SELECT data FROM match_list ORDER BY position")],
+                "statistics": [(match_id, _unpack(data)) for match_id, data in conn.execute("SELECT match_id, data FROM statistics")],
+                "deliveries": [
+                    (match_id, high_water, low_water, bool(complete), *_unpack_history(data))
+                    for match_id, high_water, low_water, complete, data in conn.execute(
+                        "SELECT match_id, high_water, low_water, complete, data FROM deliveries"
+                    )
+                ],
+            }
+        finally:
+            conn.close()
+
+    async def load(self, store: MatchStateStore) -> bool:
+        """Fill an empty store from the snapshot; returns whether anything was loaded"""
+        try:
+            snapshot = await asyncio.to_thread(self.read)
+        except Exception as e:
+            self.errors += 1
+            print(f"[snapshot] could not read {self.path}: {e}")
+            return False
+        if snapshot is None:
+            return False
+
+        store.set_match_list(snapshot["match_list"])
+        for match_id, statistics in snapshot["statistics"]:
+            if store.get(match_id) is not None:
+                store.set_statistics(match_id, statistics)
+        for match_id, high_water, low_water, complete, deliveries, gaps in snapshot["deliveries"]:
+            if store.get(match_id) is None:
+                continue
+            history = store.delivery_history(match_id)
+            # Stored newest first; merge oldest first so every row appends
+            history.merge(deliveries[::-1])
+            history.high_water = high_water
+            history.low_water = low_water
+            history.complete = complete
+            history.gaps = gaps
+            store.get(match_id).deliveries_updated_at = time.time() - snapshot["age"]
+
+        self.loaded_at = time.time()
+        self.loaded_matches = len(store.matches)
+        # The restored state is what is on disk already
+        self._saved_signature = self._signature(store)
+        print(f"[snapshot] restored {self.loaded_matches} matches from {self.path} ({snapshot['age']:.0f}s old)")
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "path": self.path,
+            "bytes": self.bytes,
+            "saves": self.saves,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "savedAt": self.saved_at,
+            "loadedAt": self.loaded_at,
+            "loadedMatches": self.loaded_matches,
+            "droppedHistories": self.dropped_histories,
+        }
+
+
+class SnapshotWriter:
+    """Saves a snapshot every `interval` seconds and once more on stop"""
+
+    def __init__(self, snapshot: MatchSnapshot, store: MatchStateStore, interval: float = 60.0):
+        self.snapshot = snapshot
+        self.store = store
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self.snapshot.save(self.store)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.snapshot.save(self.store)
+            except Exception as e:
+                self.snapshot.errors += 1
+                print(f"[snapshot] save failed: {e}")
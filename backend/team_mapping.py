@@ -1,133 +1,173 @@
 """
 Team code mapping for Live Matches API
-Maps team codes (like 'R', 'O', etc.) to full team names and flag images
+Maps team codes (like 'R', 'O', etc.) to full team names and flag images.
+Teams and the upstream codes aliasing them live in teams.json; codes learned
+at runtime from match statistics are kept in a separate file and reloaded
 """
+import json
+import logging
 import os
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
 
-# Team code to team name and flag mapping
-TEAM_MAPPING = {
-    # New Zealand
-    "R": {
-        "name": "New Zealand",
-        "shortName": "NZ",
-        "flag": "https://flagcdn.com/w40/nz.png",
-        "code": "NZ"
-    },
-    # India
-    "O": {
-        "name": "India",
-        "shortName": "IND",
-        "flag": "https://flagcdn.com/w40/in.png",
-        "code": "IND"
-    },
-    # Australia
-    "A": {
-        "name": "Australia",
-        "shortName": "AUS",
-        "flag": "https://flagcdn.com/w40/au.png",
-        "code": "AUS"
-    },
-    # England
-    "E": {
-        "name": "England",
-        "shortName": "ENG",
-        "flag": "https://flagcdn.com/w40/gb.png",
-        "code": "ENG"
-    },
-    # Pakistan
-    "P": {
-        "name": "Pakistan",
-        "shortName": "PAK",
-        "flag": "https://flagcdn.com/w40/pk.png",
-        "code": "PAK"
-    },
-    # South Africa
-    "S": {
-        "name": "South Africa",
-        "shortName": "RSA",
-        "flag": "https://flagcdn.com/w40/za.png",
-        "code": "RSA"
-    },
-    # West Indies
-    "W": {
-        "name": "West Indies",
-        "shortName": "WI",
-        "flag": "https://flagcdn.com/w40/ag.png",  # Using Antigua as placeholder
-        "code": "WI"
-    },
-    # Sri Lanka
-    "L": {
-        "name": "Sri Lanka",
-        "shortName": "SL",
-        "flag": "https://flagcdn.com/w40/lk.png",
-        "code": "SL"
-    },
-    # Bangladesh
-    "B": {
-        "name": "Bangladesh",
-        "shortName": "BAN",
-        "flag": "https://flagcdn.com/w40/bd.png",
-        "code": "BAN"
-    },
-    # Afghanistan
-    "F": {
-        "name": "Afghanistan",
-        "shortName": "AFG",
-        "flag": "https://flagcdn.com/w40/af.png",
-        "code": "AFG"
-    },
-    # Other common codes (you may need to expand this based on API responses)
-    "MZ": {"name": "Pretoria Capitals", "shortName": "PC", "flag": "https://flagcdn.com/w40/za.png", "code": "PC"},
-    "MY": {"name": "Pretoria Capitals", "shortName": "PC", "flag": "https://flagcdn.com/w40/za.png", "code": "PC"},
-    "MW": {"name": "MI Cape Town", "shortName": "MICT", "flag": "https://flagcdn.com/w40/za.png", "code": "MICT"},
-    "MX": {"name": "MI Cape Town", "shortName": "MICT", "flag": "https://flagcdn.com/w40/za.png", "code": "MICT"},
-    "N0": {"name": "Team 1", "shortName": "T1", "flag": "https://flagcdn.com/w40/xx.png", "code": "T1"},
-    "N1": {"name": "Team 2", "shortName": "T2", "flag": "https://flagcdn.com/w40/xx.png", "code": "T2"},
-    "NW": {"name": "Western Australia Women", "shortName": "WA-W", "flag": "https://flagcdn.com/w40/au.png", "code": "WA-W"},
-    "NV": {"name": "Western Australia Women", "shortName": "WA-W", "flag": "https://flagcdn.com/w40/au.png", "code": "WA-W"},
-    "57": {"name": "Northern Brave", "shortName": "NB", "flag": "https://flagcdn.com/w40/nz.png", "code": "NB"},
-    "54": {"name": "Northern Brave", "shortName": "NB", "flag": "https://flagcdn.com/w40/nz.png", "code": "NB"},
-    "JU": {"name": "Wellington Women", "shortName": "WELL-W", "flag": "https://flagcdn.com/w40/nz.png", "code": "WELL-W"},
-    "JS": {"name": "Wellington Women", "shortName": "WELL-W", "flag": "https://flagcdn.com/w40/nz.png", "code": "WELL-W"},
-    "JT": {"name": "Team 1", "shortName": "T1", "flag": "https://flagcdn.com/w40/xx.png", "code": "T1"},
-    "JV": {"name": "Team 2", "shortName": "T2", "flag": "https://flagcdn.com/w40/xx.png", "code": "T2"},
-    "52": {"name": "Team 1", "shortName": "T1", "flag": "https://flagcdn.com/w40/xx.png", "code": "T1"},
-    "53": {"name": "Team 2", "shortName": "T2", "flag": "https://flagcdn.com/w40/xx.png", "code": "T2"},
-    "H9": {"name": "Team 1", "shortName": "T1", "flag": "https://flagcdn.com/w40/xx.png", "code": "T1"},
-    "GP": {"name": "Team 2", "shortName": "T2", "flag": "https://flagcdn.com/w40/xx.png", "code": "T2"},
-    "HD": {"name": "Team 1", "shortName": "T1", "flag": "https://flagcdn.com/w40/xx.png", "code": "T1"},
-    "GT": {"name": "Team 2", "shortName": "T2", "flag": "https://flagcdn.com/w40/xx.png", "code": "T2"},
-    "T": {"name": "Team 1", "shortName": "T1", "flag": "https://flagcdn.com/w40/xx.png", "code": "T1"},
-    "U": {"name": "Team 2", "shortName": "T2", "flag": "https://flagcdn.com/w40/xx.png", "code": "T2"},
-    "QJ": {"name": "Gujarat Giants Women", "shortName": "GGW", "flag": "https://flagcdn.com/w40/in.png", "code": "GGW"},
-    "QM": {"name": "Gujarat Giants Women", "shortName": "GGW", "flag": "https://flagcdn.com/w40/in.png", "code": "GGW"},
-    "QI": {"name": "Gujarat Giants Women", "shortName": "GGW", "flag": "https://flagcdn.com/w40/in.png", "code": "GGW"},
-    "5T": {"name": "Rajshahi Warriors", "shortName": "RJW", "flag": "https://flagcdn.com/w40/bd.png", "code": "RJW"},
-    "AH": {"name": "Rajshahi Warriors", "shortName": "RJW", "flag": "https://flagcdn.com/w40/bd.png", "code": "RJW"},
-    "1E1": {"name": "Noakhali Express", "shortName": "NEX", "flag": "https://flagcdn.com/w40/bd.png", "code": "NEX"},
-    "UC": {"name": "Noakhali Express", "shortName": "NEX", "flag": "https://flagcdn.com/w40/bd.png", "code": "NEX"},
-    "8O": {"name": "Sri Lanka U19", "shortName": "SL-U19", "flag": "https://flagcdn.com/w40/lk.png", "code": "SL-U19"},
-    "8H": {"name": "Sri Lanka U19", "shortName": "SL-U19", "flag": "https://flagcdn.com/w40/lk.png", "code": "SL-U19"},
-    "K7": {"name": "Majees Titans", "shortName": "MT", "flag": "https://flagcdn.com/w40/xx.png", "code": "MT"},
-    "K3": {"name": "Majees Titans", "shortName": "MT", "flag": "https://flagcdn.com/w40/xx.png", "code": "MT"},
-    "1E6": {"name": "Team 1", "shortName": "T1", "flag": "https://flagcdn.com/w40/xx.png", "code": "T1"},
-    "K2": {"name": "Team 2", "shortName": "T2", "flag": "https://flagcdn.com/w40/xx.png", "code": "T2"},
-    "K5": {"name": "Team 1", "shortName": "T1", "flag": "https://flagcdn.com/w40/xx.png", "code": "T1"},
-    # WPL Teams
-    "4O": {"name": "Delhi Capitals Women", "shortName": "DCW", "flag": "https://flagcdn.com/w40/in.png", "code": "DCW"},
-    "40": {"name": "Delhi Capitals Women", "shortName": "DCW", "flag": "https://flagcdn.com/w40/in.png", "code": "DCW"},
-    "4N": {"name": "Gujarat Giants Women", "shortName": "GGW", "flag": "https://flagcdn.com/w40/in.png", "code": "GGW"},
-    "4Q": {"name": "Gujarat Giants Women", "shortName": "GGW", "flag": "https://flagcdn.com/w40/in.png", "code": "GGW"},
-}
-
-def get_team_info(team_code: str) -> dict:
+from json_file import JSONFileWriter
+
+logger = logging.getLogger(__name__)
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+TEAMS_PATH = os.path.join(_BACKEND_DIR, "teams.json")
+LEARNED_TEAMS_PATH = os.getenv("TEAMS_LEARNED_PATH", os.path.join(_BACKEND_DIR, "teams_learned.json"))
+
+UNKNOWN_FLAG = "https://flagcdn.com/w40/xx.png"
+
+# Statistics fields that may carry the full names of team1/team2, checked in order
+STATISTICS_TEAM_NAME_FIELDS = (("t1", "t2"), ("team1", "team2"), ("tn1", "tn2"))
+
+TeamRecord = Mapping[str, str]
+
+
+def _record(code: str, name: str, short_name: str, flag: str) -> TeamRecord:
+    """Immutable team record with the keys callers index ('name', 'shortName', 'flag', 'code')"""
+    return MappingProxyType({"name": name, "shortName": short_name, "flag": flag, "code": code})
+
+
+def _statistics_name(value) -> Tuple[Optional[str], Optional[str]]:
+    """(name, short name) from a statistics field holding a name or a {'name', 'shortName'} object"""
+    if isinstance(value, str):
+        return value.strip() or None, None
+    if isinstance(value, dict):
+        name = value.get("name") or value.get("n")
+        return (name.strip() or None) if isinstance(name, str) else None, value.get("shortName") or value.get("sn")
+    return None, None
+
+
+class TeamRegistry:
+    """Upstream team codes resolved to shared, read-only team records.
+
+    resolve() is memoized per code, so repeat lookups (every match on every
+    poll) return the same record without allocating. Codes with no mapping, or
+    mapped only to a 'Team 1'/'Team 2' placeholder, can be learned from the
+    full names in match statistics; learned codes are written to the learned
+    file so they survive restarts.
+    """
+
+    def __init__(self, path: str = TEAMS_PATH, learned_path: Optional[str] = LEARNED_TEAMS_PATH):
+        self.path = path
+        self.learned_path = learned_path
+        self._teams: Dict[str, TeamRecord] = {}
+        self._placeholders = set()
+        self._aliases: Dict[str, str] = {}
+        self._by_name: Dict[str, str] = {}
+        self._resolved: Dict[str, TeamRecord] = {}
+        # Learned entries, persisted separately from the curated file
+        self._learned_teams: Dict[str, Dict] = {}
+        self._learned_aliases: Dict[str, str] = {}
+        self._learned_file = JSONFileWriter(learned_path, "teams")
+        # Codes seen with no mapping at all
+        self.unresolved = set()
+        self.misses = 0
+        self.learned = 0
+
+        with open(path) as f:
+            self._load(json.load(f))
+        if learned_path and os.path.exists(learned_path):
+            try:
+                with open(learned_path) as f:
+                    learned = json.load(f)
+                self._learned_teams = learned.get("teams", {})
+                self._learned_aliases = learned.get("aliases", {})
+                self._load(learned)
+            except (OSError, ValueError) as e:
+                logger.warning("ignoring learned teams in %s: %s", learned_path, e)
+
+    def _load(self, data: Dict):
+        for code, team in data.get("teams", {}).items():
+            self._add_team(code, team)
+        for alias, code in data.get("aliases", {}).items():
+            if code in self._teams:
+                self._aliases[alias] = code
+
+    def _add_team(self, code: str, team: Dict):
+        self._teams[code] = _record(code, team["name"], team.get("shortName") or code, team.get("flag") or UNKNOWN_FLAG)
+        if team.get("placeholder"):
+            self._placeholders.add(code)
+        else:
+            self._by_name.setdefault(team["name"].lower(), code)
+
+    def resolve(self, code: str) -> TeamRecord:
+        """Team record for an upstream code; unknown codes get a (cached) record named after the code"""
+        record = self._resolved.get(code)
+        if record is not None:
+            return record
+        self.misses += 1
+        team_code = self._aliases.get(code)
+        if team_code is None:
+            record = _record(code, code, code, UNKNOWN_FLAG)
+            self.unresolved.add(code)
+        else:
+            record = self._teams[team_code]
+        self._resolved[code] = record
+        return record
+
+    def is_known(self, code: str) -> bool:
+        """True if the code maps to a real (non-placeholder) team"""
+        team_code = self._aliases.get(code)
+        return team_code is not None and team_code not in self._placeholders
+
+    def learn(self, code: str, name: str, short_name: Optional[str] = None) -> bool:
+        """Map an unknown or placeholder code to the team with this full name; returns whether anything changed"""
+        if not code or not name or self.is_known(code):
+            return False
+        team_code = self._by_name.get(name.lower())
+        if team_code is None:
+            team_code = short_name or code
+            if team_code in self._teams:
+                team_code = f"{team_code}-{code}"
+            team = {"name": name, "shortName": short_name or code, "flag": UNKNOWN_FLAG}
+            self._learned_teams[team_code] = team
+            self._add_team(team_code, team)
+        self._aliases[code] = team_code
+        self._learned_aliases[code] = team_code
+        self._resolved.pop(code, None)
+        self.unresolved.discard(code)
+        self.learned += 1
+        logger.debug("learned %s -> %s", code, name)
+        self._schedule_save()
+        return True
+
+    def learn_from_statistics(self, stats_data: Dict, team1_code: str, team2_code: str):
+        """Learn unknown team codes from the full names a match statistics response carries"""
+        if self.is_known(team1_code) and self.is_known(team2_code):
+            return
+        for field1, field2 in STATISTICS_TEAM_NAME_FIELDS:
+            if field1 in stats_data or field2 in stats_data:
+                for code, field in ((team1_code, field1), (team2_code, field2)):
+                    name, short_name = _statistics_name(stats_data.get(field))
+                    if name:
+                        self.learn(code, name, short_name)
+                return
+
+    def _schedule_save(self):
+        self._learned_file.schedule({"teams": dict(self._learned_teams), "aliases": dict(self._learned_aliases)})
+
+    def stats(self) -> Dict:
+        return {
+            "teams": len(self._teams),
+            "aliases": len(self._aliases),
+            "learned": self.learned,
+            "resolved": len(self._resolved),
+            "misses": self.misses,
+            "unresolved": sorted(self.unresolved),
+            "saveErrors": self._learned_file.errors,
+        }
+
+
+team_registry = TeamRegistry()
+
+
+def get_team_info(team_code: str) -> TeamRecord:
     """Get team information from team code"""
-    return TEAM_MAPPING.get(team_code, {
-        "name": team_code,
-        "shortName": team_code,
-        "flag": "https://flagcdn.com/w40/xx.png",  # Unknown flag placeholder
-        "code": team_code
-    })
+    return team_registry.resolve(team_code)
 
 def map_team_code(team_code: str) -> str:
     """Map team code to full team name"""
@@ -143,4 +183,3 @@ def get_team_short_name(team_code: str) -> str:
     """Get team short name from team code"""
     team_info = get_team_info(team_code)
     return team_info["shortName"]
-
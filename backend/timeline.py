@@ -0,0 +1,222 @@
+"""
+Global cross-match delivery timeline
+Newly ingested balls from every match are merged into bounded, time-ordered
+ring buffers (one for all balls and one per event type), so the global feed
+is read from memory in O(log n + limit) without touching the database
+"""
+import heapq
+import itertools
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from delivery_store import delivery_feed_id
+
+# Feed filters and the Delivery flag each one selects
+EVENT_TYPES = {
+    "wicket": "isWicket",
+    "six": "isSix",
+    "four": "isFour",
+}
+
+# (feed id, delivery id): feed ids are upstream millisecond timestamps, the id breaks ties across matches
+TimelineKey = Tuple[int, str]
+
+_entry_key = itemgetter(0)
+
+
+def encode_timeline_cursor(key: TimelineKey) -> str:
+    return f"{key[0]},{key[1]}"
+
+
+def decode_timeline_cursor(cursor: Optional[str]) -> Optional[TimelineKey]:
+    """Key from a '<timestamp_ms>,<delivery id>' cursor; raises ValueError if it is invalid"""
+    if not cursor:
+        return None
+    timestamp, _, delivery_id = cursor.partition(",")
+    try:
+        return int(timestamp), delivery_id
+    except ValueError as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of (key, value) entries kept in ascending key order.
+
+    Appending past capacity overwrites the oldest entry. Entries normally
+    arrive at the newest end; merge() handles the occasional late arrival by
+    re-merging only the tail newer than the incoming batch.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items: List = [None] * capacity
+        self._start = 0
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _at(self, index: int):
+        return self._items[(self._start + index) % self.capacity]
+
+    def _append(self, entry) -> Optional[Tuple]:
+        """Append at the newest end; returns the entry it evicted, if any"""
+        if self._len < self.capacity:
+            self._items[(self._start + self._len) % self.capacity] = entry
+            self._len += 1
+            return None
+        evicted = self._items[self._start]
+        self._items[self._start] = entry
+        self._start = (self._start + 1) % self.capacity
+        return evicted
+
+    def _pop(self):
+        self._len -= 1
+        index = (self._start + self._len) % self.capacity
+        entry, self._items[index] = self._items[index], None
+        return entry
+
+    def merge(self, entries: Sequence[Tuple]) -> List[Tuple]:
+        """Merge key-sorted entries in; returns the evicted entries (and any too old to keep)"""
+        if not entries:
+            return []
+        lowest = entries[0][0]
+        tail = []
+        while self._len and self._at(self._len - 1)[0] >= lowest:
+            tail.append(self._pop())
+        tail.reverse()
+
+        evicted = []
+        last_key = self._at(self._len - 1)[0] if self._len else None
+        for entry in heapq.merge(tail, entries, key=_entry_key):
+            if entry[0] == last_key:
+                continue
+            if self._len == self.capacity and entry[0] < self._at(0)[0]:
+                evicted.append(entry)
+                continue
+            dropped = self._append(entry)
+            if dropped is not None:
+                evicted.append(dropped)
+            last_key = entry[0]
+        return evicted
+
+    def bisect_left(self, key: TimelineKey) -> int:
+        lo, hi = 0, self._len
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._at(mid)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def newest_before(self, key: Optional[TimelineKey] = None) -> Iterator[Tuple]:
+        """Entries older than key (all when None), newest first, lazily"""
+        end = self._len if key is None else self.bisect_left(key)
+        for index in range(end - 1, -1, -1):
+            yield self._at(index)
+
+
+def _newest_views(history, limit: int) -> Iterator[Tuple]:
+    for index in history.page_range(None, limit):
+        view = history.view(index)
+        yield (view.feed_id, view.id), view
+
+
+class GlobalTimeline:
+    """Latest balls across all matches, plus per-event-type views.
+
+    add() takes each match's newly ingested deliveries (the poller's deltas),
+    rebuild() k-way merges every match's stored history (e.g. after a snapshot
+    restore). Commentary items are left out. Comment counts start from the
+    ingested value and are bumped by add_comment() for comments written here.
+    """
+
+    def __init__(self, capacity: int = 5000, type_capacity: int = 1000):
+        self.capacity = capacity
+        self._all = RingBuffer(capacity)
+        self._by_type: Dict[str, RingBuffer] = {event: RingBuffer(type_capacity) for event in EVENT_TYPES}
+        self._comment_counts: Dict[str, int] = {}
+        self.added = 0
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def _entries(self, deliveries: Iterable[Dict]) -> List[Tuple[TimelineKey, Dict]]:
+        entries = [
+            ((delivery_feed_id(delivery), delivery["id"]), delivery)
+            for delivery in deliveries if delivery.get("_type") != "commentary"
+        ]
+        entries.sort(key=_entry_key)
+        return entries
+
+    def _merge(self, entries: List[Tuple[TimelineKey, Dict]]):
+        for key, _ in self._all.merge(entries):
+            self._comment_counts.pop(key[1], None)
+        for event, flag in EVENT_TYPES.items():
+            matching = [entry for entry in entries if entry[1].get(flag)]
+            if matching:
+                self._by_type[event].merge(matching)
+        self.added += len(entries)
+
+    def add(self, deliveries: Iterable[Dict]):
+        """Merge newly ingested deliveries of one match"""
+        self._merge(self._entries(deliveries))
+
+    def rebuild(self, histories: Iterable) -> int:
+        """Merge the newest `capacity` balls of every DeliveryStore; returns how many were added"""
+        # Each history pages newest first, so this is a k-way merge of sorted streams
+        newest = heapq.merge(*(_newest_views(history, self.capacity) for history in histories), key=_entry_key, reverse=True)
+        entries = [
+            (key, view.to_dict()) for key, view in itertools.islice(
+                (entry for entry in newest if not entry[1].is_commentary), self.capacity
+            )
+        ]
+        entries.reverse()
+        self._merge(entries)
+        return len(entries)
+
+    def add_comment(self, delivery_id: str):
+        """Count a comment written to a delivery that is in the timeline"""
+        if delivery_id in self._comment_counts or self._contains(delivery_id):
+            self._comment_counts[delivery_id] = self._comment_counts.get(delivery_id, 0) + 1
+
+    def _contains(self, delivery_id: str) -> bool:
+        feed_id = delivery_feed_id({"id": delivery_id})
+        if not feed_id:
+            return False
+        index = self._all.bisect_left((feed_id, delivery_id))
+        return index < len(self._all) and self._all._at(index)[0] == (feed_id, delivery_id)
+
+    def page(
+        self,
+        before: Optional[TimelineKey] = None,
+        limit: int = 20,
+        types: Sequence[str] = (),
+    ) -> Tuple[List[Dict], Optional[TimelineKey]]:
+        """Newest-first page older than `before`, optionally only the given event types, and the next cursor key"""
+        if not types:
+            stream = self._all.newest_before(before)
+        elif len(types) == 1:
+            stream = self._by_type[types[0]].newest_before(before)
+        else:
+            merged = heapq.merge(
+                *(self._by_type[event].newest_before(before) for event in types), key=_entry_key, reverse=True
+            )
+            # Delivery flags are not mutually exclusive, so drop a ball listed under two types
+            stream = (next(group) for _, group in itertools.groupby(merged, key=_entry_key))
+        page = list(itertools.islice(stream, limit + 1))
+        next_key = page[limit - 1][0] if len(page) > limit else None
+        deliveries = []
+        for _, delivery in page[:limit]:
+            extra = self._comment_counts.get(delivery["id"], 0)
+            deliveries.append({**delivery, "commentCount": delivery.get("commentCount", 0) + extra} if extra else delivery)
+        return deliveries, next_key
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._all),
+            "capacity": self.capacity,
+            "byType": {event: len(ring) for event, ring in self._by_type.items()},
+            "added": self.added,
+        }
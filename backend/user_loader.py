@@ -0,0 +1,156 @@
+"""
+Batched, cached user-profile lookups for comment authors
+Ids requested in the same event-loop tick are fetched with one query, and the
+resulting User dicts are kept in an LRU cache with a TTL and shared between
+responses
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+
+def user_from_row(row: Dict) -> Dict:
+    """User response dict from a users row"""
+    return {
+        "id": row.get("id"),
+        "username": row.get("username"),
+        "email": row.get("email"),
+        "avatar": row.get("avatar"),
+        "createdAt": row.get("created_at")
+    }
+
+
+def placeholder_user(user_id: str) -> Dict:
+    """Stand-in User dict for an author that is missing or could not be loaded"""
+    return {
+        "id": user_id,
+        "username": "unknown",
+        "email": "",
+        "avatar": None,
+        "createdAt": ""
+    }
+
+
+class UserLoader:
+    """DataLoader-style batching in front of an LRU + TTL cache.
+
+    `fetch(user_ids)` returns the users rows for a list of ids (one query).
+    Cached User dicts are shared by every response that references them, so
+    callers must not mutate them. Users that do not exist (or fail to load) are
+    left out of the result and not cached; see placeholder_user().
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[List[str]], Awaitable[Iterable[Dict]]],
+        max_entries: int = 5000,
+        ttl: float = 300.0,
+        max_batch: int = 500,
+    ):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_batch = max_batch
+        self._cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._queue: Dict[str, asyncio.Future] = {}
+        self._dispatch_scheduled = False
+        self._dispatches: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.errors = 0
+
+    def _cached(self, user_id: str) -> Optional[Dict]:
+        entry = self._cache.get(user_id)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._cache[user_id]
+            return None
+        self._cache.move_to_end(user_id)
+        return entry[1]
+
+    def prime(self, user_id: str, user: Dict):
+        """Cache a User dict, evicting the least recently used entries past max_entries"""
+        self._cache[user_id] = (time.monotonic(), user)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        self._cache.pop(user_id, None)
+
+    async def load_many(self, user_ids: Iterable[str]) -> Dict[str, Dict]:
+        """User dicts by id for the ids that exist; misses are batched with concurrent callers"""
+        users: Dict[str, Dict] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        loop = asyncio.get_running_loop()
+        for user_id in user_ids:
+            if not user_id or user_id in users or user_id in waiting:
+                continue
+            user = self._cached(user_id)
+            if user is not None:
+                self.hits += 1
+                users[user_id] = user
+                continue
+            self.misses += 1
+            future = self._queue.get(user_id)
+            if future is None:
+                future = loop.create_future()
+                self._queue[user_id] = future
+            waiting[user_id] = future
+
+        if waiting:
+            if not self._dispatch_scheduled:
+                # Dispatch once everything requested in this tick has been queued
+                self._dispatch_scheduled = True
+                loop.call_soon(self._start_dispatch)
+            # shield() so one cancelled request does not fail the shared batch
+            results = await asyncio.gather(*(asyncio.shield(f) for f in waiting.values()))
+            for user_id, user in zip(waiting, results):
+                if user is not None:
+                    users[user_id] = user
+        return users
+
+    async def load(self, user_id: str) -> Optional[Dict]:
+        return (await self.load_many([user_id])).get(user_id)
+
+    def _start_dispatch(self):
+        # Keep a reference so the batch task is not garbage collected mid-flight
+        task = asyncio.ensure_future(self._dispatch())
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self):
+        self._dispatch_scheduled = False
+        queue, self._queue = self._queue, {}
+        ids = list(queue)
+        for start in range(0, len(ids), self.max_batch):
+            batch = ids[start:start + self.max_batch]
+            self.batches += 1
+            try:
+                rows = await self.fetch(batch)
+            except Exception as e:
+                self.errors += 1
+                # Nothing is cached, so the next load retries; until then the
+                # comments render with placeholder authors
+                print(f"[users] loading {len(batch)} users failed: {e}")
+                rows = []
+            found = {}
+            for row in rows or []:
+                user = user_from_row(row)
+                self.prime(user["id"], user)
+                found[user["id"]] = user
+            for user_id in batch:
+                if not queue[user_id].done():
+                    queue[user_id].set_result(found.get(user_id))
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "batches": self.batches,
+            "errors": self.errors,
+        }
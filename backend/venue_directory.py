@@ -0,0 +1,142 @@
+"""
+Venue code directory for Live Matches API
+The match list only carries a short venue code ('v'); names and locations are
+backfilled from match statistics payloads, kept in memory and persisted to a
+local JSON file so the list renders proper venues with no extra upstream call
+"""
+import json
+import logging
+import os
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from json_file import JSONFileWriter
+
+logger = logging.getLogger(__name__)
+
+VENUES_PATH = os.getenv(
+    "VENUES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "venues.json")
+)
+
+# Statistics fields that may carry the venue's full name and location, checked in order
+STATISTICS_VENUE_NAME_FIELDS = ("vn", "venueName", "venue")
+STATISTICS_VENUE_LOCATION_FIELDS = ("vl", "venueLocation", "city")
+
+VenueRecord = Mapping[str, Optional[str]]
+
+
+def _record(code: str, name: str, location: Optional[str]) -> VenueRecord:
+    return MappingProxyType({"code": code, "name": name, "location": location})
+
+
+def _first_text(data: Dict, fields: Tuple[str, ...]) -> Optional[str]:
+    for field in fields:
+        value = data.get(field)
+        if isinstance(value, str) and value.strip():
+            return value
+    return None
+
+
+def split_venue_name(text: str) -> Tuple[str, Optional[str]]:
+    """'Melbourne Cricket Ground, Melbourne' -> ('Melbourne Cricket Ground', 'Melbourne')"""
+    name, sep, location = text.rpartition(", ")
+    if not sep or not name:
+        return text.strip(), None
+    return name.strip(), location.strip() or None
+
+
+class VenueDirectory:
+    """Venue codes resolved to shared, read-only {code, name, location} records.
+
+    resolve() is memoized per code; unknown codes resolve to a record named
+    after the code until a statistics payload names them. The match list's
+    code for each match is remembered so a statistics payload for that match
+    can be tied back to it even when the payload spells the venue out.
+    """
+
+    def __init__(self, path: Optional[str] = VENUES_PATH, max_matches: int = 2000):
+        self.path = path
+        self.max_matches = max_matches
+        self._venues: Dict[str, Dict] = {}
+        self._resolved: Dict[str, VenueRecord] = {}
+        self._match_codes: "OrderedDict[str, str]" = OrderedDict()
+        self._file = JSONFileWriter(path, "venues")
+        self.learned = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._venues = json.load(f).get("venues", {})
+            except (OSError, ValueError) as e:
+                logger.warning("ignoring %s: %s", path, e)
+
+    def resolve(self, code: str) -> VenueRecord:
+        record = self._resolved.get(code)
+        if record is None:
+            venue = self._venues.get(code)
+            record = _record(code, venue["name"], venue.get("location")) if venue else _record(code, code, None)
+            self._resolved[code] = record
+        return record
+
+    def is_known(self, code: str) -> bool:
+        return code in self._venues
+
+    def note_match(self, match_id: str, code: str):
+        """Remember the list's venue code for a match (bounded, most recent kept)"""
+        if not match_id or not code:
+            return
+        if self._match_codes.get(match_id) != code:
+            self._match_codes[match_id] = code
+        self._match_codes.move_to_end(match_id)
+        if len(self._match_codes) > self.max_matches:
+            self._match_codes.popitem(last=False)
+
+    def match_code(self, match_id: str, default: str = "") -> str:
+        return self._match_codes.get(match_id, default)
+
+    def learn(self, code: str, name: str, location: Optional[str] = None) -> bool:
+        """Record a code's name/location; returns whether the directory changed"""
+        if not code or not name or name == code:
+            return False
+        venue = self._venues.get(code)
+        if venue is not None and venue["name"] == name and (venue.get("location") or not location):
+            return False
+        self._venues[code] = {"name": name, "location": location or (venue or {}).get("location")}
+        self._resolved.pop(code, None)
+        self.learned += 1
+        logger.debug("learned %s -> %s", code, name)
+        self._schedule_save()
+        return True
+
+    def backfill(self, match_id: str, stats_data: Dict) -> VenueRecord:
+        """Learn the venue of a match from its statistics payload; returns the resolved record"""
+        stats_venue = stats_data.get("v") or ""
+        code = self.match_code(match_id, stats_venue)
+        if not code:
+            return self.resolve(code)
+        name = _first_text(stats_data, STATISTICS_VENUE_NAME_FIELDS)
+        location = _first_text(stats_data, STATISTICS_VENUE_LOCATION_FIELDS)
+        if name is None and stats_venue != code and " " in stats_venue.strip():
+            # The list's code spelled out in full, e.g. 'Melbourne Cricket Ground, Melbourne'
+            name = stats_venue
+        if name:
+            if location is None:
+                name, location = split_venue_name(name)
+            self.learn(code, name.strip(), location.strip() if location else None)
+        return self.resolve(code)
+
+    def _schedule_save(self):
+        self._file.schedule({"venues": {code: dict(venue) for code, venue in self._venues.items()}})
+
+    def stats(self) -> Dict:
+        return {
+            "venues": len(self._venues),
+            "resolved": len(self._resolved),
+            "unresolved": sorted(code for code in self._resolved if code and code not in self._venues),
+            "learned": self.learned,
+            "trackedMatches": len(self._match_codes),
+            "saveErrors": self._file.errors,
+        }
+
+
+venue_directory = VenueDirectory()
@@ -0,0 +1,393 @@
+"""
+In-process write-behind buffers for votes and comments
+Writes are acknowledged immediately, coalesced in memory and flushed to Supabase
+in batches on a size or time trigger; reads overlay what is still pending
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from metrics import LatencyHistogram
+
+# A batch that keeps failing is retried this many times before it is dropped
+MAX_FLUSH_ATTEMPTS = 5
+
+
+class WriteBehindBuffer:
+    """Keyed write buffer with last-write-wins coalescing.
+
+    put() replaces any pending value for the same key. A background task hands
+    up to max_batch pending values to flush_batch whenever max_batch values are
+    waiting or flush_interval seconds have passed. Failed batches are requeued
+    (unless superseded by a newer write) and dropped after MAX_FLUSH_ATTEMPTS.
+    stop() drains everything that is still pending.
+    """
+
+    # Retry the rows of a failed batch one by one (see _write)
+    split_failed_batches = True
+
+    def __init__(
+        self,
+        name: str,
+        flush_batch: Callable[[List[Any]], Awaitable[None]],
+        max_batch: int = 500,
+        flush_interval: float = 0.25,
+        max_pending: int = 50000,
+    ):
+        self.name = name
+        self.flush_batch = flush_batch
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._inflight: Dict[Hashable, Any] = {}
+        self._attempts: Dict[Hashable, int] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flush_latency = LatencyHistogram()
+        self.enqueued = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.errors = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and flush everything still pending"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        # Every failed write is retried up to MAX_FLUSH_ATTEMPTS times, so this ends
+        while self._pending:
+            if not await self.flush():
+                await asyncio.sleep(self.flush_interval)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def put(self, key: Hashable, value: Any):
+        """Queue a write; a pending write for the same key is replaced"""
+        self.enqueued += 1
+        if key in self._pending:
+            self.coalesced += 1
+        self._pending[key] = value
+        self._attempts.pop(key, None)
+        if len(self._pending) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+        if len(self._pending) >= self.max_pending:
+            # Backpressure: the writer waits for a flush instead of growing the buffer
+            await self.flush()
+
+    def pending(self, key: Hashable) -> Optional[Any]:
+        """The value not yet visible in the database for key (pending or being flushed)"""
+        value = self._pending.get(key)
+        return value if value is not None else self._inflight.get(key)
+
+    def pending_values(self) -> List[Any]:
+        return list(self._inflight.values()) + list(self._pending.values())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending and not self._stopping:
+                if not await self.flush():
+                    break
+
+    async def _write(self, keys: List[Hashable]) -> List[Hashable]:
+        """Write the in-flight values for keys; returns the keys that were rejected.
+
+        If a multi-row batch fails, its rows are retried one by one so a single
+        bad row (e.g. a dangling foreign key) cannot hold back the rest. Raises
+        if nothing could be written, so the batch is retried later.
+        """
+        try:
+            await self.flush_batch([self._inflight[key] for key in keys])
+            return []
+        except Exception as e:
+            if len(keys) == 1 or not self.split_failed_batches:
+                raise
+            print(f"Write-behind {self.name}: batch of {len(keys)} failed ({e}), retrying rows individually")
+        results = await asyncio.gather(
+            *(self.flush_batch([self._inflight[key]]) for key in keys),
+            return_exceptions=True
+        )
+        rejected = [key for key, result in zip(keys, results) if isinstance(result, Exception)]
+        if len(rejected) == len(keys):
+            raise results[0]
+        return rejected
+
+    async def flush(self) -> bool:
+        """Flush one batch; returns False if it failed"""
+        async with self._flush_lock:
+            if not self._pending:
+                return True
+            keys = []
+            while self._pending and len(keys) < self.max_batch:
+                key, value = self._pending.popitem(last=False)
+                self._inflight[key] = value
+                keys.append(key)
+
+            started = time.perf_counter()
+            rejected = set()
+            try:
+                rejected = set(await self._write(keys))
+                ok = True
+                self.flushes += 1
+            except Exception as e:
+                ok = False
+                self.errors += 1
+                print(f"Write-behind {self.name}: flush of {len(keys)} writes failed: {e}")
+            finally:
+                self.flush_latency.observe((time.perf_counter() - started) * 1000)
+
+            for key in keys:
+                value = self._inflight.pop(key)
+                if ok and key not in rejected:
+                    self.flushed += 1
+                    self._attempts.pop(key, None)
+                    self._on_flushed(key, value)
+                elif key in self._pending:
+                    # Superseded by a newer write while the batch was in flight
+                    self._on_discarded(key, value)
+                else:
+                    attempts = self._attempts.get(key, 0) + 1
+                    if attempts >= MAX_FLUSH_ATTEMPTS:
+                        print(f"Write-behind {self.name}: dropping {key} after {attempts} failed attempts")
+                        self.dropped += 1
+                        self._attempts.pop(key, None)
+                        self._on_discarded(key, value)
+                    else:
+                        self._attempts[key] = attempts
+                        self._pending[key] = value
+                        self._pending.move_to_end(key, last=False)
+            return ok
+
+    def _on_flushed(self, key: Hashable, value: Any):
+        """Hook called for each write once it is in the database"""
+
+    def _on_discarded(self, key: Hashable, value: Any):
+        """Hook called for each write that will never be flushed (given up on or superseded)"""
+
+    def stats(self) -> Dict:
+        return {
+            "depth": len(self._pending),
+            "inflight": len(self._inflight),
+            "enqueued": self.enqueued,
+            "coalesced": self.coalesced,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "flushLatency": self.flush_latency.to_dict(),
+        }
+
+
+class RecentWrites:
+    """Writes flushed in the last `window` seconds, grouped by a key.
+
+    Lets readers that serve a snapshot loaded before a flush (e.g. a cached
+    comment page) add the writes that landed after the snapshot was taken.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._order = deque()
+        self._by_group: Dict[Hashable, deque] = {}
+
+    def add(self, group: Hashable, item: Any):
+        now = time.monotonic()
+        self._order.append((now, group))
+        self._by_group.setdefault(group, deque()).append((now, item))
+        self.prune(now)
+
+    def prune(self, now: Optional[float] = None):
+        cutoff = (now or time.monotonic()) - self.window
+        while self._order and self._order[0][0] < cutoff:
+            _, group = self._order.popleft()
+            items = self._by_group[group]
+            items.popleft()
+            if not items:
+                del self._by_group[group]
+
+    def has(self, group: Hashable) -> bool:
+        return group in self._by_group
+
+    def since(self, group: Hashable, since: float) -> List[Any]:
+        """Items of a group flushed after `since` (a time.monotonic() value)"""
+        return [item for flushed_at, item in self._by_group.get(group, ()) if flushed_at > since]
+
+    def all_since(self, since: float) -> List[Any]:
+        return [item for items in self._by_group.values() for flushed_at, item in items if flushed_at > since]
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+
+def _vote_effect(previous: Optional[str], vote: Optional[str]) -> Tuple[int, int]:
+    """(upvote delta, downvote delta) of changing a user's vote from previous to vote"""
+    up = (vote == "up") - (previous == "up")
+    down = (vote == "down") - (previous == "down")
+    return up, down
+
+
+class VoteWriteBehind(WriteBehindBuffer):
+    """Votes keyed by (comment_id, user_id), flushed as one upsert per batch.
+
+    Keeps per-comment tally deltas for pending votes so read responses can
+    include them. The delta of a vote is relative to the user's last vote this
+    process wrote (or no vote), which is exact for first-time voters and for
+    users who only vote through this instance.
+    """
+
+    def __init__(
+        self,
+        flush_batch: Callable[[List[Dict]], Awaitable[None]],
+        known_votes: int = 100000,
+        recent_window: float = 60.0,
+        **kwargs
+    ):
+        # Buffered values are (row, tally effect); only the rows are written
+        super().__init__("votes", lambda batch: flush_batch([row for row, _ in batch]), **kwargs)
+        self.known_votes = known_votes
+        self._known: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._deltas: Dict[str, List[int]] = {}
+        self._recent = RecentWrites(recent_window)
+
+    def _adjust(self, comment_id: str, effect: Tuple[int, int], sign: int):
+        delta = self._deltas.setdefault(comment_id, [0, 0])
+        delta[0] += sign * effect[0]
+        delta[1] += sign * effect[1]
+        if delta == [0, 0]:
+            del self._deltas[comment_id]
+
+    async def vote(self, comment_id: str, user_id: str, vote: str) -> Tuple[int, int]:
+        """Queue a vote; returns its (upvote, downvote) effect on the comment's tallies"""
+        key = (comment_id, user_id)
+        replaced = self._pending.get(key)
+        if replaced is not None:
+            self._adjust(comment_id, replaced[1], -1)
+        inflight = self._inflight.get(key)
+        base = inflight[0]["vote"] if inflight is not None else self._known.get(key)
+        effect = _vote_effect(base, vote)
+        self._adjust(comment_id, effect, 1)
+        await self.put(key, ({"comment_id": comment_id, "user_id": user_id, "vote": vote}, effect))
+        return effect
+
+    def _on_flushed(self, key: Tuple[str, str], value: Tuple[Dict, Tuple[int, int]]):
+        self._known[key] = value[0]["vote"]
+        self._known.move_to_end(key)
+        if len(self._known) > self.known_votes:
+            self._known.popitem(last=False)
+        self._adjust(key[0], value[1], -1)
+        self._recent.add(key[0], value[1])
+
+    def _on_discarded(self, key: Tuple[str, str], value: Tuple[Dict, Tuple[int, int]]):
+        self._adjust(key[0], value[1], -1)
+
+    def tally_delta(self, comment_id: str, since: Optional[float] = None) -> Tuple[int, int]:
+        """Pending (upvote, downvote) change for a comment.
+
+        With `since` (a time.monotonic() value), votes flushed after that time
+        are included too, for tallies read from a snapshot taken at `since`.
+        """
+        delta = self._deltas.get(comment_id)
+        up, down = (delta[0], delta[1]) if delta else (0, 0)
+        if since is not None and self._recent.has(comment_id):
+            for effect in self._recent.since(comment_id, since):
+                up += effect[0]
+                down += effect[1]
+        return up, down
+
+    def user_vote(self, comment_id: str, user_id: str) -> Optional[str]:
+        value = self.pending((comment_id, user_id))
+        return value[0]["vote"] if value else None
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        stats["commentsWithPendingVotes"] = len(self._deltas)
+        return stats
+
+
+class CommentWriteBehind(WriteBehindBuffer):
+    """New comments keyed by their pre-generated id, flushed as one insert per batch.
+
+    The author's user object is kept with each pending row so pending comments
+    can be shown in read responses before they reach the database.
+    """
+
+    def __init__(self, flush_batch: Callable[[List[Dict]], Awaitable[None]], recent_window: float = 60.0, **kwargs):
+        # Buffered values are (row, user); only the rows are written
+        super().__init__("comments", lambda batch: flush_batch([row for row, _ in batch]), **kwargs)
+        self._by_delivery: Dict[str, int] = {}
+        self._recent = RecentWrites(recent_window)
+
+    async def add(self, row: Dict, user: Optional[Dict] = None):
+        """Queue a comment row (with its id already set)"""
+        delivery_id = row["delivery_id"]
+        self._by_delivery[delivery_id] = self._by_delivery.get(delivery_id, 0) + 1
+        await self.put(row["id"], (row, user))
+
+    def _settle(self, row: Dict):
+        delivery_id = row["delivery_id"]
+        remaining = self._by_delivery.get(delivery_id, 0) - 1
+        if remaining > 0:
+            self._by_delivery[delivery_id] = remaining
+        else:
+            self._by_delivery.pop(delivery_id, None)
+
+    def _on_flushed(self, key: str, value: Tuple[Dict, Optional[Dict]]):
+        self._settle(value[0])
+        self._recent.add(value[0]["delivery_id"], value)
+
+    def _on_discarded(self, key: str, value: Tuple[Dict, Optional[Dict]]):
+        self._settle(value[0])
+
+    def pending_count(self, delivery_id: str) -> int:
+        return self._by_delivery.get(delivery_id, 0)
+
+    def pending_for(
+        self,
+        delivery_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        since: Optional[float] = None,
+    ) -> List[Tuple[Dict, Optional[Dict]]]:
+        """Pending (row, user) pairs for a delivery and/or parent comment, oldest first.
+
+        With `since` (a time.monotonic() value), comments flushed after that
+        time are included too, for lists read from a snapshot taken at `since`.
+        """
+        if delivery_id is not None and delivery_id not in self._by_delivery and (
+            since is None or not self._recent.has(delivery_id)
+        ):
+            return []
+        values = self.pending_values()
+        if since is not None:
+            values += self._recent.since(delivery_id, since) if delivery_id is not None else self._recent.all_since(since)
+        pending = [
+            value for value in values
+            if (delivery_id is None or value[0]["delivery_id"] == delivery_id)
+            and (parent_id is None or value[0].get("parent_id") == parent_id)
+        ]
+        pending.sort(key=lambda value: value[0]["created_at"])
+        return pending
@@ -0,0 +1,87 @@
+-- CricBase Atomic Counters Migration
+-- Keeps deliveries.comment_count and comments.upvotes/downvotes up to date with
+-- triggers, and adds cast_comment_vote() so a vote is a single RPC
+
+-- Comment count per delivery, adjusted in the same transaction as the insert/delete
+CREATE OR REPLACE FUNCTION public.update_delivery_comment_count()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE public.deliveries SET comment_count = COALESCE(comment_count, 0) + 1
+        WHERE id = NEW.delivery_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE public.deliveries SET comment_count = GREATEST(COALESCE(comment_count, 0) - 1, 0)
+        WHERE id = OLD.delivery_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_delivery_comment_count ON public.comments;
+CREATE TRIGGER update_delivery_comment_count AFTER INSERT OR DELETE ON public.comments
+    FOR EACH ROW EXECUTE FUNCTION public.update_delivery_comment_count();
+
+-- Vote tallies per comment, adjusted by the delta of each vote row change
+CREATE OR REPLACE FUNCTION public.update_comment_vote_tally()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    up_delta INTEGER := 0;
+    down_delta INTEGER := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.vote = 'up' THEN up_delta := up_delta - 1; ELSE down_delta := down_delta - 1; END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.vote = 'up' THEN up_delta := up_delta + 1; ELSE down_delta := down_delta + 1; END IF;
+    END IF;
+    IF up_delta <> 0 OR down_delta <> 0 THEN
+        UPDATE public.comments
+        SET upvotes = GREATEST(COALESCE(upvotes, 0) + up_delta, 0),
+            downvotes = GREATEST(COALESCE(downvotes, 0) + down_delta, 0)
+        WHERE id = COALESCE(NEW.comment_id, OLD.comment_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_comment_vote_tally ON public.comment_votes;
+CREATE TRIGGER update_comment_vote_tally AFTER INSERT OR UPDATE OF vote OR DELETE ON public.comment_votes
+    FOR EACH ROW EXECUTE FUNCTION public.update_comment_vote_tally();
+
+-- Insert or change a user's vote and return the comment's new tallies.
+-- Re-casting the same vote is a no-op; concurrent votes serialize on the vote row.
+CREATE OR REPLACE FUNCTION public.cast_comment_vote(p_comment_id UUID, p_user_id UUID, p_vote TEXT)
+RETURNS TABLE (upvotes INTEGER, downvotes INTEGER)
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF p_vote NOT IN ('up', 'down') THEN
+        RAISE EXCEPTION 'invalid vote: %', p_vote USING ERRCODE = '22023';
+    END IF;
+
+    INSERT INTO public.comment_votes (comment_id, user_id, vote)
+    VALUES (p_comment_id, p_user_id, p_vote)
+    ON CONFLICT (comment_id, user_id) DO UPDATE SET vote = EXCLUDED.vote
+    WHERE public.comment_votes.vote IS DISTINCT FROM EXCLUDED.vote;
+
+    RETURN QUERY
+    SELECT c.upvotes, c.downvotes FROM public.comments c WHERE c.id = p_comment_id;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION public.cast_comment_vote(UUID, UUID, TEXT) TO anon, authenticated;
+
+-- One-off resync of counters written by the previous read-modify-write code
+UPDATE public.deliveries d
+SET comment_count = (SELECT COUNT(*) FROM public.comments c WHERE c.delivery_id = d.id);
+
+UPDATE public.comments c
+SET upvotes = (SELECT COUNT(*) FROM public.comment_votes v WHERE v.comment_id = c.id AND v.vote = 'up'),
+    downvotes = (SELECT COUNT(*) FROM public.comment_votes v WHERE v.comment_id = c.id AND v.vote = 'down');
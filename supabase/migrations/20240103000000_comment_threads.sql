@@ -0,0 +1,107 @@
+-- CricBase Comment Threads Migration
+-- Adds a stored score column and indexes for keyset-paginated root comments,
+-- and functions returning one page of roots or replies with their authors
+
+ALTER TABLE public.comments
+    ADD COLUMN IF NOT EXISTS score INTEGER GENERATED ALWAYS AS (COALESCE(upvotes, 0) - COALESCE(downvotes, 0)) STORED;
+
+-- Root comments of a delivery, newest first and top first
+CREATE INDEX IF NOT EXISTS idx_comments_roots_new ON public.comments(delivery_id, created_at DESC, id DESC)
+    WHERE parent_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_comments_roots_top ON public.comments(delivery_id, score DESC, id DESC)
+    WHERE parent_id IS NULL;
+-- Replies of a comment, oldest first
+CREATE INDEX IF NOT EXISTS idx_comments_replies ON public.comments(parent_id, created_at, id)
+    WHERE parent_id IS NOT NULL;
+
+-- One page of root comments. Pass the last row of the previous page as the cursor:
+-- (created_at, id) for sort 'new', (score, id) for sort 'top'.
+CREATE OR REPLACE FUNCTION public.get_root_comments(
+    p_delivery_id UUID,
+    p_sort TEXT DEFAULT 'new',
+    p_limit INTEGER DEFAULT 50,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_score INTEGER DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    delivery_id UUID,
+    user_id UUID,
+    content TEXT,
+    parent_id UUID,
+    upvotes INTEGER,
+    downvotes INTEGER,
+    score INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE,
+    "user" JSONB
+)
+STABLE
+SET search_path = public
+AS $$
+BEGIN
+    IF p_sort = 'top' THEN
+        RETURN QUERY
+        SELECT c.id, c.delivery_id, c.user_id, c.content, c.parent_id, c.upvotes, c.downvotes, c.score, c.created_at,
+               jsonb_build_object('id', u.id, 'username', u.username, 'email', u.email, 'avatar', u.avatar, 'created_at', u.created_at)
+        FROM public.comments c
+        LEFT JOIN public.users u ON u.id = c.user_id
+        WHERE c.delivery_id = p_delivery_id
+          AND c.parent_id IS NULL
+          AND (p_cursor_id IS NULL OR (c.score, c.id) < (p_cursor_score, p_cursor_id))
+        ORDER BY c.score DESC, c.id DESC
+        LIMIT p_limit;
+    ELSE
+        RETURN QUERY
+        SELECT c.id, c.delivery_id, c.user_id, c.content, c.parent_id, c.upvotes, c.downvotes, c.score, c.created_at,
+               jsonb_build_object('id', u.id, 'username', u.username, 'email', u.email, 'avatar', u.avatar, 'created_at', u.created_at)
+        FROM public.comments c
+        LEFT JOIN public.users u ON u.id = c.user_id
+        WHERE c.delivery_id = p_delivery_id
+          AND c.parent_id IS NULL
+          AND (p_cursor_id IS NULL OR (c.created_at, c.id) < (p_cursor_created_at, p_cursor_id))
+        ORDER BY c.created_at DESC, c.id DESC
+        LIMIT p_limit;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Up to p_limit replies per parent, oldest first, for every parent in p_parent_ids.
+-- The cursor (last row of the previous page) is only meaningful for a single parent.
+CREATE OR REPLACE FUNCTION public.get_comment_replies(
+    p_parent_ids UUID[],
+    p_limit INTEGER DEFAULT 10,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+    id UUID,
+    delivery_id UUID,
+    user_id UUID,
+    content TEXT,
+    parent_id UUID,
+    upvotes INTEGER,
+    downvotes INTEGER,
+    score INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE,
+    "user" JSONB
+)
+STABLE
+SET search_path = public
+AS $$
+    SELECT r.*
+    FROM unnest(p_parent_ids) AS p(parent_id)
+    CROSS JOIN LATERAL (
+        SELECT c.id, c.delivery_id, c.user_id, c.content, c.parent_id, c.upvotes, c.downvotes, c.score, c.created_at,
+               jsonb_build_object('id', u.id, 'username', u.username, 'email', u.email, 'avatar', u.avatar, 'created_at', u.created_at)
+        FROM public.comments c
+        LEFT JOIN public.users u ON u.id = c.user_id
+        WHERE c.parent_id = p.parent_id
+          AND (p_cursor_id IS NULL OR (c.created_at, c.id) > (p_cursor_created_at, p_cursor_id))
+        ORDER BY c.created_at, c.id
+        LIMIT p_limit
+    ) r;
+$$ LANGUAGE sql;
+
+GRANT EXECUTE ON FUNCTION public.get_root_comments(UUID, TEXT, INTEGER, TIMESTAMP WITH TIME ZONE, INTEGER, UUID) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_comment_replies(UUID[], INTEGER, TIMESTAMP WITH TIME ZONE, UUID) TO anon, authenticated;
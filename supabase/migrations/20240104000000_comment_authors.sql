@@ -0,0 +1,70 @@
+-- CricBase Comment Authors Migration
+-- Comment page functions return comment rows only; the backend resolves authors
+-- through a batched, cached users lookup instead of joining users on every page
+
+DROP FUNCTION IF EXISTS public.get_root_comments(UUID, TEXT, INTEGER, TIMESTAMP WITH TIME ZONE, INTEGER, UUID);
+DROP FUNCTION IF EXISTS public.get_comment_replies(UUID[], INTEGER, TIMESTAMP WITH TIME ZONE, UUID);
+
+-- One page of root comments. Pass the last row of the previous page as the cursor:
+-- (created_at, id) for sort 'new', (score, id) for sort 'top'.
+CREATE OR REPLACE FUNCTION public.get_root_comments(
+    p_delivery_id UUID,
+    p_sort TEXT DEFAULT 'new',
+    p_limit INTEGER DEFAULT 50,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_score INTEGER DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS SETOF public.comments
+STABLE
+SET search_path = public
+AS $$
+BEGIN
+    IF p_sort = 'top' THEN
+        RETURN QUERY
+        SELECT c.*
+        FROM public.comments c
+        WHERE c.delivery_id = p_delivery_id
+          AND c.parent_id IS NULL
+          AND (p_cursor_id IS NULL OR (c.score, c.id) < (p_cursor_score, p_cursor_id))
+        ORDER BY c.score DESC, c.id DESC
+        LIMIT p_limit;
+    ELSE
+        RETURN QUERY
+        SELECT c.*
+        FROM public.comments c
+        WHERE c.delivery_id = p_delivery_id
+          AND c.parent_id IS NULL
+          AND (p_cursor_id IS NULL OR (c.created_at, c.id) < (p_cursor_created_at, p_cursor_id))
+        ORDER BY c.created_at DESC, c.id DESC
+        LIMIT p_limit;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Up to p_limit replies per parent, oldest first, for every parent in p_parent_ids.
+-- The cursor (last row of the previous page) is only meaningful for a single parent.
+CREATE OR REPLACE FUNCTION public.get_comment_replies(
+    p_parent_ids UUID[],
+    p_limit INTEGER DEFAULT 10,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS SETOF public.comments
+STABLE
+SET search_path = public
+AS $$
+    SELECT r.*
+    FROM unnest(p_parent_ids) AS p(parent_id)
+    CROSS JOIN LATERAL (
+        SELECT c.*
+        FROM public.comments c
+        WHERE c.parent_id = p.parent_id
+          AND (p_cursor_id IS NULL OR (c.created_at, c.id) > (p_cursor_created_at, p_cursor_id))
+        ORDER BY c.created_at, c.id
+        LIMIT p_limit
+    ) r;
+$$ LANGUAGE sql;
+
+GRANT EXECUTE ON FUNCTION public.get_root_comments(UUID, TEXT, INTEGER, TIMESTAMP WITH TIME ZONE, INTEGER, UUID) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_comment_replies(UUID[], INTEGER, TIMESTAMP WITH TIME ZONE, UUID) TO anon, authenticated;
@@ -0,0 +1,79 @@
+-- CricBase Delivery Ingest Migration
+-- Deliveries ingested from the ball feed are keyed by '{match_id}_{feed_id}' (the
+-- id the API already serves), and matches are upstream ids, so both become TEXT.
+-- Comments may reference a delivery before its row lands, so that foreign key
+-- is dropped and comment_count is initialised when the delivery is inserted.
+
+-- Functions taking a UUID delivery id are recreated below
+DROP FUNCTION IF EXISTS public.get_root_comments(UUID, TEXT, INTEGER, TIMESTAMP WITH TIME ZONE, INTEGER, UUID);
+
+ALTER TABLE public.comments DROP CONSTRAINT IF EXISTS comments_delivery_id_fkey;
+ALTER TABLE public.deliveries DROP CONSTRAINT IF EXISTS deliveries_match_id_fkey;
+
+ALTER TABLE public.deliveries ALTER COLUMN id DROP DEFAULT;
+ALTER TABLE public.deliveries ALTER COLUMN id TYPE TEXT USING id::text;
+ALTER TABLE public.deliveries ALTER COLUMN id SET DEFAULT uuid_generate_v4()::text;
+ALTER TABLE public.deliveries ALTER COLUMN match_id TYPE TEXT USING match_id::text;
+ALTER TABLE public.comments ALTER COLUMN delivery_id TYPE TEXT USING delivery_id::text;
+
+-- Text/commentary items between overs are stored too, but kept out of the feed
+ALTER TABLE public.deliveries ADD COLUMN IF NOT EXISTS is_commentary BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Global feed: newest balls first, one index scan
+CREATE INDEX IF NOT EXISTS idx_deliveries_feed ON public.deliveries(timestamp DESC)
+    WHERE NOT is_commentary;
+
+-- Count comments written before the delivery row existed
+CREATE OR REPLACE FUNCTION public.init_delivery_comment_count()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    NEW.comment_count := (SELECT COUNT(*) FROM public.comments c WHERE c.delivery_id = NEW.id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS init_delivery_comment_count ON public.deliveries;
+CREATE TRIGGER init_delivery_comment_count BEFORE INSERT ON public.deliveries
+    FOR EACH ROW EXECUTE FUNCTION public.init_delivery_comment_count();
+
+-- One page of root comments. Pass the last row of the previous page as the cursor:
+-- (created_at, id) for sort 'new', (score, id) for sort 'top'.
+CREATE OR REPLACE FUNCTION public.get_root_comments(
+    p_delivery_id TEXT,
+    p_sort TEXT DEFAULT 'new',
+    p_limit INTEGER DEFAULT 50,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_score INTEGER DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS SETOF public.comments
+STABLE
+SET search_path = public
+AS $$
+BEGIN
+    IF p_sort = 'top' THEN
+        RETURN QUERY
+        SELECT c.*
+        FROM public.comments c
+        WHERE c.delivery_id = p_delivery_id
+          AND c.parent_id IS NULL
+          AND (p_cursor_id IS NULL OR (c.score, c.id) < (p_cursor_score, p_cursor_id))
+        ORDER BY c.score DESC, c.id DESC
+        LIMIT p_limit;
+    ELSE
+        RETURN QUERY
+        SELECT c.*
+        FROM public.comments c
+        WHERE c.delivery_id = p_delivery_id
+          AND c.parent_id IS NULL
+          AND (p_cursor_id IS NULL OR (c.created_at, c.id) < (p_cursor_created_at, p_cursor_id))
+        ORDER BY c.created_at DESC, c.id DESC
+        LIMIT p_limit;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+GRANT EXECUTE ON FUNCTION public.get_root_comments(TEXT, TEXT, INTEGER, TIMESTAMP WITH TIME ZONE, INTEGER, UUID) TO anon, authenticated;
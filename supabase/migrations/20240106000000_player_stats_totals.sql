@@ -0,0 +1,77 @@
+-- CricBase Player Stats Totals Migration
+-- The backend folds every ingested ball into per-(player, match) totals and
+-- upserts them as absolute rows into player_match_stats. A trigger adds the
+-- difference to player_stats, which also keeps the raw counts the derived
+-- average, strike rate and economy are computed from.
+
+ALTER TABLE public.player_stats ADD COLUMN IF NOT EXISTS balls_faced INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE public.player_stats ADD COLUMN IF NOT EXISTS fours INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE public.player_stats ADD COLUMN IF NOT EXISTS sixes INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE public.player_stats ADD COLUMN IF NOT EXISTS dismissals INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE public.player_stats ADD COLUMN IF NOT EXISTS runs_conceded INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE public.player_stats ADD COLUMN IF NOT EXISTS legal_deliveries INTEGER NOT NULL DEFAULT 0;
+
+-- Per-match totals written by the backend's player stats engine, keyed by player and match
+CREATE TABLE IF NOT EXISTS public.player_match_stats (
+    player_id UUID NOT NULL,
+    match_id TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    balls_faced INTEGER NOT NULL DEFAULT 0,
+    fours INTEGER NOT NULL DEFAULT 0,
+    sixes INTEGER NOT NULL DEFAULT 0,
+    dismissals INTEGER NOT NULL DEFAULT 0,
+    wickets INTEGER NOT NULL DEFAULT 0,
+    runs_conceded INTEGER NOT NULL DEFAULT 0,
+    legal_deliveries INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (player_id, match_id)
+);
+
+-- Career totals follow per-match rows: each upsert adds its difference to player_stats
+CREATE OR REPLACE FUNCTION public.apply_player_match_stats()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    old_row public.player_match_stats%ROWTYPE;
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        old_row := OLD;
+    ELSE
+        old_row.runs := 0; old_row.balls_faced := 0; old_row.fours := 0; old_row.sixes := 0;
+        old_row.dismissals := 0; old_row.wickets := 0; old_row.runs_conceded := 0; old_row.legal_deliveries := 0;
+    END IF;
+
+    INSERT INTO public.player_stats (player_id, player_name)
+    VALUES (NEW.player_id, NEW.player_name)
+    ON CONFLICT (player_id) DO NOTHING;
+
+    UPDATE public.player_stats SET
+        player_name = NEW.player_name,
+        matches = COALESCE(matches, 0) + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE 0 END,
+        runs = COALESCE(runs, 0) + NEW.runs - old_row.runs,
+        balls_faced = balls_faced + NEW.balls_faced - old_row.balls_faced,
+        fours = fours + NEW.fours - old_row.fours,
+        sixes = sixes + NEW.sixes - old_row.sixes,
+        dismissals = dismissals + NEW.dismissals - old_row.dismissals,
+        wickets = COALESCE(wickets, 0) + NEW.wickets - old_row.wickets,
+        runs_conceded = runs_conceded + NEW.runs_conceded - old_row.runs_conceded,
+        legal_deliveries = legal_deliveries + NEW.legal_deliveries - old_row.legal_deliveries,
+        updated_at = NOW()
+    WHERE player_id = NEW.player_id;
+
+    -- Derived figures from the new totals
+    UPDATE public.player_stats SET
+        average = CASE WHEN dismissals > 0 THEN runs::DECIMAL / dismissals ELSE runs END,
+        strike_rate = CASE WHEN balls_faced > 0 THEN runs * 100.0 / balls_faced ELSE 0 END,
+        economy = CASE WHEN legal_deliveries > 0 THEN runs_conceded * 6.0 / legal_deliveries END
+    WHERE player_id = NEW.player_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS apply_player_match_stats ON public.player_match_stats;
+CREATE TRIGGER apply_player_match_stats AFTER INSERT OR UPDATE ON public.player_match_stats
+    FOR EACH ROW EXECUTE FUNCTION public.apply_player_match_stats();
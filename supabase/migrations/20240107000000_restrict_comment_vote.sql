@@ -0,0 +1,8 @@
+-- CricBase Restrict Comment Vote Migration
+-- cast_comment_vote() is SECURITY DEFINER and trusts its p_user_id argument, so
+-- a client holding the anon key could vote as any user. Only the backend, which
+-- authenticates the caller and connects with the service_role key, may call it.
+-- Functions are executable by PUBLIC by default, hence the explicit revoke.
+
+REVOKE EXECUTE ON FUNCTION public.cast_comment_vote(UUID, UUID, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.cast_comment_vote(UUID, UUID, TEXT) TO service_role;
@@ -0,0 +1,58 @@
+-- CricBase Player Stats Raw Totals Migration
+-- The raw counts added in 20240106000000 start at 0, but seeded and imported
+-- player_stats rows already hold career runs and wickets. Recomputing average,
+-- strike rate and economy from those partial counts would replace real career
+-- figures, so the trigger only does so for rows whose raw counts cover every
+-- match they include (raw_totals_complete). Rows the backend creates start out
+-- complete; any other row keeps its stored figures.
+
+ALTER TABLE public.player_stats ADD COLUMN IF NOT EXISTS raw_totals_complete BOOLEAN NOT NULL DEFAULT FALSE;
+
+-- Complete when every counted match came through player_match_stats
+UPDATE public.player_stats ps SET raw_totals_complete = TRUE
+WHERE COALESCE(ps.matches, 0) <= (
+    SELECT COUNT(*) FROM public.player_match_stats pms WHERE pms.player_id = ps.player_id
+);
+
+CREATE OR REPLACE FUNCTION public.apply_player_match_stats()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    old_row public.player_match_stats%ROWTYPE;
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        old_row := OLD;
+    ELSE
+        old_row.runs := 0; old_row.balls_faced := 0; old_row.fours := 0; old_row.sixes := 0;
+        old_row.dismissals := 0; old_row.wickets := 0; old_row.runs_conceded := 0; old_row.legal_deliveries := 0;
+    END IF;
+
+    INSERT INTO public.player_stats (player_id, player_name, raw_totals_complete)
+    VALUES (NEW.player_id, NEW.player_name, TRUE)
+    ON CONFLICT (player_id) DO NOTHING;
+
+    UPDATE public.player_stats SET
+        player_name = NEW.player_name,
+        matches = COALESCE(matches, 0) + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE 0 END,
+        runs = COALESCE(runs, 0) + NEW.runs - old_row.runs,
+        balls_faced = balls_faced + NEW.balls_faced - old_row.balls_faced,
+        fours = fours + NEW.fours - old_row.fours,
+        sixes = sixes + NEW.sixes - old_row.sixes,
+        dismissals = dismissals + NEW.dismissals - old_row.dismissals,
+        wickets = COALESCE(wickets, 0) + NEW.wickets - old_row.wickets,
+        runs_conceded = runs_conceded + NEW.runs_conceded - old_row.runs_conceded,
+        legal_deliveries = legal_deliveries + NEW.legal_deliveries - old_row.legal_deliveries,
+        updated_at = NOW()
+    WHERE player_id = NEW.player_id;
+
+    -- Derived figures from the new totals, only where the raw counts cover the whole career
+    UPDATE public.player_stats SET
+        average = CASE WHEN dismissals > 0 THEN runs::DECIMAL / dismissals ELSE runs END,
+        strike_rate = CASE WHEN balls_faced > 0 THEN runs * 100.0 / balls_faced ELSE 0 END,
+        economy = CASE WHEN legal_deliveries > 0 THEN runs_conceded * 6.0 / legal_deliveries END
+    WHERE player_id = NEW.player_id AND raw_totals_complete;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
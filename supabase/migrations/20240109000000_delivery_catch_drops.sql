@@ -0,0 +1,6 @@
+-- CricBase Delivery Catch Drops Migration
+-- The feed reports a dropped catch with is_wicket set. Ingested rows record
+-- it separately so match analytics read from this table do not count it as
+-- a wicket.
+
+ALTER TABLE public.deliveries ADD COLUMN IF NOT EXISTS is_catch_drop BOOLEAN NOT NULL DEFAULT FALSE;
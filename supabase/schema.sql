@@ -33,8 +33,8 @@ CREATE TABLE IF NOT EXISTS public.matches (
 
 -- Deliveries table
 CREATE TABLE IF NOT EXISTS public.deliveries (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    match_id UUID NOT NULL REFERENCES public.matches(id) ON DELETE CASCADE,
+    id TEXT PRIMARY KEY DEFAULT uuid_generate_v4()::text,  -- '{match_id}_{feed_id}' for ingested balls
+    match_id TEXT NOT NULL,  -- upstream match id
     over INTEGER NOT NULL,
     ball INTEGER NOT NULL,
     bowler TEXT NOT NULL,
@@ -47,18 +47,21 @@ CREATE TABLE IF NOT EXISTS public.deliveries (
     description TEXT NOT NULL,
     timestamp TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     comment_count INTEGER DEFAULT 0,
+    is_commentary BOOLEAN NOT NULL DEFAULT FALSE,
+    is_catch_drop BOOLEAN NOT NULL DEFAULT FALSE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
 -- Comments table
 CREATE TABLE IF NOT EXISTS public.comments (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    delivery_id UUID NOT NULL REFERENCES public.deliveries(id) ON DELETE CASCADE,
+    delivery_id TEXT NOT NULL,  -- may precede the ingested delivery row
     user_id UUID NOT NULL REFERENCES public.users(id) ON DELETE CASCADE,
     content TEXT NOT NULL,
     parent_id UUID REFERENCES public.comments(id) ON DELETE CASCADE,
     upvotes INTEGER DEFAULT 0,
     downvotes INTEGER DEFAULT 0,
+    score INTEGER GENERATED ALWAYS AS (COALESCE(upvotes, 0) - COALESCE(downvotes, 0)) STORED,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -83,9 +86,34 @@ CREATE TABLE IF NOT EXISTS public.player_stats (
     average DECIMAL(10, 2) DEFAULT 0,
     strike_rate DECIMAL(10, 2) DEFAULT 0,
     economy DECIMAL(10, 2),
+    balls_faced INTEGER NOT NULL DEFAULT 0,
+    fours INTEGER NOT NULL DEFAULT 0,
+    sixes INTEGER NOT NULL DEFAULT 0,
+    dismissals INTEGER NOT NULL DEFAULT 0,
+    runs_conceded INTEGER NOT NULL DEFAULT 0,
+    legal_deliveries INTEGER NOT NULL DEFAULT 0,
+    -- Raw counts cover every counted match; seeded career rows keep their derived figures
+    raw_totals_complete BOOLEAN NOT NULL DEFAULT FALSE,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Per-match totals written by the backend's player stats engine, keyed by player and match
+CREATE TABLE IF NOT EXISTS public.player_match_stats (
+    player_id UUID NOT NULL,
+    match_id TEXT NOT NULL,
+    player_name TEXT NOT NULL,
+    runs INTEGER NOT NULL DEFAULT 0,
+    balls_faced INTEGER NOT NULL DEFAULT 0,
+    fours INTEGER NOT NULL DEFAULT 0,
+    sixes INTEGER NOT NULL DEFAULT 0,
+    dismissals INTEGER NOT NULL DEFAULT 0,
+    wickets INTEGER NOT NULL DEFAULT 0,
+    runs_conceded INTEGER NOT NULL DEFAULT 0,
+    legal_deliveries INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (player_id, match_id)
+);
+
 -- Team stats table
 CREATE TABLE IF NOT EXISTS public.team_stats (
     team_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
@@ -100,10 +128,21 @@ CREATE TABLE IF NOT EXISTS public.team_stats (
 -- Indexes for better query performance
 CREATE INDEX IF NOT EXISTS idx_deliveries_match_id ON public.deliveries(match_id);
 CREATE INDEX IF NOT EXISTS idx_deliveries_timestamp ON public.deliveries(timestamp DESC);
+-- Global feed: newest balls first, one index scan
+CREATE INDEX IF NOT EXISTS idx_deliveries_feed ON public.deliveries(timestamp DESC)
+    WHERE NOT is_commentary;
 CREATE INDEX IF NOT EXISTS idx_comments_delivery_id ON public.comments(delivery_id);
 CREATE INDEX IF NOT EXISTS idx_comments_parent_id ON public.comments(parent_id);
 CREATE INDEX IF NOT EXISTS idx_comments_created_at ON public.comments(created_at);
 CREATE INDEX IF NOT EXISTS idx_comment_votes_comment_id ON public.comment_votes(comment_id);
+-- Root comments of a delivery, newest first and top first
+CREATE INDEX IF NOT EXISTS idx_comments_roots_new ON public.comments(delivery_id, created_at DESC, id DESC)
+    WHERE parent_id IS NULL;
+CREATE INDEX IF NOT EXISTS idx_comments_roots_top ON public.comments(delivery_id, score DESC, id DESC)
+    WHERE parent_id IS NULL;
+-- Replies of a comment, oldest first
+CREATE INDEX IF NOT EXISTS idx_comments_replies ON public.comments(parent_id, created_at, id)
+    WHERE parent_id IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_matches_status ON public.matches(status);
 CREATE INDEX IF NOT EXISTS idx_matches_date ON public.matches(date DESC);
 
@@ -155,3 +194,206 @@ CREATE TRIGGER update_matches_updated_at BEFORE UPDATE ON public.matches
 CREATE TRIGGER update_comments_updated_at BEFORE UPDATE ON public.comments
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Comment count per delivery, adjusted in the same transaction as the insert/delete
+CREATE OR REPLACE FUNCTION public.update_delivery_comment_count()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        UPDATE public.deliveries SET comment_count = COALESCE(comment_count, 0) + 1
+        WHERE id = NEW.delivery_id;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE public.deliveries SET comment_count = GREATEST(COALESCE(comment_count, 0) - 1, 0)
+        WHERE id = OLD.delivery_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER update_delivery_comment_count AFTER INSERT OR DELETE ON public.comments
+    FOR EACH ROW EXECUTE FUNCTION public.update_delivery_comment_count();
+
+-- Count comments written before the delivery row existed
+CREATE OR REPLACE FUNCTION public.init_delivery_comment_count()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    NEW.comment_count := (SELECT COUNT(*) FROM public.comments c WHERE c.delivery_id = NEW.id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS init_delivery_comment_count ON public.deliveries;
+CREATE TRIGGER init_delivery_comment_count BEFORE INSERT ON public.deliveries
+    FOR EACH ROW EXECUTE FUNCTION public.init_delivery_comment_count();
+
+-- Career totals follow per-match rows: each upsert adds its difference to player_stats
+CREATE OR REPLACE FUNCTION public.apply_player_match_stats()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    old_row public.player_match_stats%ROWTYPE;
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        old_row := OLD;
+    ELSE
+        old_row.runs := 0; old_row.balls_faced := 0; old_row.fours := 0; old_row.sixes := 0;
+        old_row.dismissals := 0; old_row.wickets := 0; old_row.runs_conceded := 0; old_row.legal_deliveries := 0;
+    END IF;
+
+    INSERT INTO public.player_stats (player_id, player_name, raw_totals_complete)
+    VALUES (NEW.player_id, NEW.player_name, TRUE)
+    ON CONFLICT (player_id) DO NOTHING;
+
+    UPDATE public.player_stats SET
+        player_name = NEW.player_name,
+        matches = COALESCE(matches, 0) + CASE WHEN TG_OP = 'INSERT' THEN 1 ELSE 0 END,
+        runs = COALESCE(runs, 0) + NEW.runs - old_row.runs,
+        balls_faced = balls_faced + NEW.balls_faced - old_row.balls_faced,
+        fours = fours + NEW.fours - old_row.fours,
+        sixes = sixes + NEW.sixes - old_row.sixes,
+        dismissals = dismissals + NEW.dismissals - old_row.dismissals,
+        wickets = COALESCE(wickets, 0) + NEW.wickets - old_row.wickets,
+        runs_conceded = runs_conceded + NEW.runs_conceded - old_row.runs_conceded,
+        legal_deliveries = legal_deliveries + NEW.legal_deliveries - old_row.legal_deliveries,
+        updated_at = NOW()
+    WHERE player_id = NEW.player_id;
+
+    -- Derived figures from the new totals, only where the raw counts cover the whole career
+    UPDATE public.player_stats SET
+        average = CASE WHEN dismissals > 0 THEN runs::DECIMAL / dismissals ELSE runs END,
+        strike_rate = CASE WHEN balls_faced > 0 THEN runs * 100.0 / balls_faced ELSE 0 END,
+        economy = CASE WHEN legal_deliveries > 0 THEN runs_conceded * 6.0 / legal_deliveries END
+    WHERE player_id = NEW.player_id AND raw_totals_complete;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS apply_player_match_stats ON public.player_match_stats;
+CREATE TRIGGER apply_player_match_stats AFTER INSERT OR UPDATE ON public.player_match_stats
+    FOR EACH ROW EXECUTE FUNCTION public.apply_player_match_stats();
+
+-- Vote tallies per comment, adjusted by the delta of each vote row change
+CREATE OR REPLACE FUNCTION public.update_comment_vote_tally()
+RETURNS TRIGGER
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    up_delta INTEGER := 0;
+    down_delta INTEGER := 0;
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF OLD.vote = 'up' THEN up_delta := up_delta - 1; ELSE down_delta := down_delta - 1; END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF NEW.vote = 'up' THEN up_delta := up_delta + 1; ELSE down_delta := down_delta + 1; END IF;
+    END IF;
+    IF up_delta <> 0 OR down_delta <> 0 THEN
+        UPDATE public.comments
+        SET upvotes = GREATEST(COALESCE(upvotes, 0) + up_delta, 0),
+            downvotes = GREATEST(COALESCE(downvotes, 0) + down_delta, 0)
+        WHERE id = COALESCE(NEW.comment_id, OLD.comment_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER update_comment_vote_tally AFTER INSERT OR UPDATE OF vote OR DELETE ON public.comment_votes
+    FOR EACH ROW EXECUTE FUNCTION public.update_comment_vote_tally();
+
+-- Insert or change a user's vote and return the comment's new tallies.
+-- Re-casting the same vote is a no-op; concurrent votes serialize on the vote row.
+CREATE OR REPLACE FUNCTION public.cast_comment_vote(p_comment_id UUID, p_user_id UUID, p_vote TEXT)
+RETURNS TABLE (upvotes INTEGER, downvotes INTEGER)
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF p_vote NOT IN ('up', 'down') THEN
+        RAISE EXCEPTION 'invalid vote: %', p_vote USING ERRCODE = '22023';
+    END IF;
+
+    INSERT INTO public.comment_votes (comment_id, user_id, vote)
+    VALUES (p_comment_id, p_user_id, p_vote)
+    ON CONFLICT (comment_id, user_id) DO UPDATE SET vote = EXCLUDED.vote
+    WHERE public.comment_votes.vote IS DISTINCT FROM EXCLUDED.vote;
+
+    RETURN QUERY
+    SELECT c.upvotes, c.downvotes FROM public.comments c WHERE c.id = p_comment_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trusts p_user_id, so only the backend (service_role key) may call it
+REVOKE EXECUTE ON FUNCTION public.cast_comment_vote(UUID, UUID, TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.cast_comment_vote(UUID, UUID, TEXT) TO service_role;
+
+-- One page of root comments. Pass the last row of the previous page as the cursor:
+-- (created_at, id) for sort 'new', (score, id) for sort 'top'.
+CREATE OR REPLACE FUNCTION public.get_root_comments(
+    p_delivery_id TEXT,
+    p_sort TEXT DEFAULT 'new',
+    p_limit INTEGER DEFAULT 50,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_score INTEGER DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS SETOF public.comments
+STABLE
+SET search_path = public
+AS $$
+BEGIN
+    IF p_sort = 'top' THEN
+        RETURN QUERY
+        SELECT c.*
+        FROM public.comments c
+        WHERE c.delivery_id = p_delivery_id
+          AND c.parent_id IS NULL
+          AND (p_cursor_id IS NULL OR (c.score, c.id) < (p_cursor_score, p_cursor_id))
+        ORDER BY c.score DESC, c.id DESC
+        LIMIT p_limit;
+    ELSE
+        RETURN QUERY
+        SELECT c.*
+        FROM public.comments c
+        WHERE c.delivery_id = p_delivery_id
+          AND c.parent_id IS NULL
+          AND (p_cursor_id IS NULL OR (c.created_at, c.id) < (p_cursor_created_at, p_cursor_id))
+        ORDER BY c.created_at DESC, c.id DESC
+        LIMIT p_limit;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Up to p_limit replies per parent, oldest first, for every parent in p_parent_ids.
+-- The cursor (last row of the previous page) is only meaningful for a single parent.
+CREATE OR REPLACE FUNCTION public.get_comment_replies(
+    p_parent_ids UUID[],
+    p_limit INTEGER DEFAULT 10,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL
+)
+RETURNS SETOF public.comments
+STABLE
+SET search_path = public
+AS $$
+    SELECT r.*
+    FROM unnest(p_parent_ids) AS p(parent_id)
+    CROSS JOIN LATERAL (
+        SELECT c.*
+        FROM public.comments c
+        WHERE c.parent_id = p.parent_id
+          AND (p_cursor_id IS NULL OR (c.created_at, c.id) > (p_cursor_created_at, p_cursor_id))
+        ORDER BY c.created_at, c.id
+        LIMIT p_limit
+    ) r;
+$$ LANGUAGE sql;
+
+GRANT EXECUTE ON FUNCTION public.get_root_comments(TEXT, TEXT, INTEGER, TIMESTAMP WITH TIME ZONE, INTEGER, UUID) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_comment_replies(UUID[], INTEGER, TIMESTAMP WITH TIME ZONE, UUID) TO anon, authenticated;